@@ -23,6 +23,7 @@ from SalletBasePackage import units
 from DataVisualizer.data2str import rdf
 from SalletNodePackage import NodeManager as NodeMan
 from SalletNodePackage import BitcoinNodeObject as BtcNode
+from sql_bases.sqlbase_node.sqlbase_node import Node as sqlNode
 
 from kivy.config import Config
 import dotenv
@@ -374,7 +375,12 @@ class OpAreaBrowse(OperationAreaBox):
         returned_json = {}
         
         try:
-            returned_json = App.get_running_app().actual_node_object.nodeop_getrawtransaction(tx_hash=tx_id, verbose=1)
+            if App.get_running_app().node_manager is not None:  # hedged across redundant nodes
+                returned_json = App.get_running_app().node_manager.call("nodeop_getrawtransaction",
+                                                                        tx_hash=tx_id, verbose=1)
+            else:
+                returned_json = App.get_running_app().actual_node_object.nodeop_getrawtransaction(tx_hash=tx_id,
+                                                                                                 verbose=1)
             inst.background_color = self.memorized_btn_color
             inst.text = self.memorized_btn_text
         except:
@@ -710,6 +716,7 @@ class SalletVISOR(App):
         # --- Bitcoin related settings ----------------------------------  Bitcoin related settings -   ENDED   -
         # --- Node related settings -------------------------------------  Node related settings    -   START   -
         self.actual_node_object: BtcNode.Node or None = None
+        self.node_manager: NodeMan.NODEManager or None = None  # only if NODE_HEDGING is set in the .env file
         # --- Node related settings -------------------------------------  Node related settings    -   START   -
 
     def change_screen(self, screen_name, screen_direction="left"):
@@ -753,6 +760,12 @@ class SalletVISOR(App):
         # --- Filling in large text-fields of Labels                                            ENDED   -
         # --- Setting default Node                                                              START   -
         self.actual_node_object = BtcNode.Node(alias="", is_rpc=True)
+        if os.getenv("NODE_HEDGING", "").lower() in ("1", "true", "yes"):
+            self.node_manager = NodeMan.NODEManager(session_in=self.db_session,
+                                                    row_obj=sqlNode.__table__,
+                                                    dotenv_path=self.dotenv_path)
+            self.node_manager.get_key_guided_rowdict()
+            self.node_manager.hedging = True
         # --- Setting default Node                                                              ENDED   -
 
         
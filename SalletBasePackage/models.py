@@ -4,16 +4,39 @@ import inspect
 
 
 class UtxoId:
+    """=== Class name: UtxoId ==========================================================================================
+    Outpoint: transaction ID and output index. Stored compact - 32 bytes of txid, hex only produced when asked for.
+    Hashable by <key>: (txid_bytes, n) - two outpoints are equal if their keys are.
+    :param txid: str or bytes - transaction ID as displayed: 64 char hex, or its 32 bytes
+    :param n: int - index of the output
+    ============================================================================================== by Sziller ==="""
     divider: str = "_"
     ccn = inspect.currentframe().f_code.co_name
+    __slots__ = ("txid_bytes", "n")
     
-    def __init__(self, txid: str, n: int):
-        self.txid: str = txid
+    def __init__(self, txid, n: int):
+        self.txid_bytes: bytes = txid if isinstance(txid, bytes) else bytes.fromhex(txid)
         self.n: int = n
     
     def __repr__(self):
         return "{}{}{}".format(self.txid, self.divider, self.n)
 
+    def __eq__(self, other):
+        return isinstance(other, UtxoId) and self.n == other.n and self.txid_bytes == other.txid_bytes
+
+    def __hash__(self):
+        return hash((self.txid_bytes, self.n))
+
+    @property
+    def txid(self) -> str:
+        """Transaction ID in hex - as displayed."""
+        return self.txid_bytes.hex()
+
+    @property
+    def key(self) -> tuple:
+        """Hashable outpoint key: (txid_bytes, n)."""
+        return self.txid_bytes, self.n
+
     @classmethod
     def construct(cls, d_in):
         """=== Classmethod: construct ==================================================================================
@@ -33,12 +56,21 @@ class UtxoId:
         utxo_id_atom_list = "{}".format(str_in).split(sep=UtxoId.divider)
         return cls(txid=utxo_id_atom_list[0], n=int(utxo_id_atom_list[1]))
 
+    @classmethod
+    def construct_from_key(cls, key: tuple):
+        """=== Classmethod: construct_from_key =========================================================================
+        @param key: tuple - (txid_bytes, n) as returned by <key>
+        @return: an instance of the class
+        ========================================================================================== by Sziller ==="""
+        return cls(txid=key[0], n=key[1])
+
 
 class ScriptPubKey:
     """=== Class name: ScriptPubKey ====================================================================================
     Data collection to store ScriptPubKey data
     ============================================================================================== by Sziller ==="""
     ccn = inspect.currentframe().f_code.co_name
+    __slots__ = ("asm", "hex", "reqSigs", "type", "addresses")
 
     def __init__(self, spk_asm: str, spk_hex: str, spk_reqSigs: int, spk_type: str, spk_addresses: list, **kwargs):
         self.asm: str               = spk_asm
@@ -47,6 +79,14 @@ class ScriptPubKey:
         self.type: str              = spk_type
         self.addresses: list[str]   = spk_addresses
 
+    def data(self):
+        """actual dictionary to be returned - keys as the attributes"""
+        return {'asm':          self.asm,
+                'hex':          self.hex,
+                'reqSigs':      self.reqSigs,
+                'type':         self.type,
+                'addresses':    self.addresses}
+
     @classmethod
     def construct(cls, **d_in):
         """=== Classmethod: construct ==================================================================================
@@ -64,23 +104,38 @@ class ScriptPubKey:
 class Utxo:
     """=== Class name: Utxo ============================================================================================
     Object to represent a UTXO inside the code. Not to be used in the DB.
+    <value> is in the unit its owner uses (see UTXOManager.unit_used): integer sats, unless a coarser unit is chosen.
+    <txid> and <n> are read from <utxo_id> - not stored twice.
     ============================================================================================== by Sziller ==="""
     ccn = inspect.currentframe().f_code.co_name
+    __slots__ = ("utxo_id", "value", "scriptPubKey")
     
-    def __init__(self, utxo_id: UtxoId, value: float = 0.0, scriptPubKey: (ScriptPubKey or None) = None, **kwargs):
+    def __init__(self, utxo_id: UtxoId, value: int or float = 0, scriptPubKey: (ScriptPubKey or None) = None,
+                 **kwargs):
         self.utxo_id: UtxoId                    = utxo_id
-        self.txid: str                          = self.utxo_id.txid
-        self.n: int                             = self.utxo_id.n
-        self.value: float                       = value
+        self.value: int or float                = value
         self.scriptPubKey: ScriptPubKey or None = scriptPubKey
 
+    @property
+    def txid(self) -> str:
+        return self.utxo_id.txid
+
+    @property
+    def n(self) -> int:
+        return self.utxo_id.n
+
+    @property
+    def key(self) -> tuple:
+        """Hashable outpoint key: (txid_bytes, n)."""
+        return self.utxo_id.key
+
     def data(self):
         """actual dictionary to be returned"""
         return {'utxo_id':      "{}".format(self.utxo_id),
                 'n':            self.n,
                 'txid':         self.txid,
                 'value':        self.value,
-                'scriptPubKey': self.scriptPubKey.__dict__}
+                'scriptPubKey': self.scriptPubKey.data()}
     
     def __repr__(self):
         """Redefinition of the built-in method"""
@@ -122,6 +177,7 @@ class Utxo:
 
 class PrivateKey:
     ccn = inspect.currentframe().f_code.co_name
+    __slots__ = ("hxstr", "owner", "kind", "comment")
     
     def __init__(self, owner: str, kind: int):
         self.hxstr: str     = ""
@@ -132,6 +188,7 @@ class PrivateKey:
 
 class MerkleDerived(PrivateKey):
     ccn = inspect.currentframe().f_code.co_name
+    __slots__ = ("root_hxstr", "deriv_nr")
     
     def __init__(self, owner, root_hxstr, kind: int = 1, deriv_nr: int = 0):
         super().__init__(owner, kind)
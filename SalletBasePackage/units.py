@@ -1,8 +1,16 @@
 """Simple function to convert between different well-known bitcoin units
+Unit names are resolved by a table built once, at import. Conversions are exact: integers stay integers, floats are
+taken by their shortest decimal representation (as printed), Decimals stay Decimals - no satoshi is lost to binary
+float division. <convert_array()> converts entire NumPy arrays of values at once.
 by Sziller"""
 
 import logging
-import inspect
+from decimal import Decimal, ROUND_HALF_EVEN
+
+try:
+    import numpy as np  # optional: only needed by the vectorized converter
+except ImportError:
+    np = None
 
 # Setting up logger                                         logger                      -   START   -
 lg = logging.getLogger()
@@ -10,8 +18,49 @@ lg = logging.getLogger()
 
 lg.info("START     : {:>85} <<<".format('units.py'))
 
+# aliases of the units - by the power of ten of one bitcoin they are. Matched case-insensitive.
+UNIT_ALIASES: dict = {0:  ('btc', 'bitcoin', 'bitcoins', 'coin', 'coins'),
+                      3:  ('mbtc', 'mili', 'millibitcoin', 'millibitcoins', 'milli-bitcoin', 'milli-bitcoins',
+                           'millibit', 'millibits', 'millie', 'millies', 'm', 'milli'),
+                      6:  ('µbtc', 'μbtc', 'bit', 'bits', 'microbitcoin', 'microbitcoins', 'micro-bitcoin',
+                           'micro-bitcoins', 'micro', 'micros', 'µ', 'μ'),
+                      8:  ('satoshi', 'satoshis', 'sat', 'sats', 's'),
+                      11: ('msatoshi', 'msatoshis', 'msat', 'msats', 'ms',
+                           'millisatoshi', 'millisatoshis', 'millisat', 'millisats')}
+
+UNIT_POWERS: dict = {alias: power for power, aliases in UNIT_ALIASES.items() for alias in aliases}
+SAT_POWER: int = 8                      # units of this power and finer are counted in integers
+SATS_PER_BTC: int = 100_000_000
+_TEN_POW: tuple = tuple(10 ** _ for _ in range(max(UNIT_ALIASES) + 1))
+_DECIMAL_STEPS: dict = {power: Decimal(1).scaleb(power - SAT_POWER) for power in UNIT_ALIASES}  # 1 sat of each unit
+
+
+def unit_power(unit: str) -> int:
+    """=== Function name: unit_power ===================================================================================
+    :param unit: str - name of a unit, any alias, any case
+    :return: int - power of ten of one bitcoin the unit is (btc: 0, sat: 8 etc.)
+    ============================================================================================== by Sziller ==="""
+    power = UNIT_POWERS.get(unit)
+    if power is None:
+        power = UNIT_POWERS.get(unit.lower()) if isinstance(unit, str) else None
+        if power is None:
+            msg = "Entered unit name not recognised: {} - says unit_power() at units.py".format(unit)
+            lg.critical(msg)
+            raise Exception(msg)
+    return power
+
+
+def _div_round_half_even(value: int, divisor: int) -> int:
+    """=== Function name: _div_round_half_even =========================================================================
+    Integer division rounded to the nearest integer - ties to even, as round() does.
+    ============================================================================================== by Sziller ==="""
+    quotient, remainder = divmod(value, divisor)
+    if 2 * remainder > divisor or (2 * remainder == divisor and quotient % 2):
+        quotient += 1
+    return quotient
+
 
-def bitcoin_unit_converter(value: float, unit_in: str, unit_out: str) -> float:
+def bitcoin_unit_converter(value, unit_in: str, unit_out: str):
     """ Function name: bitcoin_unit_converter ==========================================================================
     FUNCTION NAME: bitcoin_unit_converter
     Script converts between different units of the Bitcoin system.
@@ -23,7 +72,7 @@ def bitcoin_unit_converter(value: float, unit_in: str, unit_out: str) -> float:
     - satoshi                                   :   8
     - millisatoshi                              :  11
 
-    convert_table inside script contains the associations btw. aliasses and powers.
+    UNIT_ALIASES of the module contains the associations btw. aliasses and powers - case-insensitive.
     For a better overlook, programm codes the units using the powers of ten.
     Script recognises 5 different units as of now:
     bitcoin     :1
@@ -32,54 +81,74 @@ def bitcoin_unit_converter(value: float, unit_in: str, unit_out: str) -> float:
     satoshi     :100000000      (currently the smallest unit, in which tx-s can be settled)
     millisatoshi:100000000000   (currently used on the 2nd layer lightning network, cannot be settled)
 
+    Values are rounded to the satoshi (ties to even). Sats and millisats are returned as integers, other units as
+    floats - or as Decimals, if <value> is a Decimal. sat <-> btc of int sats / float btc take a fast path.
+
     :param unit_in: the unit you want to convert from, the base unit of the conversion.
     :param unit_out: the unit you want to convert to, the target unit of the conversion.
-    :param value: numerical value of the base unit.
-    :return: float - numerical value of the target unit.
+    :param value: numerical value of the base unit: int, float or Decimal.
+    :return: int, float or Decimal - numerical value of the target unit.
+    ============================================================================================== by Sziller ==="""
+    power_in, power_out = unit_power(unit_in), unit_power(unit_out)
+    shift = power_out - power_in
+    value_type = type(value)
+    # fast paths: the conversions run once per UTXO on every load, export and display
+    if value_type is int:
+        if shift >= 0:
+            scaled = value * _TEN_POW[shift]
+            return scaled if power_out >= SAT_POWER else float(scaled)
+        if power_out >= SAT_POWER:
+            return _div_round_half_even(value, _TEN_POW[-shift])
+        if power_in <= SAT_POWER:  # int / int is correctly rounded: exact to the sat already
+            return value / _TEN_POW[-shift]
+        return _div_round_half_even(value, _TEN_POW[power_in - SAT_POWER]) / _TEN_POW[SAT_POWER - power_out]
+    if value_type is float and power_in == 0 and power_out == SAT_POWER:  # float btc -> int sats
+        return round(value * SATS_PER_BTC)
+    # exact path
+    as_decimal = value_type is Decimal
+    scaled = (value if as_decimal else Decimal(repr(value) if value_type is float else str(value))).scaleb(shift)
+    if power_out >= SAT_POWER:
+        return int(scaled.to_integral_value(rounding=ROUND_HALF_EVEN))
+    scaled = scaled.quantize(_DECIMAL_STEPS[power_out], rounding=ROUND_HALF_EVEN)
+    return scaled if as_decimal else float(scaled)
+
+
+def _require_numpy():
+    """=== Function name: _require_numpy ===============================================================================
+    ============================================================================================== by Sziller ==="""
+    if np is None:
+        raise ImportError("numpy is needed for vectorized unit conversions: pip install numpy")
+
+
+def convert_array(values, unit_in: str, unit_out: str) -> "np.ndarray":
+    """=== Function name: convert_array ================================================================================
+    bitcoin_unit_converter() of an entire array of values at once.
+    Integer arrays (e.g. sats) are converted exactly: to int64 for sats and millisats, to float64 correctly rounded
+    otherwise. Float arrays are scaled and rounded to the satoshi - exact for values of at most 8 decimals in btc.
+    :param values: array-like - of numbers in <unit_in>
+    :param unit_in: str - the unit you want to convert from
+    :param unit_out: str - the unit you want to convert to
+    :return: np.ndarray - int64 for sats and millisats, float64 for other units
     ============================================================================================== by Sziller ==="""
-    ccn = inspect.currentframe().f_code.co_name  # current class name
-    convert_table = {'btc': 0, 'bitcoin': 0, 'bitcoins': 0, 'Bitcoin': 0, 'Bitcoins': 0,
-                     'BTC': 0, 'BITCOIN': 0, 'BITCOINS': 0,
-                     'coin': 0, 'coins': 0, 'COIN': 0, 'COINS': 0,
-
-                     'mbtc': 3, 'mili': 3, 'millibitcoin': 3, 'millibitcoins': 3, 'milli-bitcoin': 3,
-                     'milli-bitcoins': 3, 'millibit': 3, 'millibits': 3, 'millie': 3, 'millies': 3, 'm': 3, 'milli': 3,
-                     'mBTC': 3, 'MILI': 3, 'MILLIBITCOIN': 3, 'MILLIBITCOINS': 3, 'MILLI-BITCOIN': 3,
-                     'MILLI-BITCOINS': 3, 'MILLIBIT': 3, 'MILLIBITS': 3, 'MILLIE': 3, 'MILLIES': 3,
-
-                     'µbtc': 6, 'bit': 6, 'bits': 6, 'microbitcoin': 6, 'microbitcoins': 6,
-                     'micro-bitcoin': 6, 'micro-bitcoins': 6, 'micro': 6, 'micros': 6, 'µ': 6,
-                     'µBTC': 6, 'BIT': 6, 'BITS': 6, 'MICROBITCOIN': 6, 'MICROBITCOINS': 6,
-                     'MICRO-BITCOIN': 6, 'MICRO-BITCOINS': 6, 'MICRO': 6, 'MICROS': 6,
-
-                     'satoshi': 8, 'satoshis': 8, 'sat': 8, 'sats': 8, 's': 8,
-                     'SATOSHI': 8, 'SATOSHIS': 8, 'SAT': 8, 'SATS': 8,
-
-                     'msatoshi': 11, 'msatoshis': 11, 'msat': 11, 'msats': 11, 'ms': 11,
-                     'MSATOSHI': 11, 'MSATOSHIS': 11, 'MSAT': 11, 'MSATS': 11,
-
-                     'millisatoshi': 11, 'millisatoshis': 11, 'millisat': 11, 'millisats': 11,
-                     'MILLISATOSHI': 11, 'MILLISATOSHIS': 11, 'MILLISAT': 11, 'MILLISATS': 11
-                     }
-
-    name_table = {0: 'bitcoin', 3: "millie", 6: "bit", 8: "satoshi", 11: "millisatoshi"}
-
-    if unit_in in convert_table.keys() and unit_out in convert_table.keys():
-        if isinstance(unit_in, str):
-            unit_in = convert_table[unit_in]
-        if isinstance(unit_out, str):
-            unit_out = convert_table[unit_out]
-
-        convert_power = unit_in - unit_out
-        calculated = float(value / (10 ** convert_power))
-        round_to = 8 - unit_out  # calculating nr of decimal places to round to
-        returned = round(calculated, round_to)  # returned value rounded so system rounding errors do not show
-        if round_to <= 0: returned = int(returned)  # sats and millisats should be returned as integers
-        return returned
-    else:
-        msg = "Entered unit name not recognised! - says {}() at units.py".format(ccn)
-        lg.critical(msg)
-        raise Exception(msg)
-
-        
-    
+    _require_numpy()
+    power_in, power_out = unit_power(unit_in), unit_power(unit_out)
+    shift = power_out - power_in
+    values = np.asarray(values)
+    if values.dtype.kind in "iub":
+        values = values.astype(np.int64, copy=False)
+        if shift >= 0:
+            scaled = values * np.int64(_TEN_POW[shift])
+            return scaled if power_out >= SAT_POWER else scaled.astype(np.float64)
+        if power_out >= SAT_POWER or power_in > SAT_POWER:  # round to the sat - ties to even - in integers
+            step = _TEN_POW[power_in - max(power_out, SAT_POWER)]
+            quotient, remainder = np.divmod(values, np.int64(step))
+            quotient += (2 * remainder > step) | ((2 * remainder == step) & (quotient % 2 == 1))
+            if power_out >= SAT_POWER:
+                return quotient
+            values, shift = quotient, power_out - SAT_POWER
+        return values / np.float64(_TEN_POW[-shift])  # correctly rounded, as int / int in python
+    scaled = values.astype(np.float64) * np.float64(10.0 ** shift) if shift >= 0 \
+        else values.astype(np.float64) / np.float64(_TEN_POW[-shift])
+    if power_out >= SAT_POWER:
+        return np.rint(scaled).astype(np.int64)
+    return np.round(scaled, SAT_POWER - power_out)
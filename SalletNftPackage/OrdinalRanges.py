@@ -0,0 +1,162 @@
+"""
+Ordinal numbers of sats held by an input or output - as intervals.
+An output of 3 btc holds 300_000_000 sats, but their ordinals usually form a handful of continuous runs: storing the
+runs instead of the numbers makes memory scale with the number of runs, not with the number of sats.
+Runs are half-open intervals [start, stop) - as python's range(start, stop) - kept in their conventional order: the
+order the sats sit in the output, NOT sorted by ordinal number.
+by Sziller
+"""
+
+import inspect
+import logging
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('OrdinalRanges.py'))
+
+
+class RangeList(object):
+    """=== Class name: RangeList =======================================================================================
+    Sequence of ordinals stored as intervals, in three compact arrays: starts, stops, and the running number of sats
+    up to and including each interval. Adjacent intervals continuing each other are merged on append.
+    Positions ('pos') count sats inside the sequence: pos 0 is the first sat held, <value> - 1 the last one.
+    :param ranges: iterable - of range objects (step 1) to start with, in order
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+    __slots__ = ("_starts", "_stops", "_cum")
+
+    def __init__(self, ranges: Iterable[range] = ()):
+        self._starts: array                 = array('q')
+        self._stops: array                  = array('q')
+        self._cum: array                    = array('q')  # sats held up to and including the interval
+        for _ in ranges:
+            self.append(_.start, _.stop)
+
+    def __len__(self):
+        """Number of intervals - see <value> for the number of sats."""
+        return len(self._starts)
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def __eq__(self, other):
+        return isinstance(other, RangeList) and self._starts == other._starts and self._stops == other._stops
+
+    def __repr__(self):
+        shown = ", ".join("[{}, {})".format(*_) for _ in list(self.intervals())[:4])
+        more = ", ... {} more".format(len(self) - 4) if len(self) > 4 else ""
+        return "{}({}{} - {} sats)".format(self.ccn, shown, more, self.value)
+
+    @property
+    def value(self) -> int:
+        """Number of sats held."""
+        return self._cum[-1] if self._cum else 0
+
+    def append(self, start: int, stop: int):
+        """=== Instance method =========================================================================================
+        Appends the interval [start, stop) to the end - merged into the last one if it continues it.
+        Empty intervals are ignored.
+        ========================================================================================== by Sziller ==="""
+        if stop <= start:
+            return
+        if self._stops and self._stops[-1] == start:
+            self._stops[-1] = stop
+            self._cum[-1] += stop - start
+        else:
+            self._starts.append(start)
+            self._stops.append(stop)
+            self._cum.append(self.value + stop - start)
+
+    def extend(self, other: "RangeList"):
+        """=== Instance method =========================================================================================
+        Appends all intervals of <other>, in order.
+        ========================================================================================== by Sziller ==="""
+        for start, stop in other.intervals():
+            self.append(start, stop)
+
+    def intervals(self) -> Iterator[tuple]:
+        """=== Instance method =========================================================================================
+        :return: iterator - of (start, stop) tuples, in order
+        ========================================================================================== by Sziller ==="""
+        return zip(self._starts, self._stops)
+
+    def to_ranges(self) -> list:
+        """=== Instance method =========================================================================================
+        :return: list - of range objects, in order
+        ========================================================================================== by Sziller ==="""
+        return [range(start, stop) for start, stop in self.intervals()]
+
+    def ordinal_at(self, pos: int) -> int:
+        """=== Instance method =========================================================================================
+        :param pos: int - position of a sat in the sequence, negative ones counted from the end
+        :return: int - ordinal number of the sat at <pos>
+        ========================================================================================== by Sziller ==="""
+        if pos < 0:
+            pos += self.value
+        if not 0 <= pos < self.value:
+            raise IndexError("position {} out of {} sats".format(pos, self.value))
+        i = bisect_right(self._cum, pos)
+        return self._stops[i] - (self._cum[i] - pos)
+
+    def slice(self, start: int, stop: int) -> "RangeList":
+        """=== Instance method =========================================================================================
+        Sats at positions [start, stop) - intervals cut where needed. The intervals outside are not touched.
+        :param start: int - position of the first sat taken
+        :param stop: int - position after the last sat taken
+        :return: RangeList - the sats taken, in order
+        ========================================================================================== by Sziller ==="""
+        ans = RangeList()
+        stop = min(stop, self.value)
+        i = bisect_right(self._cum, max(start, 0))
+        while i < len(self._starts) and start < stop:
+            first_pos = self._cum[i] - (self._stops[i] - self._starts[i])  # position of the interval's first sat
+            if first_pos >= stop:
+                break
+            ans.append(self._starts[i] + max(0, start - first_pos), self._stops[i] - max(0, self._cum[i] - stop))
+            i += 1
+        return ans
+
+    def distribute(self, values: Iterable[int]) -> tuple:
+        """=== Instance method =========================================================================================
+        Hands the sats out, first-in-first-out, to consecutive holders of the given values - the way the inputs of
+        a TX pass their sats on to its outputs. Intervals are split where a holder is full; nothing is copied sat
+        by sat. One pass over the intervals, whatever the number of holders.
+        :param values: iterable - of numbers of sats each holder receives, in order
+        :return: tuple - (list of RangeList: one per holder, RangeList: the sats left over - e.g. the fee)
+        ========================================================================================== by Sziller ==="""
+        holders = []
+        n = len(self._starts)
+        i, pos = 0, (self._starts[0] if n else 0)
+        for value in values:
+            holder = RangeList()
+            while value > 0 and i < n:
+                taken = min(value, self._stops[i] - pos)
+                holder.append(pos, pos + taken)
+                pos += taken
+                value -= taken
+                if pos == self._stops[i]:
+                    i += 1
+                    pos = self._starts[i] if i < n else pos
+            holders.append(holder)
+        rest = RangeList()
+        if i < n:
+            rest.append(pos, self._stops[i])
+            for j in range(i + 1, n):
+                rest.append(self._starts[j], self._stops[j])
+        return holders, rest
+
+    @classmethod
+    def concat(cls, range_lists: Iterable["RangeList"]) -> "RangeList":
+        """=== Classmethod =============================================================================================
+        :param range_lists: iterable - of RangeList objects, in order
+        :return: RangeList - all their intervals, one after the other
+        ========================================================================================== by Sziller ==="""
+        ans = cls()
+        for _ in range_lists:
+            ans.extend(_)
+        return ans
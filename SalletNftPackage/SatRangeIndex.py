@@ -0,0 +1,170 @@
+"""
+Persistent index of Ordinals resolved by the trackers.
+Tracking an output back to the coinbases is expensive, and users keep inspecting the same inscriptions and rare sats:
+every (outpoint, range) a tracker resolves is stored in SQLite, so later traces stop at any indexed ancestor.
+Stored intervals are also indexed by ordinal number (SQLite R*Tree), answering "which outpoint holds sat X".
+by Sziller
+"""
+
+import sqlite3
+import inspect
+import logging
+import threading
+from typing import Optional
+
+from SalletNftPackage.OrdinalRanges import RangeList
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('SatRangeIndex.py'))
+
+
+class SatRangeIndex(object):
+    """=== Class name: SatRangeIndex ===================================================================================
+    SQLite store of outpoint -> Ordinal ranges. Thread safe.
+    It answers the same <get()> / <put()> / <flush()> calls as OrdinalMemo: pass it to an OrdinalTracker as <memo>,
+    and the tracker both stops at - and adds to - the index.
+    Tables:
+    - resolved:     (outpoint, range of its sats) pairs resolved completely
+    - sat_range:    their Ordinals - one row per interval, with the position of its first sat in the outpoint
+    - sat_rtree:    the intervals by ordinal number - for reverse lookups (if SQLite has the R*Tree module)
+    :param db_path: str - path of the SQLite file (':memory:' for a throw-away index)
+    :param commit_every: int - writes are committed after this many stored ranges - and on <flush()> / <close()>
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, db_path: str, commit_every: int = 500):
+        self.db_path: str                   = db_path
+        self.commit_every: int              = commit_every
+        # -------------------------------------------------------------------
+        self._pending: int                  = 0     # stored ranges not committed yet
+        self._lock: threading.RLock         = threading.RLock()
+        self.hits: int                      = 0
+        self.misses: int                    = 0
+        self._db: sqlite3.Connection        = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS resolved (id INTEGER PRIMARY KEY, txid TEXT NOT NULL, "
+                         "n INTEGER NOT NULL, rng_start INTEGER NOT NULL, rng_stop INTEGER NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS resolved_outpoint ON resolved (txid, n)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sat_range (id INTEGER PRIMARY KEY, "
+                         "resolved_id INTEGER NOT NULL, pos INTEGER NOT NULL, "
+                         "ord_start INTEGER NOT NULL, ord_stop INTEGER NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sat_range_resolved ON sat_range (resolved_id, pos)")
+        self.rtree: bool                    = True
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS sat_rtree USING rtree(id, ord_lo, ord_hi)")
+        except sqlite3.OperationalError:  # SQLite built without R*Tree: reverse lookups scan by ordinal start
+            self._db.execute("CREATE INDEX IF NOT EXISTS sat_range_ordinal ON sat_range (ord_start)")
+            self.rtree = False
+        self._db.commit()
+        lg.debug("instant.ed: {} - db: {} - rtree: {}".format(self.ccn, db_path, self.rtree))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM resolved").fetchone()[0]
+
+    def close(self):
+        """=== Instance method =========================================================================================
+        Commits pending writes, and closes the database.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def flush(self):
+        """=== Instance method =========================================================================================
+        Commits pending writes - called by the tracker once its trace is finished.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    # --- tracker interface ------------------------------------------------------------------------------------------
+
+    def get(self, txid: str, n: int, rng: range) -> Optional[RangeList]:
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID of the outpoint
+        :param n: int - index of the outpoint
+        :param rng: range - o_op_crp_rng: sats of the outpoint in question
+        :return: RangeList or None - Ordinals of the sats, None if not indexed
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            row = self._db.execute("SELECT id, rng_start FROM resolved WHERE txid = ? AND n = ? "
+                                   "AND rng_start <= ? AND rng_stop >= ? LIMIT 1",
+                                   (txid, n, rng.start, rng.stop)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            resolved_id, rng_start = row
+            ordinals = RangeList()
+            for ord_start, ord_stop in self._db.execute("SELECT ord_start, ord_stop FROM sat_range "
+                                                        "WHERE resolved_id = ? ORDER BY pos", (resolved_id,)):
+                ordinals.append(ord_start, ord_stop)
+            self.hits += 1
+        return ordinals.slice(rng.start - rng_start, rng.stop - rng_start)
+
+    def put(self, txid: str, n: int, rng: range, ordinals: RangeList):
+        """=== Instance method =========================================================================================
+        Stores the Ordinals of sats <rng> of an outpoint - replacing ranges of the outpoint it covers.
+        :param txid: str - transaction ID of the outpoint
+        :param n: int - index of the outpoint
+        :param rng: range - o_op_crp_rng: sats of the outpoint resolved
+        :param ordinals: RangeList - their Ordinals, in order
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            covered = [_[0] for _ in self._db.execute("SELECT id FROM resolved WHERE txid = ? AND n = ? "
+                                                      "AND rng_start >= ? AND rng_stop <= ?",
+                                                      (txid, n, rng.start, rng.stop))]
+            for resolved_id in covered:
+                self._delete(resolved_id)
+            resolved_id = self._db.execute("INSERT INTO resolved (txid, n, rng_start, rng_stop) VALUES (?, ?, ?, ?)",
+                                           (txid, n, rng.start, rng.stop)).lastrowid
+            pos = rng.start
+            for ord_start, ord_stop in ordinals.intervals():
+                row_id = self._db.execute("INSERT INTO sat_range (resolved_id, pos, ord_start, ord_stop) "
+                                          "VALUES (?, ?, ?, ?)", (resolved_id, pos, ord_start, ord_stop)).lastrowid
+                if self.rtree:
+                    self._db.execute("INSERT INTO sat_rtree (id, ord_lo, ord_hi) VALUES (?, ?, ?)",
+                                     (row_id, ord_start, ord_stop - 1))
+                pos += ord_stop - ord_start
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.flush()
+
+    # --- reverse lookup ---------------------------------------------------------------------------------------------
+
+    def holders_of(self, ordinal: int) -> list:
+        """=== Instance method =========================================================================================
+        Which indexed outpoints hold the sat of <ordinal>? A sat passes through many outputs: every indexed one is
+        returned - the traced outputs, and the ancestors resolved on the way.
+        :param ordinal: int - ordinal number of a sat
+        :return: list - of (txid, n, pos) tuples: outpoint, and the position of the sat in it
+        ========================================================================================== by Sziller ==="""
+        if self.rtree:  # R*Tree bounds are rounded outwards: candidates are checked against the exact intervals
+            query = ("SELECT r.txid, r.n, s.pos + ? - s.ord_start FROM sat_rtree t "
+                     "JOIN sat_range s ON s.id = t.id JOIN resolved r ON r.id = s.resolved_id "
+                     "WHERE t.ord_lo <= ? AND t.ord_hi >= ? AND s.ord_start <= ? AND s.ord_stop > ?")
+            params = (ordinal,) * 5
+        else:
+            query = ("SELECT r.txid, r.n, s.pos + ? - s.ord_start FROM sat_range s "
+                     "JOIN resolved r ON r.id = s.resolved_id WHERE s.ord_start <= ? AND s.ord_stop > ?")
+            params = (ordinal,) * 3
+        with self._lock:
+            return [tuple(_) for _ in self._db.execute(query, params)]
+
+    # --- internals --------------------------------------------------------------------------------------------------
+
+    def _delete(self, resolved_id: int):
+        """=== Internal utility method =================================================================================
+        Deletes a resolved range and its intervals. Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        if self.rtree:
+            self._db.execute("DELETE FROM sat_rtree WHERE id IN (SELECT id FROM sat_range WHERE resolved_id = ?)",
+                             (resolved_id,))
+        self._db.execute("DELETE FROM sat_range WHERE resolved_id = ?", (resolved_id,))
+        self._db.execute("DELETE FROM resolved WHERE id = ?", (resolved_id,))
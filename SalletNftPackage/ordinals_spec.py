@@ -1,3 +1,16 @@
+from bisect import bisect_right
+
+from SalletNftPackage.OrdinalRanges import RangeList
+
+try:
+    import numpy as np  # optional: only needed by the vectorized conversions
+except ImportError:
+    np = None
+
+HALVING_INTERVAL: int = 210_000                 # blocks of one halving epoch
+INITIAL_SUBSIDY: int = 50 * 100_000_000         # subsidy of epoch 0 in sats
+LAST_EPOCH: int = 33                            # 50 btc >> 33 == 0: no sats are issued from this epoch on
+
 
 # subsidy of block at given height
 def subsidy(height: int) -> int:
@@ -19,19 +32,83 @@ def subsidy(height: int) -> int:
     return 50 * 100_000_000 >> height // 210_000  # 50: original fee, 100_000_000 to convert fee to satoshis
 
 
+# first ordinal of every halving epoch: the sum of all subsidies of the epochs before it - the last one is total supply
+EPOCH_FIRST_ORDINAL: list = [0]
+for _epoch in range(LAST_EPOCH):
+    EPOCH_FIRST_ORDINAL.append(EPOCH_FIRST_ORDINAL[-1] + HALVING_INTERVAL * (INITIAL_SUBSIDY >> _epoch))
+TOTAL_SUPPLY: int = EPOCH_FIRST_ORDINAL[-1]
+
+
 # first ordinal of subsidy of block at given height
-def first_ordinal(height):
+def first_ordinal(height: int) -> int:
     """=== Function name: first_ordinal ================================================================================
     Counting all the issued satoshis up until given block.
     Basically adding-up all subsidies till the height entered.
     0-49, 50-99, 100-149...
     height 3 means, we add up the subsidies of each block (_) before entered height.
     the number of sats up to a sat equals the ordinal of that sat.
+    Inside a halving epoch every block has the same subsidy: so instead of adding them up one by one, the sats of
+    all epochs before are looked up, and the blocks of the current epoch are multiplied by the subsidy.
+    :param height: integer - sequence number of given block
+    :return: integer - ordinal of the first sat of the subsidy of given block
     ========================================================================= by Casey - explained by Sziller ==="""
-    start = 0
-    for _ in range(height):  # 0 <= _ < height - never reaching height entered: so all sats BEFORE current height added.
-        start += subsidy(_)
-    return start
+    epoch = min(height // HALVING_INTERVAL, LAST_EPOCH)
+    return EPOCH_FIRST_ORDINAL[epoch] + (height - epoch * HALVING_INTERVAL) * subsidy(height)
+
+
+# block of subsidy the sat of given ordinal was created in
+def sat_to_block(ordinal: int) -> tuple:
+    """=== Function name: sat_to_block =================================================================================
+    Inverse of first_ordinal: finding the block whose subsidy created the sat of the given ordinal.
+    The epoch is found among the (34) epoch starts, the block inside the epoch by a division - no iteration.
+    :param ordinal: integer - ordinal number of a sat: 0 <= ordinal < TOTAL_SUPPLY
+    :return: tuple - (height, epoch, offset): height of the block, its halving epoch, and the place of the sat
+                     inside the subsidy of the block (0: first sat of the subsidy)
+    ============================================================================================== by Sziller ==="""
+    if not 0 <= ordinal < TOTAL_SUPPLY:
+        raise ValueError("ordinal out of range: {} - must be in 0 - {}".format(ordinal, TOTAL_SUPPLY - 1))
+    epoch = bisect_right(EPOCH_FIRST_ORDINAL, ordinal) - 1
+    blocks, offset = divmod(ordinal - EPOCH_FIRST_ORDINAL[epoch], INITIAL_SUBSIDY >> epoch)
+    return epoch * HALVING_INTERVAL + blocks, epoch, offset
+
+
+def _require_numpy():
+    """=== Function name: _require_numpy ===============================================================================
+    ============================================================================================== by Sziller ==="""
+    if np is None:
+        raise ImportError("numpy is needed for vectorized ordinal conversions: pip install numpy")
+
+
+# first ordinals of subsidies of blocks at given heights - vectorized
+def first_ordinals(heights) -> "np.ndarray":
+    """=== Function name: first_ordinals ===============================================================================
+    first_ordinal() of many heights at once.
+    :param heights: array-like of integers - sequence numbers of blocks
+    :return: np.ndarray of int64 - ordinal of the first sat of the subsidy of each block
+    ============================================================================================== by Sziller ==="""
+    _require_numpy()
+    heights = np.asarray(heights, dtype=np.int64)
+    epochs = np.minimum(heights // HALVING_INTERVAL, LAST_EPOCH)
+    subsidies = np.right_shift(np.int64(INITIAL_SUBSIDY), epochs)
+    return np.asarray(EPOCH_FIRST_ORDINAL, dtype=np.int64)[epochs] + (heights - epochs * HALVING_INTERVAL) * subsidies
+
+
+# blocks of subsidies the sats of given ordinals were created in - vectorized
+def sats_to_blocks(ordinals) -> tuple:
+    """=== Function name: sats_to_blocks ===============================================================================
+    sat_to_block() of many ordinals at once - e.g. of the starts of a list of ordinal ranges:
+    sats_to_blocks([_.start for _ in ranges])
+    :param ordinals: array-like of integers - ordinal numbers of sats: 0 <= ordinal < TOTAL_SUPPLY
+    :return: tuple - of three np.ndarray of int64: (heights, epochs, offsets)
+    ============================================================================================== by Sziller ==="""
+    _require_numpy()
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    if ordinals.size and (ordinals.min() < 0 or ordinals.max() >= TOTAL_SUPPLY):
+        raise ValueError("ordinal out of range - must be in 0 - {}".format(TOTAL_SUPPLY - 1))
+    epoch_starts = np.asarray(EPOCH_FIRST_ORDINAL, dtype=np.int64)
+    epochs = np.searchsorted(epoch_starts, ordinals, side="right") - 1
+    blocks, offsets = np.divmod(ordinals - epoch_starts[epochs], np.right_shift(np.int64(INITIAL_SUBSIDY), epochs))
+    return epochs * HALVING_INTERVAL + blocks, epochs, offsets
 
 
 # assign ordinals in given block
@@ -55,40 +132,40 @@ def assign_ordinals(block):
     [f1]                            [f rest]
     [f2]
     So outputs ordinals of 'a' to 'f' are inherited from input sordinals 'a' to 'f'
-    :param block: 
+    Ordinals are held as RangeList-s of intervals: handing them on splits intervals, it never lists sats one by one.
+    :param block: block object - having <height> and <transactions>; each TX having <inputs> (with <ordinals>: a
+                  RangeList) and <outputs> (with <value> in sats) - <ordinals> of the outputs are set here
     :return: 
     ========================================================================= by Casey - explained by Sziller ==="""
     first = first_ordinal(block.height)     # getting ordinal of 1st coinbase sat - the way block is ever represented
     last = first + subsidy(block.height)    # getting ordinal of last sat created in coinbase (as fee)
-    coinbase_ordinals = list(range(first, last))  # setting up a range of all sat's newly issued in 'block's coinbase
+    coinbase_ordinals = RangeList([range(first, last)])  # all sat's newly issued in 'block's coinbase - as one interval
     
     # as an interim result: <coinbase_ordinals> include n piece of ordinal numbers, in sequence. n = subsidy
     
     # the TX-by-TX process assumes all TXs' inputs each having an 'ordinal-registry', and creates one for the outputs'.
     for transaction in block.transactions[1:]:  # looping through all TX's in block, starting at 1 - omitting coinbase
-        ordinals = []  # an empty list of ordinals for present TX is created
-        for inp in transaction.inputs:  # for each input in present TX
-            ordinals.extend(inp.ordinals)  # the list of said inputs ordinal's is added to the <ordinals> list
+        # all INCOMING ordinals of the TX, input after input in the conventional sequence
+        ordinals = RangeList.concat(inp.ordinals for inp in transaction.inputs)
         
         # While processing a given block, for each non-coinbase transaction...
         # ...as an interim result: we have all incoming ordinals in the conventional sequence accounted for.
         # they are all stored in <ordinals>. e.g.: [41, 201, 100, 101, 102, 20, 21, 225, 226, 55, 56]
         # this is a sequence of all INCOMING ordinals, which will be re-distributed by the following code section:
         
-        for output in transaction.outputs:  # we now loop through same TX's outputs
-            # defining present outputs ordinals: putting in as many of the
-            # leading ordinal numbers into current ordinals, as sats there
-            # are in the output
-            output.ordinals = ordinals[:output.value]
-            del ordinals[:output.value]  # deleting just assigned ordinals from 'still available' set.
+        # each output takes as many of the leading ordinals, as sats there are in it - the rest is the fee
+        holders, fee_ordinals = ordinals.distribute(output.value for output in transaction.outputs)
+        for output, holder in zip(transaction.outputs, holders):
+            output.ordinals = holder
 
-        coinbase_ordinals.extend(ordinals)  # present TX's not spent sats (ord-by-ord) are attached to coinbase ords.
+        coinbase_ordinals.extend(fee_ordinals)  # present TX's not spent sats are attached to coinbase ords.
 
-    for output in block.transaction[0].outputs:
-        output.ordinals = coinbase_ordinals[:output.value]
-        del coinbase_ordinals[:output.value]
+    holders, _ = coinbase_ordinals.distribute(output.value for output in block.transactions[0].outputs)
+    for output, holder in zip(block.transactions[0].outputs, holders):
+        output.ordinals = holder
 
 
 if __name__ == "__main__":
     print(subsidy(420_001))
     print(first_ordinal(420_001))
+    print(sat_to_block(first_ordinal(420_001) + 7))
@@ -31,28 +31,130 @@ This way the function sets the < o_op_crp_rng > = < o_op_tot_rng > and considers
 
 import logging
 import inspect
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 
-import bitcoinlib.transactions
-
+from SalletNodePackage import RawTxParser
 from SalletBasePackage.models import UtxoId
 from SalletNodePackage.BitcoinNodeObject import Node
+from SalletNftPackage import ordinals_spec as orsp
+from SalletNftPackage.OrdinalRanges import RangeList
 
 
 lg = logging.getLogger(__name__)
 lg.info("START: {:>85} <<<".format('ordinaltracker.py'))
 
 
+class OrdinalMemo:
+    """=== Class name: OrdinalMemo =====================================================================================
+    Memory of (outpoint, range) -> Ordinals resolved by trackers. Share one among trackers: a trace reaching an
+    outpoint a previous trace has resolved stops there. A request for a sub-range of a resolved range is served too.
+    The least recently used outpoints are dropped beyond <max_outpoints>.
+    :param max_outpoints: int - number of outpoints kept (default is 100_000)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, max_outpoints: int = 100_000):
+        self.max_outpoints: int                                 = max_outpoints
+        self._entries: OrderedDict                              = OrderedDict()  # key: (txid, n), value: list
+        self.hits: int                                          = 0
+        self.misses: int                                        = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, txid: str, n: int, rng: range) -> Optional[RangeList]:
+        """=== Method name: get ========================================================================================
+        :param txid: str - transaction ID of the outpoint
+        :param n: int - index of the outpoint
+        :param rng: range - o_op_crp_rng: sats of the outpoint in question
+        :return: RangeList or None - Ordinals of the sats, None if not resolved yet
+        ========================================================================================== by Sziller ==="""
+        entries = self._entries.get((txid, n))
+        if entries:
+            for start, stop, ordinals in entries:
+                if start <= rng.start and rng.stop <= stop:
+                    self._entries.move_to_end((txid, n))
+                    self.hits += 1
+                    return ordinals.slice(rng.start - start, rng.stop - start)
+        self.misses += 1
+        return None
+
+    def flush(self):
+        """=== Method name: flush ======================================================================================
+        Nothing to write: the memo lives in memory. (Persistent memos - SatRangeIndex - commit here.)
+        ========================================================================================== by Sziller ==="""
+        pass
+
+    def put(self, txid: str, n: int, rng: range, ordinals: RangeList):
+        """=== Method name: put ========================================================================================
+        :param txid: str - transaction ID of the outpoint
+        :param n: int - index of the outpoint
+        :param rng: range - o_op_crp_rng: sats of the outpoint resolved
+        :param ordinals: RangeList - their Ordinals, in order
+        ========================================================================================== by Sziller ==="""
+        entries = self._entries.setdefault((txid, n), [])
+        entries[:] = [_ for _ in entries if not (rng.start <= _[0] and _[1] <= rng.stop)]  # covered ones dropped
+        entries.append((rng.start, rng.stop, ordinals))
+        self._entries.move_to_end((txid, n))
+        while len(self._entries) > self.max_outpoints:
+            self._entries.popitem(last=False)
+
+
+class _Request:
+    """=== Class name: _Request ========================================================================================
+    One item of the tracker's frontier: sats <rng> of outpoint <txid>:<n>, being the sats at <offset> onwards of
+    its <parent>'s sats. Parts of the answer come from <children> - in order.
+    Requests of a level on overlapping or adjacent sats of the same outpoint are merged into one, with no parent:
+    its answer is sliced to its <waiters> - the requests merged.
+    ============================================================================================== by Sziller ==="""
+    __slots__ = ("txid", "n", "rng", "offset", "parent", "children", "open", "ordinals", "complete", "waiters")
+
+    def __init__(self, txid: str, n: int, rng: range, offset: int = 0, parent=None):
+        self.txid: str                                          = txid
+        self.n: int                                             = n
+        self.rng: range                                         = rng
+        self.offset: int                                        = offset
+        self.parent: Optional[_Request]                         = parent
+        self.children: list                                     = []
+        self.open: int                                          = 0     # children not resolved yet
+        self.ordinals: Optional[RangeList]                      = None
+        self.complete: bool                                     = True  # False: some sats reached fees
+        self.waiters: (list, tuple)                             = ()    # requests merged into this one
+
+
 class OrdinalTracker:
     """=== Class name: Track ===========================================================================================
-    Class wrapped around recursive method in order to not have to roll cumulative data
+    Tracks the Ordinals of an output (or of a range of its sats) backwards, to the coinbase TXs the sats were
+    created in. No recursion: outpoints to be resolved wait in a frontier, handled level by level (breadth-first) - so
+    histories of any depth can be followed. The parent TXs of a level are fetched concurrently; outpoints of the same
+    parent TX on a level are handled together: the parent is fetched once. Overlapping or adjacent ranges of the same
+    outpoint on a level are merged: traced once, the answer sliced back to each. Resolved (outpoint, range) pairs are
+    remembered in <memo> - pass the same memo to the next tracker to reuse this trace's work.
+    Sats reaching a coinbase beyond its subsidy came from fees: their further history is not followed - they are
+    listed in <unresolved> instead.
+    :param node: Node - the node asked
+    :param init_output_id: UtxoId - the output traced
+    :param o_op_crp_rng: range or None - sats of the output traced, None: all of them
+    :param memo: OrdinalMemo, SatRangeIndex or None - memory of resolved outpoints - SatRangeIndex keeps it on disk,
+                                None: the tracker gets its own OrdinalMemo
+    :param max_concurrency: int - threads fetching a level of parent TXs concurrently (default is 8) - calls in
+                                flight towards the node are capped by its <call_slots>, shared by every tracker
     ============================================================================================== by Sziller ==="""
-    def __init__(self, node: Node, init_output_id: UtxoId, o_op_crp_rng: (range, None) = None):
+    def __init__(self, node: Node, init_output_id: UtxoId, o_op_crp_rng: (range, None) = None,
+                 memo: Optional[OrdinalMemo] = None, max_concurrency: int = 8):
         self.node: Node                                         = node
         self.ordinals_collection: list[(range, None)]           = []  # cumulative data to store Ordinal-ranges
         self.init_output_id: UtxoId                             = init_output_id
         self.init_op_crp_rng: (range, None)                     = o_op_crp_rng
+        self.memo: OrdinalMemo                                  = memo if memo is not None else OrdinalMemo()
+        self.max_concurrency: int                               = max_concurrency
         
-        self.depth: int                                         = 0
+        self.depth: int                                         = 0     # levels of the frontier handled
+        self.result: Optional[RangeList]                        = None  # Ordinals of the traced sats, in order
+        self.unresolved: list                                   = []    # (root_pos, outpoint, range) - fee sats
+        self.txs_fetched: int                                   = 0
         
         lg.warning("=== INCOMING ====================================================================   START  =")
         lg.warning("op_id: {}".format(self.init_output_id))
@@ -91,152 +193,256 @@ class OrdinalTracker:
         ans = range(max(rng_x.start, rng_y.start), min(rng_x.stop, rng_y.stop))
         return ans if len(ans) else False
         
-    def track(self):
+    def track(self) -> RangeList:
         """=== Method name: run ========================================================================================
-        Activates the recursive process
+        Runs the whole trace. Results are in <result> (and, as a list of ranges, in <ordinals_collection>).
+        :return: RangeList - Ordinals of the traced sats, in order
         ========================================================================================== by Sziller ==="""
-        self.rec_ordinal_calc(output_id=self.init_output_id, rng=self.init_op_crp_rng)
+        for _ in self.iter_track():
+            pass
+        return self.result
     
-    def rec_ordinal_calc(self, output_id: UtxoId, rng: (range, None)):
-        """=== Method name: rec_ordinal_calc =========================================================================
-        This is a function to calculate a given outputs Ordinal numbers.
-        It can work recursively as the basic working principle repeats all the way to the coinbase subsiby, where
-        - if arrived at - the Ordinals are calculated.
-        Function however already considers Ordinal calculation specification as part of its algorithm,
-        so it's not enough to simply replace fimal ordinal calc, in case spec. is changed.
-        
-        This function takes:
-        - an output of a given TX (it's outpoint ID - TX ID + index == 36bytes in TX)
-        - and the range of satoshies the user wants to calculate Ordinals for
-        ...and does one of the following 2 things:
-        - returns the same 2 data for the TX's relevant inputs, as was granted for IT, thus recourivelly calling itself.
-        - or - if it arrives at a subsiby - originated range, it returns Ordinals.
-        
-        The whole repetition goes on until all sats in the entered range are being labelled with Ordinals.
-        tbd...
-        :param output_id: class - UtxoID - the ID defining a unique output on the Blockchain
-        :param rng: an o_op_crp_rng:
-        - o:    output side - of the TX
-        - op:   output level - ordinals
-        - crp:  cropped - the continous range of satoshies to be assigned Ordinals (blockchain lvl) to.
-        - rng:  range - as it is easier to store both for performance and practical reasons.
-        ============================================================================================== by Sziller ==="""
+    def iter_track(self) -> Iterator[tuple]:
+        """=== Method name: iter_track =================================================================================
+        Runs the trace, streaming results as soon as they are final: (root_pos, RangeList) - the Ordinals of the
+        traced sats at positions root_pos onwards. Pieces arrive in no particular order; sats of fees are streamed
+        as (root_pos, None) once reached.
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name
-        lg.info("[- HINT -]: {:>5} - {:>72} {}".format(self.depth, cmn, "<<<"))
-        # ---------------------------------------------------------------------------------------------------
-        # - general TX data (tx)
-        # ---------------------------------------------------------------------------------------------------
-        # Node-independent TX query: raw ty in binary format. (hex-string)
-        tx_data_raw = self.node.nodeop_getrawtransaction(tx_hash=output_id.txid, verbose=False)
-        tx_data = bitcoinlib.transactions.Transaction.parse(tx_data_raw).as_dict()
-        try:
-            output_data = tx_data['outputs'][output_id.n]
-        except IndexError:
-            msg = "IndexError: TX has no outpoint defined by UtxoId!"
-            lg.critical(msg)
-            raise Exception(msg)
-        lg.warning("processing: {}".format(output_id.txid))
-        
-        lg.info("==== TX data =========================================================== START ===")
-        lg.info("_ IN:  {:>3} ______________________________________________________________________________"
-              .format(len(tx_data["inputs"])))
-        # for _ in tx_data["inputs"]:
-        #     lg.debug("{}".format(_))
-        lg.info("_ OUT: {:>3} ______________________________________________________________________________"
-              .format(len(tx_data["outputs"])))
-        # for _ in tx_data["outputs"]:
-        #     lg.debug("{}".format(_))
-        lg.info("==== TX data =========================================================== ENDED ===")
-        lg.info("==== output data ======================================================= START ===")
-        lg.info(output_data)
-        lg.info("==== output data ======================================================= ENDED ===")
-        # ---------------------------------------------------------------------------------------------------
-        # - output side (o)
-        # ---------------------------------------------------------------------------------------------------
-        # preparation                                                                   START   -
-        
-        # total value spent in output in question: < output_value_tot >
-        # output_value_tot = int(round(output_data['value'] * (10 ** 8), 8))
-        output_value_tot = output_data['value']
-        # reading of or setting default to < rng > - this is the < o_op_crp_rng > range of the entered output.
-        rng = range(0, output_value_tot) if rng is None else rng
-        lg.debug("default   : <o_tx_crp_rng> ")
-        # length measured: number of satoshis in range
-        output_sum = len(rng)  # the value (or number of sats) included in the range entered
-        # INFO level logging of method call
-        lg.info("{} > {} / {}".format(output_id.__repr__(), output_sum, output_value_tot))
-        lg.info("")
-        if output_sum > output_value_tot:  # or (rng.stop > output_value):
-            raise Exception("Range entered is too long! rng (entered): {} - of length: {}\n"
-                            "max. output_value_tot: (allowed) {}".format(rng, output_sum, output_value_tot))
-        # preparation                                                                   ENDED   -
-
-        # conversion o_op_crp_rng -> o_tx_crp_rng                                       START   -
-        # calculating the place of satoshis in question inside the transaction
-        o_tx_crp_rng = False
-        o_val: int = 0
-        for _ in range(output_id.n + 1):  # iterating through tx-outpoints till and including current one
-            # add = int(round(tx_data['outputs'][_]['value'] * 10 ** 8, 8))  # CHECK !!! 8 at end?!!!
-            o_tx_crp_rng = range(o_val + rng.start, o_val + rng.stop)
-            add = tx_data['outputs'][_]['value']
-            o_val += add
-            lg.debug("value     : of output_id nr.{:>3}/{:>3} - {:>35} - {:14.8f}<<<"
-                     .format(_, output_id.n, str(range(o_val - add, o_val)), add / 10**8))
-        lg.warning("[- HINT -]: of output_id nr.{:>3}/{:>3} - {:>35} - {:<14} sat<<<"
-                .format(output_id.n, output_id.n, str(o_tx_crp_rng), output_sum))
-        # conversion o_op_crp_rng -> o_tx_crp_rng                                       ENDED   -
-        
-        # At this stage the range of sats is the chosen output is represented as local ordinals on tx level.
-        # this tx lvl ordinal is used on the input side!
-
-        # ---------------------------------------------------------------------------------------------------
-        # - input side (i)
-        # ---------------------------------------------------------------------------------------------------
-        # preparation                                                                   START   -
-        input_sum = 0
-        inp_cum_val = 0
-        input_nr = 0
-        is_coinbase = self.check_if_coinbase(tx_data_hxstr=tx_data_raw)
-        lg.info("Coinbase TX: {:>5}".format(str(is_coinbase)))
-        # preparation                                                                   ENDED   -
-        
-        if is_coinbase:
-            # Input side - coinbase transaction                                                 START   -
-            lg.error("we reached a coinbase TX")
-            # Input side - coinbase transaction                                                 ENDED   -
-        else:
-            # Input side - regular transaction                                                  START   -
-            while input_sum < output_sum:
-                # print(tx_data["inputs"])
-                print("check input: {}".format(input_nr))
-                act_input = tx_data["inputs"][input_nr]
-                lg.info("loop      : Actual input number:{c:>3}{i:>67}{c:>3}".format(**{'c': input_nr, 'i': "<<< input"}))
-                op_id = UtxoId.construct({"txid": act_input['prev_txid'], "n": act_input['output_n']})  # creating matching outputs outpoint ID
-                curr_output_value = self.node.nodeop_get_tx_outpoint_value(tx_outpoint=op_id)
-                lg.info("curr value: {}".format(curr_output_value))
-                
+        self.depth, self.unresolved, self.txs_fetched = 0, [], 0
+        # without a range entered, the range is the entire output - set once the output's value is read
+        root = _Request(txid=self.init_output_id.txid, n=self.init_output_id.n, rng=self.init_op_crp_rng)
+        frontier: deque = deque([root])
+        while frontier:
+            level = list(frontier)
+            frontier.clear()
+            lg.info("[- HINT -]: {:>5} - {:>72} {}".format(self.depth, cmn, "<<<"))
+            lg.info("level     : {:>5} outpoints".format(len(level)))
+            pending: list = []
+            for req in level:
+                ordinals = None if req.rng is None else self.memo.get(req.txid, req.n, req.rng)
+                if ordinals is not None:
+                    yield from self._stream(req, 0, ordinals)
+                    self._resolve(req, ordinals)
+                else:
+                    pending.append(req)
+            by_parent: dict = {}  # outpoints of the same TX: handled together, the TX fetched once
+            for req in self._merge(pending):
+                by_parent.setdefault(req.txid, []).append(req)
+            fetched = self._fetch_level(list(by_parent)) if by_parent else {}
+            for txid, reqs in by_parent.items():
+                yield from self._expand(txid=txid, reqs=reqs, fetched=fetched[txid], frontier=frontier)
+            self.depth += 1
+        self.memo.flush()
+        self.result = root.ordinals
+        self.ordinals_collection = root.ordinals.to_ranges()
+        lg.warning("tracked   : {} - {} Ordinal ranges - {} TXs fetched - {} levels - {} sats unresolved"
+                   .format(self.init_output_id, len(root.ordinals), self.txs_fetched, self.depth,
+                           sum(len(_[2]) for _ in self.unresolved)))
+
+    @staticmethod
+    def _merge(reqs: list) -> list:
+        """=== Method name: _merge =====================================================================================
+        Merges requests on overlapping or adjacent sats of the same outpoint: each group is replaced by one request
+        on the union of their ranges - its answer is sliced back to the requests merged (<waiters>) when resolved.
+        Without it, every duplicate would be traced on its own, down to the coinbase.
+        :param reqs: list - of _Request-s of a level
+        :return: list - of _Request-s to be expanded
+        ========================================================================================== by Sziller ==="""
+        by_outpoint: dict = {}
+        for req in reqs:
+            by_outpoint.setdefault((req.txid, req.n), []).append(req)
+        ans = []
+        for (txid, n), group in by_outpoint.items():
+            if len(group) == 1 or any(_.rng is None for _ in group):  # no range: only the root - alone on its level
+                ans.extend(group)
+                continue
+            group.sort(key=lambda _: _.rng.start)
+            clusters = [[group[0]]]
+            stop = group[0].rng.stop
+            for req in group[1:]:
+                if req.rng.start > stop:
+                    clusters.append([])
+                    stop = req.rng.stop
+                else:
+                    stop = max(stop, req.rng.stop)
+                clusters[-1].append(req)
+            for cluster in clusters:
+                if len(cluster) == 1:
+                    ans.append(cluster[0])
+                    continue
+                merged = _Request(txid=txid, n=n, rng=range(cluster[0].rng.start, max(_.rng.stop for _ in cluster)))
+                merged.waiters = cluster
+                lg.debug("merged    : {} requests on {}_{} - {}".format(len(cluster), txid, n, merged.rng))
+                ans.append(merged)
+        return ans
+
+    @staticmethod
+    def _root_pieces(req: _Request, offset: int, length: int) -> list:
+        """=== Method name: _root_pieces ===============================================================================
+        Maps <length> sats of <req> at <offset> onwards to the positions in the traced output they are at: walking up
+        the parents - split up among the <waiters> of merged requests on the way.
+        :return: list - of (root_pos, offset in <req>, length) tuples
+        ========================================================================================== by Sziller ==="""
+        ans = []
+        stack = [(req, offset, offset, length)]  # request reached, position in it, position in <req>, length
+        while stack:
+            curr, pos, req_pos, size = stack.pop()
+            while curr.parent is not None:
+                pos += curr.offset
+                curr = curr.parent
+            if not curr.waiters:
+                ans.append((pos, req_pos, size))
+                continue
+            for waiter in curr.waiters:
+                start = max(curr.rng.start + pos, waiter.rng.start)
+                stop = min(curr.rng.start + pos + size, waiter.rng.stop)
+                if start < stop:
+                    stack.append((waiter, start - waiter.rng.start, req_pos + start - curr.rng.start - pos,
+                                  stop - start))
+        return ans
+
+    def _stream(self, req: _Request, offset: int, ordinals: RangeList) -> Iterator[tuple]:
+        """=== Method name: _stream ====================================================================================
+        Streams the final Ordinals of the sats of <req> at <offset> onwards: as (root_pos, RangeList) pieces.
+        ========================================================================================== by Sziller ==="""
+        length = ordinals.value
+        for root_pos, pos, size in self._root_pieces(req, offset, length):
+            if size == length:
+                yield root_pos, ordinals
+            else:
+                yield root_pos, ordinals.slice(pos - offset, pos - offset + size)
+
+    def _fetch_level(self, txids: list) -> dict:
+        """=== Method name: _fetch_level ===============================================================================
+        Fetches every parent TX of a frontier level concurrently, by a pool of threads: each TX with the values of
+        all its inputs, in one call (RPC: the raw TX comes with the verbosity 2 answer). Calls in flight towards the
+        node are capped by its <call_slots>, counting the calls of every tracker using the same Node.
+        :param txids: list - of transaction IDs
+        :return: dict - key: txid, value: (ParsedTx, list of input values in sats - None for coinbase TXs)
+        ========================================================================================== by Sziller ==="""
+        def fetch(txid: str) -> tuple:
+            with self.node.call_slots:
+                tx_data_raw, values = self.node.nodeop_get_input_values_sat(tx_hash=txid, with_raw=True)
+            # only prevouts and output values are needed: raw bytes are walked, no TX object is built
+            parsed = RawTxParser.parse_tx(tx_data_raw)
+            return parsed, None if parsed.is_coinbase else values
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(txids)))) as executor:
+            fetched = dict(zip(txids, executor.map(fetch, txids)))
+        self.txs_fetched += len(fetched)
+        return fetched
+
+    def _expand(self, txid: str, reqs: list, fetched: tuple, frontier: deque) -> Iterator[tuple]:
+        """=== Method name: _expand ====================================================================================
+        Handles all requested outpoints of ONE TX: maps their sats onto the inputs - appending the inputs involved to
+        <frontier> - or, in a coinbase TX, onto the sats of the subsidy.
+        ========================================================================================== by Sziller ==="""
+        tx_data, input_values = fetched
+        output_starts = [0]  # o_tx position of the first sat of each output
+        for value in tx_data.values:
+            output_starts.append(output_starts[-1] + value)
+        coinbase_first = coinbase_subsidy = None
+        for req in reqs:
+            try:
+                output_value_tot = tx_data.values[req.n]
+            except IndexError:
+                msg = "IndexError: TX has no outpoint defined by UtxoId!"
+                lg.critical(msg)
+                raise Exception(msg)
+            if req.rng is None:
+                req.rng = range(0, output_value_tot)
+            if req.rng.stop > output_value_tot or req.rng.start < 0:
+                raise Exception("Range entered is too long! rng (entered): {} - of length: {}\n"
+                                "max. output_value_tot: (allowed) {}".format(req.rng, len(req.rng), output_value_tot))
+            # conversion o_op_crp_rng -> o_tx_crp_rng
+            o_tx_crp_rng = range(output_starts[req.n] + req.rng.start, output_starts[req.n] + req.rng.stop)
+            lg.debug("outpoint  : {}_{} - {} -> {}".format(txid, req.n, req.rng, o_tx_crp_rng))
+
+            if tx_data.is_coinbase:
+                if coinbase_first is None:
+                    height = self._block_height(txid)
+                    coinbase_first, coinbase_subsidy = orsp.first_ordinal(height), orsp.subsidy(height)
+                    lg.info("Coinbase TX: {} - in block:{:>8}".format(txid, height))
+                ordinals = RangeList()
+                subsidy_part = self.range_overlap(o_tx_crp_rng, range(0, coinbase_subsidy))
+                if subsidy_part:
+                    ordinals.append(coinbase_first + subsidy_part.start, coinbase_first + subsidy_part.stop)
+                if o_tx_crp_rng.stop > coinbase_subsidy:
+                    fee_part = range(max(o_tx_crp_rng.start, coinbase_subsidy), o_tx_crp_rng.stop)
+                    for fee_pos, pos, size in self._root_pieces(req, fee_part.start - o_tx_crp_rng.start,
+                                                                len(fee_part)):
+                        self.unresolved.append((fee_pos, UtxoId(txid=txid, n=req.n),
+                                                range(req.rng.start + pos, req.rng.start + pos + size)))
+                        yield fee_pos, None
+                    req.complete = False
+                if subsidy_part:
+                    yield from self._stream(req, 0, ordinals)
+                self._resolve(req, ordinals)
+                continue
+
+            # values of ALL inputs - resolved in one go (in sats, whatever kind the node is) by <_fetch_level>
+            inp_cum_val = 0
+            for input_nr, curr_output_value in enumerate(input_values):
+                i_tx_loc_rng = range(inp_cum_val, inp_cum_val + curr_output_value)
                 inp_cum_val += curr_output_value
-                print("!!!!!!!!!!!!!!!!!!!!!!!!!!! {}".format(curr_output_value))
-                
-                i_tx_loc_rng = range(inp_cum_val - curr_output_value, inp_cum_val)
-                print("i_tx_loc_rng: {} - {}".format(i_tx_loc_rng, len(i_tx_loc_rng)))
-                print("o_tx_crp_rng: {} - {}".format(o_tx_crp_rng, len(o_tx_crp_rng)))
                 i_tx_crp_rng = self.range_overlap(i_tx_loc_rng, o_tx_crp_rng)
-                print(":::::::: {}".format(i_tx_crp_rng))
                 if i_tx_crp_rng:
-                    i_op_crp_rng = range(i_tx_crp_rng.start - input_sum, i_tx_crp_rng.stop - input_sum)
-                    print("Rec. call: {} with range: {}".format(op_id.__repr__(), str(i_op_crp_rng)))
-                    lg.warning("RECURSIVE call! [- HINT -]: {} with range: {}".format(op_id.__repr__(), str(i_op_crp_rng)))
-                    self.depth += 1
-                    # i_op_crp_rng must be reentered a lvl lower
-                    self.rec_ordinal_calc(output_id=op_id, rng=i_op_crp_rng)  # wrong range - PROBABLY
-                    self.depth -= 1
-                    input_sum += len(i_tx_crp_rng)  ###
-                print("input : {}\noutput: {}".format(input_sum, output_sum))
-                input_nr += 1
-            # Input side - regular transaction                                                  ENDED   -
-    
-    
+                    prev_txid, prev_n = tx_data.prevout(input_nr)
+                    child = _Request(txid=prev_txid, n=prev_n,
+                                     rng=range(i_tx_crp_rng.start - i_tx_loc_rng.start,
+                                               i_tx_crp_rng.stop - i_tx_loc_rng.start),
+                                     offset=i_tx_crp_rng.start - o_tx_crp_rng.start, parent=req)
+                    req.children.append(child)
+                    frontier.append(child)
+                if inp_cum_val >= o_tx_crp_rng.stop:
+                    break
+            req.open = len(req.children)
+            if not req.open:
+                self._resolve(req, RangeList())
+
+    def _block_height(self, txid: str) -> int:
+        """=== Method name: _block_height ==============================================================================
+        :return: int - height of the block the TX is in
+        ========================================================================================== by Sziller ==="""
+        with self.node.call_slots:
+            tx_data = self.node.nodeop_getrawtransaction(tx_hash=txid, verbose=True)
+            if self.node.is_rpc:
+                return self.node.nodeop_getblockheight(block_hash=tx_data["blockhash"])
+        return tx_data["block_height"]
+
+    def _resolve(self, req: _Request, ordinals: RangeList):
+        """=== Method name: _resolve ===================================================================================
+        Records the Ordinals of <req> - and of every parent request completed by it: walking up, without recursion.
+        Parents are composed of their children's Ordinals in input order; the waiters of a merged request get their
+        slice of it. Complete answers are remembered in <memo>.
+        ========================================================================================== by Sziller ==="""
+        stack = [(req, ordinals, True)]  # request, its Ordinals, whether to remember them
+        while stack:
+            req, ordinals, remember = stack.pop()
+            while True:
+                req.ordinals = ordinals
+                if req.complete and remember:
+                    self.memo.put(req.txid, req.n, req.rng, ordinals)
+                for waiter in req.waiters:  # covered by the merged request's memo entry: not remembered on their own
+                    waiter.complete = waiter.complete and req.complete
+                    stack.append((waiter, ordinals.slice(waiter.rng.start - req.rng.start,
+                                                         waiter.rng.stop - req.rng.start), False))
+                req.waiters = ()
+                remember = True
+                parent = req.parent
+                if parent is None:
+                    break
+                if not req.complete:
+                    parent.complete = False
+                parent.open -= 1
+                if parent.open:
+                    break
+                ordinals = RangeList.concat(_.ordinals for _ in parent.children)
+                parent.children = []
+                req = parent
+
+
 if __name__ == "__main__":
     log_time = "test"
     rootpath_all_config = ".."
@@ -0,0 +1,488 @@
+"""
+Asyncio-native Bitcoin Node related operations.
+Same <nodeop_*> surface as the blocking Node in BitcoinNodeObject.py, but every operation is a coroutine:
+hundreds of lookups can be kept in flight against one node, bounded by a concurrency semaphore.
+Request building, answer parsing, caches and error handling are shared with the blocking Node (and its RPCHost),
+only the transport is different: every operation is written once, as a generator of Node yielding its I/O steps
+(see Node._drive()) - here those steps are awaited. mngr_asyncnode.py checks that the two surfaces match.
+"""
+import asyncio
+import functools
+import logging
+import inspect
+import json
+from typing import Optional, Iterable, AsyncIterator
+
+import aiohttp
+
+from SalletNodePackage.RPCHost import RPCHost
+from SalletNodePackage import RateLimiter
+from SalletNodePackage.BitcoinNodeObject import Node
+from SalletNodePackage.ScanJob import ScanJob, ScanJobManager
+from SalletNodePackage.TxCache import TxCache
+from SalletNodePackage.OutpointIndex import OutpointValueIndex
+from SalletNodePackage.ChainStateCache import ChainStateCache
+from SalletBasePackage.models import UtxoId
+
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('AsyncNodeObject.py'))
+
+# methods of Node - other than <nodeop_*> - that talk to the node: overridden by coroutines, see check_parity()
+_TRANSPORT_METHODS: tuple = ("_make_rpc_call", "_make_rpc_batch_call", "_make_external_api_call",
+                             "_post_external_api", "_prefetch_rawtransactions", "_sleep", "_drive",
+                             "_retry_abort_scan")
+
+
+class AsyncNode(Node):
+    """=== Class name: AsyncNode =======================================================================================
+    Asyncio counterpart of Node. Configuration (alias, credentials, validation), the pure helpers (payloads,
+    parsing, cache policy) and the operations (<_op_*>) are inherited, every <nodeop_*> method - and every method
+    using the transport - is overridden by a coroutine with the same parameters and return values as its blocking
+    namesake.
+    :param alias: str - the unique name we refer to the Node in our environment.
+    :param is_rpc: bool -   True:   if local RemoteProcedureCall is applied, thus LAN Fullnode is called
+                                False:  if remote API is contacted
+    :param max_concurrency: int - max. number of requests in flight towards the node at the same time
+    :param timeout: float - timeout (in seconds) of one request
+    :param retries: int - Number of attempts of an RPC call in case of connection failure (same default as RPCHost)
+    :param sleep_time: float - Sleep time (in seconds) between retry attempts (same default as RPCHost)
+    :param tx_cache: TxCache or None - cache of confirmed transactions, may be shared with blocking Nodes
+    :param outpoint_index: OutpointValueIndex or None - index of output values seen, None: the node gets its own one
+    :param chain_state: ChainStateCache or None - cache of block count, hashes and headers, None: its own one
+    Use it as an async context manager (async with AsyncNode(...) as node: ...), or call <aclose()> when done.
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name
+
+    def __init__(self,
+                 alias: str,
+                 is_rpc: bool,
+                 max_concurrency: int = 50,
+                 timeout: float = 10,
+                 retries: int = 10,
+                 sleep_time: float = 0.5,
+                 tx_cache: Optional[TxCache] = None,
+                 outpoint_index: Optional[OutpointValueIndex] = None,
+                 chain_state: Optional[ChainStateCache] = None):
+        super().__init__(alias=alias, is_rpc=is_rpc, rpc_pool_size=max_concurrency,
+                         tx_cache=tx_cache, outpoint_index=outpoint_index, chain_state=chain_state)
+        self.max_concurrency: int                           = max_concurrency
+        self.timeout: float                                 = timeout
+        self.retries: int                                   = retries
+        self.sleep_time: float                              = sleep_time
+        self._session: Optional[aiohttp.ClientSession]      = None
+        self._semaphore: Optional[asyncio.Semaphore]        = None
+        self._headers: dict                                 = {'content-type': 'application/json'}
+        self._twin: Optional[Node]                          = None  # blocking Node for thread-bound work
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """=== Instance method =========================================================================================
+        Closes the http session of the instance. A new one is opened on demand.
+        ========================================================================================== by Sziller ==="""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            lg.debug("closed    : async session of          < {:>20} > - ({})".format(self.alias, self.ccn))
+        if self._twin is not None:
+            self._twin.close()
+
+    def _blocking_node(self) -> Node:
+        """=== Internal utility method =================================================================================
+        Returns a blocking Node of the same configuration - and caches - as this one, for work done in worker
+        threads (UTXO set scan jobs). Credentials changed since the last call are handed over.
+        :return: Node
+        ========================================================================================== by Sziller ==="""
+        if self._twin is None:
+            self._twin = Node(alias=self.alias, is_rpc=self.is_rpc, rpc_pool_size=2,
+                              tx_cache=self.tx_cache, outpoint_index=self.outpoint_index, chain_state=self.chain_state)
+        self._twin.features = self.features
+        credentials = (self.rpc_ip, self.rpc_port, self.rpc_user, self.rpc_password, self.ext_node_url)
+        if credentials != (self._twin.rpc_ip, self._twin.rpc_port, self._twin.rpc_user, self._twin.rpc_password,
+                           self._twin.ext_node_url):
+            self._twin.update_sensitive_data(*credentials)  # closes the pool of the twin: only if changed
+        return self._twin
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """=== Internal utility method =================================================================================
+        Returns the keep-alive http session of the instance, opening it on first use (inside the running loop).
+        :return: aiohttp.ClientSession
+        ========================================================================================== by Sziller ==="""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _rpc_endpoint(self) -> str:
+        """=== Internal utility method =================================================================================
+        Returns the RPC URL without credentials: those are sent as BasicAuth, so they can change between calls.
+        :return: str - 'http://<ip>:<port>'
+        ========================================================================================== by Sziller ==="""
+        self.rpc_url()  # validates the RPC configuration - raises if incomplete
+        return "http://{}:{}".format(self.rpc_ip, self.rpc_port)
+
+    async def _post_rpc(self, payload, timeout: Optional[float] = None):
+        """=== Internal utility method =================================================================================
+        Posts a JSON-RPC payload (single or batch) and returns the decoded answer. Connection failures are retried
+        the same number of times as by the blocking RPCHost.
+        :param payload: dict or list - request object(s)
+        :param timeout: float or None - timeout of the call in seconds, None: <timeout> of the instance
+        :return: dict or list - decoded answer
+        ========================================================================================== by Sziller ==="""
+        if not self.is_rpc:
+            raise Exception("RPC is required for this operation.")
+        session = self._get_session()
+        url = self._rpc_endpoint()
+        auth = aiohttp.BasicAuth(self.rpc_user, self.rpc_password)
+        request_timeout = aiohttp.ClientTimeout(total=self.timeout if timeout is None else timeout)
+        nr_retry = self.retries
+        async with self._semaphore:
+            while True:
+                try:
+                    async with session.post(url, data=json.dumps(payload), headers=self._headers, auth=auth,
+                                            timeout=request_timeout) as resp:
+                        RPCHost.check_status(status_code=resp.status, reason=resp.reason)
+                        try:
+                            return await resp.json(content_type=None)
+                        except json.JSONDecodeError as e:
+                            msg_final = 'Failed to decode JSON response: ' + str(e)
+                            lg.critical(msg_final, exc_info=True)
+                            raise Exception(msg_final)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    nr_retry -= 1
+                    if nr_retry == 0:
+                        msg_final = 'RPC connection failed: \n{}'.format(e)
+                        lg.critical(msg_final)
+                        raise Exception(msg_final)
+                    lg.warning("Couldn't connect to RPC! Will try again in {} seconds ({} more tries)"
+                               .format(self.sleep_time, nr_retry))
+                    await asyncio.sleep(self.sleep_time)
+
+    async def _make_rpc_call(self, command: str, *params, timeout: Optional[int] = None):
+        """=== Internal utility method =================================================================================
+        Makes an RPC call to the node using the stored RPC credentials.
+        :param command: str - The RPC method to call
+        :param params: tuple - Additional parameters for the RPC call
+        :param timeout: int or None - timeout of the call in seconds, None: <timeout> of the instance
+                                      (e.g. long-polling <waitfornewblock> needs a longer one)
+        :return: json - JSON response from the node
+        ========================================================================================== by Sziller ==="""
+        response_json = await self._post_rpc(RPCHost.build_payload(command, params), timeout=timeout)
+        return RPCHost.unwrap(response_json)
+
+    async def _make_rpc_batch_call(self, calls: list, raise_on_error: bool = True) -> list:
+        """=== Internal utility method =================================================================================
+        Sends several RPC calls to the node in a single JSON-RPC batch.
+        :param calls: list - of (command, params) tuples, params being a list or tuple
+        :param raise_on_error: bool - False: failed calls are returned as Exception instances instead of raising
+        :return: list - results in the order of <calls>
+        ========================================================================================== by Sziller ==="""
+        if not calls:
+            return []
+        payload = [RPCHost.build_payload(method, params, idx) for idx, (method, params) in enumerate(calls)]
+        response_json = await self._post_rpc(payload)
+        return RPCHost.map_batch_results(calls=calls, response_json=response_json, raise_on_error=raise_on_error)
+
+    async def _make_external_api_call(self, endpoint: str, expect_json: bool = True):
+        """=== Internal utility method =================================================================================
+        Makes an API call to an external node (e.g., blockchain.info).
+        Rate limited, timed out and retried the same way - and by the same per-host limiter - as the blocking Node:
+        throttled calls (429, 503) pause the limiter of the host, failed connections and timeouts are retried after
+        a jittered exponential backoff.
+        :param endpoint: str - API endpoint to call
+        :param expect_json: bool - Whether to expect a JSON response (default True)
+        :return: json or str - JSON response or raw text depending on the request
+        ========================================================================================== by Sziller ==="""
+        session = self._get_session()
+        url = f"{self.ext_node_url}/{endpoint}"
+        limits = self.api_limits()
+        bucket = self._api_bucket(limits=limits)
+        request_timeout = aiohttp.ClientTimeout(total=limits["timeout"])
+        loop = asyncio.get_running_loop()
+        for attempt in range(limits["retries"] + 1):
+            await loop.run_in_executor(None, bucket.acquire)  # waiting for a token must not block the event loop
+            try:
+                async with self._semaphore:
+                    async with session.get(url, timeout=request_timeout) as resp:
+                        if resp.status in (429, 503):
+                            delay = RateLimiter.retry_after_seconds(resp.headers.get("Retry-After"))
+                            delay = RateLimiter.backoff_seconds(attempt) if delay is None else delay
+                            lg.warning("throttled : {} answered {} - retry {}/{} in {:.1f} sec".format(
+                                url, resp.status, attempt + 1, limits["retries"], delay))
+                            bucket.pause(delay)
+                            continue
+                        resp.raise_for_status()
+                        if expect_json:
+                            return await resp.json(content_type=None)
+                        return await resp.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == limits["retries"]:
+                    raise self._api_call_failure(e)
+                delay = RateLimiter.backoff_seconds(attempt)
+                lg.warning("API retry : {} failed - retry {}/{} in {:.1f} sec".format(
+                    url, attempt + 1, limits["retries"], delay))
+                await asyncio.sleep(delay)  # outside the semaphore: waiting holds no request slot
+            except aiohttp.ClientError as e:
+                raise self._api_call_failure(e)
+        raise self._api_call_failure(Exception("still throttled after {} retries: {}".format(limits["retries"], url)))
+
+    async def _drive(self, op):
+        """=== Internal utility method =================================================================================
+        Runs an operation of Node (<_op_*> generator) on the event loop: its I/O steps are awaited, its local steps
+        (cache access, parsing) are done in a worker thread - the same operation Node._drive() runs blocking.
+        :param op: generator - the operation
+        :return: what the operation returns
+        ========================================================================================== by Sziller ==="""
+        loop = asyncio.get_running_loop()
+        result, error = None, None
+        while True:
+            try:
+                method, args, kwargs = op.send(result) if error is None else op.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                if method is None:  # blocking local work
+                    result = await loop.run_in_executor(None, functools.partial(args[0], *args[1:], **kwargs))
+                else:
+                    result = await getattr(self, method)(*args, **kwargs)
+            except Exception as e:
+                error = e
+
+    async def _post_external_api(self, endpoint: str, data: dict) -> int:
+        """=== Internal utility method =================================================================================
+        Posts <data> to the external API - e.g. a TX to be published. Never retried: a post may not be idempotent.
+        :param endpoint: str - API endpoint to post to
+        :param data: dict - form data posted
+        :return: int - http status of the answer
+        ========================================================================================== by Sziller ==="""
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.post("{}/{}".format(self.ext_node_url, endpoint), data=data) as resp:
+                return resp.status
+
+    async def _prefetch_rawtransactions(self, tx_hashes: list, verbose: bool):
+        """=== Internal utility method =================================================================================
+        Fetches TXs in bulk for their side effects only: every verbose TX fetched is recorded in <outpoint_index>.
+        :param tx_hashes: list - of transaction hashes (IDs)
+        :param verbose: bool - If True, detailed JSON; if False, raw hex
+        ========================================================================================== by Sziller ==="""
+        async for _ in self.nodeop_getrawtransactions(tx_hashes=tx_hashes, verbose=verbose, ordered=False):
+            pass
+
+    async def _sleep(self, seconds: float):
+        """=== Internal utility method =================================================================================
+        :param seconds: float - time to wait between two steps of an operation
+        ========================================================================================== by Sziller ==="""
+        await asyncio.sleep(seconds)
+
+    async def nodeop_getconnectioncount(self):
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getconnectioncount() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getconnectioncount())
+
+    async def nodeop_getblockhash(self, sequence_nr: int, use_cache: bool = True):
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getblockhash() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getblockhash(sequence_nr=sequence_nr, use_cache=use_cache))
+
+    async def nodeop_getblockcount(self, use_cache: bool = True):
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getblockcount() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getblockcount(use_cache=use_cache))
+
+    async def nodeop_getblock(self, block_hash: str):
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getblock() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getblock(block_hash=block_hash))
+
+    async def nodeop_getblockheader(self, block_hash: str) -> dict:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getblockheader() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getblockheader(block_hash=block_hash))
+
+    async def nodeop_getblockheight(self, block_hash: str) -> int:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getblockheight() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getblockheight(block_hash=block_hash))
+
+    async def nodeop_getblock_raw(self, block_hash: str) -> bytes:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getblock_raw() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getblock_raw(block_hash=block_hash))
+
+    async def nodeop_ingest_block(self, block_hash: str) -> list:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_ingest_block() - see there. The block is parsed in a worker thread.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_ingest_block(block_hash=block_hash))
+
+    async def nodeop_check_tx_confirmation(self, tx_hash: str, limit: int = 6) -> bool:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_check_tx_confirmation() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_check_tx_confirmation(tx_hash=tx_hash, limit=limit))
+
+    async def nodeop_publish_tx(self, tx_raw: str) -> bool:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_publish_tx() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_publish_tx(tx_raw=tx_raw))
+
+    async def nodeop_getrawtransaction(self, tx_hash: str, verbose: bool = False, use_cache: bool = True):
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_getrawtransaction() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_getrawtransaction(tx_hash=tx_hash, verbose=verbose, use_cache=use_cache))
+
+    async def nodeop_getrawtransactions(self,
+                                        tx_hashes: Iterable[str],
+                                        verbose: bool = False,
+                                        ordered: bool = True,
+                                        max_workers: Optional[int] = None) -> AsyncIterator[tuple]:
+        """=== Instance method =========================================================================================
+        Bulk version of <nodeop_getrawtransaction>: yields (tx_hash, tx_data) pairs as results arrive - an async
+        generator: async for tx_hash, tx_data in node.nodeop_getrawtransactions(...): ...
+        Same as Node.nodeop_getrawtransactions(), but the tasks are run by the event loop: <max_workers> requests
+        in flight (default: <max_concurrency>).
+        :return: async iterator - of (tx_hash, tx_data) tuples
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        tx_hash_list = list(tx_hashes)
+        unique = list(dict.fromkeys(tx_hash_list))
+        lg.info("running   : {} - {} TXs ({} unique)".format(cmn, len(tx_hash_list), len(unique)))
+        results, tasks, fetch_op = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self._bulk_plan, tx_hash_list=unique, verbose=verbose))
+        slots = asyncio.Semaphore(max_workers or self.max_concurrency)
+
+        async def run(task: list) -> list:
+            async with slots:
+                return await self._drive(fetch_op(task, verbose))
+
+        next_idx = 0  # ordered mode: index of the next pair to be yielded
+        if not ordered:
+            for item in list(results.items()):
+                yield item
+        futures = [asyncio.ensure_future(run(_)) for _ in tasks]
+        try:
+            pending_futures = iter(asyncio.as_completed(futures))
+            while True:
+                if ordered:
+                    while next_idx < len(tx_hash_list) and tx_hash_list[next_idx] in results:
+                        yield tx_hash_list[next_idx], results[tx_hash_list[next_idx]]
+                        next_idx += 1
+                future = next(pending_futures, None)
+                if future is None:
+                    break
+                for tx_hash, tx_data in await future:
+                    results[tx_hash] = tx_data
+                    if not ordered:
+                        yield tx_hash, tx_data
+        finally:
+            for future in futures:  # consumer stopped early: nothing is left running
+                future.cancel()
+        lg.debug("exiting   : {}".format(cmn))
+
+    async def nodeop_get_tx_outpoint_value(self, tx_outpoint: UtxoId) -> int:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_get_tx_outpoint_value() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_get_tx_outpoint_value(tx_outpoint=tx_outpoint))
+
+    async def nodeop_get_input_values_sat(self, tx_hash: str, with_raw: bool = False):
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_get_input_values_sat() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_get_input_values_sat(tx_hash=tx_hash, with_raw=with_raw))
+
+    async def nodeop_start_utxo_scan(self, address_list=None, descriptors=None) -> ScanJob:
+        """=== Instance method =========================================================================================
+        Starts scanning the UTXO set for all UTXOs associated with addresses and/or descriptors - without waiting.
+        The ScanJob is the one of the blocking Node - planned, chunked, cached and cancelled the same way -, run by
+        a blocking twin of this node in a worker thread: <scantxoutset> holds its call open for minutes.
+        :param address_list: list - List of addresses in Base58 format
+        :param descriptors: list - of descriptors, see Node.nodeop_start_utxo_scan()
+        :return: ScanJob - the running (or already finished) scan
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        if not self.is_rpc:
+            raise self._rpc_only_failure(cmn)
+        lg.info("starting  : UtxoSet processing - {} at {}".format(cmn, self.ccn))
+        twin = self._blocking_node()
+        if self.scan_manager is None:
+            self.scan_manager = ScanJobManager(node=twin)
+        items = list(address_list or []) + list(descriptors or [])
+        return await asyncio.get_running_loop().run_in_executor(None, self.scan_manager.start, items)
+
+    async def nodeop_get_utxo_set_by_addresslist(self, address_list, descriptors=None) -> dict:
+        """=== Instance method =========================================================================================
+        Scans the UTXO set for all UTXOs associated with a list of addresses (and descriptors) - awaiting it.
+        See nodeop_start_utxo_scan() for the non-blocking version.
+        :param address_list: list - List of addresses in Base58 format
+        :param descriptors: list - of descriptors, see Node.nodeop_start_utxo_scan()
+        :return: dict - UTXO data for the provided addresses
+        ========================================================================================== by Sziller ==="""
+        job = await self.nodeop_start_utxo_scan(address_list=address_list, descriptors=descriptors)
+        resp = await asyncio.get_running_loop().run_in_executor(None, job.result)
+        lg.debug("    {}".format(resp))
+        return resp
+
+    async def nodeop_confirmations(self, tx_hash: str) -> int:
+        """=== Instance method =========================================================================================
+        Coroutine of Node.nodeop_confirmations() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_confirmations(tx_hash=tx_hash))
+
+    async def _retry_abort_scan(self, command):
+        """=== Internal utility method =================================================================================
+        Coroutine of Node._retry_abort_scan() - see there.
+        ========================================================================================== by Sziller ==="""
+        return await self._drive(self._op_retry_abort_scan(command=command))
+
+
+def check_parity(blocking: type = Node, asynchronous: type = AsyncNode) -> list:
+    """=== Function name: check_parity =================================================================================
+    Checks that every <nodeop_*> method - and every method using the transport - of the blocking class is overridden
+    by the asyncio class with a coroutine (or async generator) of the same parameters, and that the asyncio class has
+    no <nodeop_*> of its own. The operations themselves are shared (<_op_*> of Node): what can drift apart is the
+    thin layer calling them. Run by mngr_asyncnode.py - instead of handing out un-awaited coroutines at runtime.
+    :param blocking: type - the blocking Node class
+    :param asynchronous: type - the asyncio Node class
+    :return: list - of str: the differences found, empty if none
+    ============================================================================================== by Sziller ==="""
+    def parameters(func) -> list:
+        return [(_.name, _.kind, _.default) for _ in inspect.signature(func).parameters.values()]
+
+    names = {_ for _ in dir(blocking) if _.startswith("nodeop_") or _ in _TRANSPORT_METHODS}
+    drifted = []
+    for name in sorted(names | {_ for _ in dir(asynchronous) if _.startswith("nodeop_")}):
+        ours = asynchronous.__dict__.get(name)
+        theirs = getattr(blocking, name, None)
+        if ours is None or theirs is None:
+            drifted.append("{}: missing from {}".format(name, blocking.__name__ if ours else asynchronous.__name__))
+        elif not (inspect.iscoroutinefunction(ours) or inspect.isasyncgenfunction(ours)):
+            drifted.append("{}: not a coroutine in {}".format(name, asynchronous.__name__))
+        elif parameters(ours) != parameters(theirs):
+            drifted.append("{}: parameters differ {} vs. {}".format(name, inspect.signature(theirs),
+                                                                    inspect.signature(ours)))
+    if drifted:
+        lg.warning("{} and {} drifted apart:\n - {}".format(blocking.__name__, asynchronous.__name__,
+                                                            "\n - ".join(drifted)))
+    return drifted
@@ -5,14 +5,24 @@ All actions here can either be:
 - issued over RPC calls directly to your local FullNode
 """
 import os
+import json
 import logging
 import inspect
 import time
-from typing import Optional
+import threading
+from typing import Optional, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bitcoinlib.transactions import Transaction as TXobj
 
 import requests as reqs
+from urllib.parse import urlparse
 from SalletNodePackage import RPCHost
+from SalletNodePackage.TxCache import TxCache
+from SalletNodePackage.OutpointIndex import OutpointValueIndex
+from SalletNodePackage.ScanJob import ScanJob, ScanJobManager
+from SalletNodePackage import RateLimiter
+from SalletNodePackage import RawTxParser
+from SalletNodePackage.ChainStateCache import ChainStateCache
 from SalletBasePackage.models import UtxoId
 from dotenv import load_dotenv
 
@@ -24,6 +34,26 @@ lg = logging.getLogger()
 lg.info("START: {:>85} <<<".format('BitcoinNodeObject.py'))
 
 
+def _io(method: Optional[str], *args, **kwargs) -> tuple:
+    """=== Function name: _io ==========================================================================================
+    Builds an I/O step of an operation (see Node._drive()): the operations of Node are generators yielding these
+    steps - the driver does them, blocking (Node) or awaited (AsyncNode), and sends their results back.
+    :param method: str or None - name of the transport method of the Node to be called, None: local work
+    :return: tuple - (method, args, kwargs)
+    ============================================================================================== by Sziller ==="""
+    return method, args, kwargs
+
+
+def _local(func, *args, **kwargs) -> tuple:
+    """=== Function name: _local =======================================================================================
+    Builds a step of blocking local work - cache access, parsing - done inline by Node, in a worker thread by
+    AsyncNode: the event loop is never held up by it.
+    :param func: callable - the work to be done, called with <args> and <kwargs>
+    :return: tuple - (None, (func, *args), kwargs)
+    ============================================================================================== by Sziller ==="""
+    return _io(None, func, *args, **kwargs)
+
+
 class Node(object):
     """=== Class name: Node ============================================================================================
     Data- and methodcollection of Nodes, your system is in contact with.
@@ -32,12 +62,41 @@ class Node(object):
                         so uniqueness must be kept regardless of casing.
     :param is_rpc: bool -   True:   if local RemoteProcedureCall is applied, thus LAN Fullnode is called
                                 False:  if remote API is contacted
+    :param rpc_pool_size: int - max. number of keep-alive connections held open towards the RPC node
+    :param rpc_idle_timeout: float - seconds of inactivity after which the RPC connection pool is evicted
+    :param rpc_coalesce_window: float or None - opt-in: RPC calls issued concurrently within this many seconds are
+                                sent to the node as one JSON-RPC batch. None (default): every call is sent on its own.
+    :param tx_cache: TxCache or None - cache of confirmed transactions, may be shared by several Nodes
+    :param outpoint_index: OutpointValueIndex or None - index of output values seen, may be shared by several Nodes
+                                None: the Node gets its own one
+    :param chain_state: ChainStateCache or None - cache of block count, hashes and headers, None: the Node gets its
+                                own one (only share it among Nodes following the same chain)
+    :param max_in_flight: int - ceiling of calls in flight towards the node, shared by every user of the instance
+                                that takes a slot of <call_slots> - resizable: node.call_slots.resize(...)
+    The instance owns its RPC connection pool: release it by calling <close()> or by using the Node as a
+    context manager (with Node(...) as node: ...).
+    External API nodes are rate limited per host. Limits are read from <features> (the 'features' field of the node
+    table), a dict or its JSON text - e.g. '{"rate_limit": 1.0, "burst": 3, "timeout": 20, "retries": 8}' -,
+    missing keys default to <_API_DEFAULTS>.
     ============================================================================================== by Sziller ==="""
     ccn = inspect.currentframe().f_code.co_name
+    # long-running commands: never held back in - or holding back - a coalesced batch
+    _NO_COALESCE: tuple = ("scantxoutset", "waitfornewblock")
+    # external API limits: requests / sec, requests at once, seconds per request, retries if throttled or failing
+    _API_DEFAULTS: dict = {"rate_limit": 2.0, "burst": 5, "timeout": 10, "retries": 5}
+    # fields of a verbose TX that change with the tip: never cached - a cache hit would answer them frozen
+    _TIP_DEPENDENT: tuple = ("confirmations",)
 
     def __init__(self,
                  alias: str,  # think of it as the ID of the Node inside your system
-                 is_rpc: bool):
+                 is_rpc: bool,
+                 rpc_pool_size: int = 10,
+                 rpc_idle_timeout: Optional[float] = 15.0,
+                 rpc_coalesce_window: Optional[float] = None,
+                 tx_cache: Optional[TxCache] = None,
+                 outpoint_index: Optional[OutpointValueIndex] = None,
+                 chain_state: Optional[ChainStateCache] = None,
+                 max_in_flight: int = 8):
         self.alias: str                         = alias
         self.is_rpc: bool                       = is_rpc
         self.owner: Optional[str]               = None
@@ -50,8 +109,25 @@ class Node(object):
         self.rpc_password: Optional[str]        = None
         self.ext_node_url: Optional[str]        = None
         # ------------------------------------------------------------------------------------------
+        self.tx_cache: Optional[TxCache]        = tx_cache
+        self.outpoint_index: OutpointValueIndex = outpoint_index if outpoint_index is not None \
+            else OutpointValueIndex()
+        self.scan_manager: Optional[ScanJobManager] = None  # instantiated on the first UTXO set scan
+        self.chain_state: ChainStateCache       = chain_state if chain_state is not None else ChainStateCache()
+        # ------------------------------------------------------------------------------------------
+        self.rpc_pool_size: int                 = rpc_pool_size
+        self.rpc_idle_timeout: Optional[float]  = rpc_idle_timeout
+        self.rpc_coalesce_window: Optional[float] = rpc_coalesce_window
+        self._rpc_host: Optional[RPCHost.RPCHost] = None
+        self._rpc_coalescer: Optional[RPCHost.RPCCoalescer] = None
+        self._rpc_host_lock: threading.Lock     = threading.Lock()
+        self._api_session: Optional[reqs.Session] = None
+        self.call_slots: RateLimiter.CallSlots  = RateLimiter.CallSlots(limit=max_in_flight)
+        # ------------------------------------------------------------------------------------------
         self._MAX_RETRIES: int                  = 5
         self._WAIT_TIME_SECONDS: int            = 2
+        self._MAX_WORKERS: int                  = 8     # parallel requests of bulk operations
+        self._RPC_BATCH_SIZE: int               = 100   # calls per JSON-RPC batch of bulk operations
 
         lg.debug("instant.ed:                                   < {:>20} > - ({})".format(self.alias, self.ccn))
     
@@ -64,6 +140,7 @@ class Node(object):
         :var self.rpc_password: str - RPC password
         :var self.ext_node_url: str - External API URL for non-RPC nodes
         ========================================================================================== by Sziller ==="""
+        self.close()
         self.rpc_ip                             = None
         self.rpc_port                           = None
         self.rpc_user                           = None
@@ -84,12 +161,35 @@ class Node(object):
         :param rpc_password: str or None - RPC password
         :param ext_node_url: str or None - External API URL for non-RPC nodes
         ========================================================================================== by Sziller ==="""
+        self.close()  # pooled connections were opened with the old credentials
         self.rpc_ip                             = rpc_ip
         self.rpc_port                           = rpc_port
         self.rpc_user                           = rpc_user
         self.rpc_password                       = rpc_password
         self.ext_node_url                       = ext_node_url
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """=== Instance method =========================================================================================
+        Releases the connection pool held towards the node. The Node stays usable, a new pool is opened on demand.
+        ========================================================================================== by Sziller ==="""
+        with self._rpc_host_lock:
+            if self._rpc_coalescer is not None:
+                self._rpc_coalescer.close()
+                self._rpc_coalescer = None
+            if self._rpc_host is not None:
+                self._rpc_host.close()
+                self._rpc_host = None
+                lg.debug("closed    : connection pool of        < {:>20} > - ({})".format(self.alias, self.ccn))
+            if self._api_session is not None:
+                self._api_session.close()
+                self._api_session = None
+
     def __repr__(self):
         return "{:>15}:{} - {} / {}".format(self.rpc_ip, self.rpc_port, self.alias, self.owner)
 
@@ -156,37 +256,237 @@ class Node(object):
         lg.debug("returning : RPC address - says {}()".format(cmn))
         return "http://{}:{}@{}:{}".format(self.rpc_user, self.rpc_password, self.rpc_ip, self.rpc_port)
 
-    def _make_rpc_call(self, command: str, *params):
+    def _make_rpc_call(self, command: str, *params, timeout: Optional[int] = None):
         """=== Internal utility method =================================================================================
         Makes an RPC call to the node using the stored RPC credentials.
         :param command: str - The RPC method to call
         :param params: tuple - Additional parameters for the RPC call
+        :param timeout: int or None - timeout of the call in seconds, None: the default of the RPCHost
+                                      (calls with a timeout of their own are never coalesced)
         :return: json - JSON response from the node
         ========================================================================================== by Sziller ==="""
         if not self.is_rpc:
             raise Exception("RPC is required for this operation.")
-        OneReq = RPCHost.RPCHost(self.rpc_url())
-        return OneReq.call(command, *params)
+        host = self._get_rpc_host()
+        if self._rpc_coalescer is not None and command not in self._NO_COALESCE and timeout is None:
+            return self._rpc_coalescer.call(command, *params)
+        return host.call(command, *params, timeout=timeout)
+
+    def _make_rpc_batch_call(self, calls: list, raise_on_error: bool = True) -> list:
+        """=== Internal utility method =================================================================================
+        Sends several RPC calls to the node in a single JSON-RPC batch.
+        :param calls: list - of (command, params) tuples, params being a list or tuple
+        :param raise_on_error: bool - False: failed calls are returned as Exception instances instead of raising
+        :return: list - results in the order of <calls>
+        ========================================================================================== by Sziller ==="""
+        if not self.is_rpc:
+            raise Exception("RPC is required for this operation.")
+        return self._get_rpc_host().call_batch(calls, raise_on_error=raise_on_error)
+
+    def _get_rpc_host(self) -> RPCHost.RPCHost:
+        """=== Internal utility method =================================================================================
+        Returns the long-lived RPCHost of the Node, instantiating it on first use.
+        All threads using the Node share the instance, and through it the keep-alive connection pool.
+        :return: RPCHost - pooled RPC transport towards the node
+        ========================================================================================== by Sziller ==="""
+        with self._rpc_host_lock:
+            if self._rpc_host is None:
+                self._rpc_host = RPCHost.RPCHost(self.rpc_url(),
+                                                 pool_size=self.rpc_pool_size,
+                                                 idle_timeout=self.rpc_idle_timeout)
+                lg.debug("opened    : connection pool of        < {:>20} > - ({})".format(self.alias, self.ccn))
+                if self.rpc_coalesce_window is not None:
+                    self._rpc_coalescer = RPCHost.RPCCoalescer(self._rpc_host, window=self.rpc_coalesce_window)
+            return self._rpc_host
 
     def _make_external_api_call(self, endpoint: str, expect_json: bool = True):
         """=== Internal utility method =================================================================================
         Makes an API call to an external node (e.g., blockchain.info).
+        Calls wait for a token of the host's rate limiter. Throttled calls (429, 503) pause the limiter of the host
+        for as long as <Retry-After> asks - or for a jittered exponential backoff -, and are retried.
         :param endpoint: str - API endpoint to call
         :param expect_json: bool - Whether to expect a JSON response (default True)
         :return: json or str - JSON response or raw text depending on the request
         ========================================================================================== by Sziller ==="""
         url = f"{self.ext_node_url}/{endpoint}"
-        try:
-            resp = reqs.get(url)
-            resp.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
+        limits = self.api_limits()
+        bucket = self._api_bucket(limits=limits)
+        session = self._get_api_session()
+        for attempt in range(limits["retries"] + 1):
+            bucket.acquire()
+            try:
+                resp = session.get(url, timeout=limits["timeout"])
+            except (reqs.exceptions.ConnectionError, reqs.exceptions.Timeout) as e:
+                if attempt == limits["retries"]:
+                    raise self._api_call_failure(e)
+                delay = RateLimiter.backoff_seconds(attempt)
+                lg.warning("API retry : {} failed - retry {}/{} in {:.1f} sec".format(
+                    url, attempt + 1, limits["retries"], delay))
+                time.sleep(delay)
+                continue
+            except reqs.exceptions.RequestException as e:
+                raise self._api_call_failure(e)
+            if resp.status_code in (429, 503):
+                delay = RateLimiter.retry_after_seconds(resp.headers.get("Retry-After"))
+                delay = RateLimiter.backoff_seconds(attempt) if delay is None else delay
+                lg.warning("throttled : {} answered {} - retry {}/{} in {:.1f} sec".format(
+                    urlparse(url).netloc, resp.status_code, attempt + 1, limits["retries"], delay))
+                bucket.pause(delay)
+                continue
+            try:
+                resp.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
+            except reqs.exceptions.RequestException as e:
+                raise self._api_call_failure(e)
             # Check if we expect JSON or raw text (hex)
             if expect_json:
                 return resp.json()  # Return the JSON response if expected
             else:
                 return resp.text  # Return the raw text (e.g., hex) if JSON is not expected
-        except reqs.exceptions.RequestException as e:
-            lg.error(f"Failed API call to entered URL, error!", exc_info=True)
-            raise Exception(f"API request failed: {e}")
+        raise self._api_call_failure(Exception("still throttled after {} retries: {}".format(limits["retries"], url)))
+
+    def api_limits(self) -> dict:
+        """=== Instance method =========================================================================================
+        :return: dict - rate limits of the external API: <_API_DEFAULTS> overridden by what <features> defines
+        ========================================================================================== by Sziller ==="""
+        limits = dict(self._API_DEFAULTS)
+        features = self.features
+        if isinstance(features, str):
+            try:
+                features = json.loads(features)
+            except ValueError:
+                features = None  # free text (e.g. a description): no limits defined
+        if isinstance(features, dict):
+            limits.update({k: features[k] for k in limits if k in features})
+        return limits
+
+    def api_queue_depth(self) -> int:
+        """=== Instance method =========================================================================================
+        Number of calls waiting for the rate limiter of the external API's host - fan-out callers keep it low, but
+        above zero, to use the allowed rate to its full without exceeding it.
+        :return: int - calls waiting
+        ========================================================================================== by Sziller ==="""
+        return self._api_bucket(limits=self.api_limits()).queue_depth
+
+    def _api_bucket(self, limits: dict) -> RateLimiter.TokenBucket:
+        """=== Internal utility method =================================================================================
+        :return: TokenBucket - rate limiter of the external API's host, shared by all Nodes
+        ========================================================================================== by Sziller ==="""
+        return RateLimiter.bucket_for_host(host=urlparse(self.ext_node_url or "").netloc,
+                                           rate=float(limits["rate_limit"]),
+                                           burst=int(limits["burst"]))
+
+    def _get_api_session(self) -> reqs.Session:
+        """=== Internal utility method =================================================================================
+        :return: requests.Session - keep-alive session towards the external API, opened on first use
+        ========================================================================================== by Sziller ==="""
+        with self._rpc_host_lock:
+            if self._api_session is None:
+                self._api_session = reqs.Session()
+            return self._api_session
+
+    @staticmethod
+    def _api_call_failure(e: Exception) -> Exception:
+        """=== Internal utility method =================================================================================
+        Logs a failed external API call, and returns the Exception to be raised. Shared with the asyncio client.
+        :param e: Exception - the error raised by the http client
+        :return: Exception - to be raised by the caller
+        ========================================================================================== by Sziller ==="""
+        lg.error(f"Failed API call to entered URL, error!", exc_info=True)
+        return Exception(f"API request failed: {e}")
+
+    def _rpc_only_failure(self, cmn: str) -> Exception:
+        """=== Internal utility method =================================================================================
+        Logs a call of an RPC-only operation on an external API node, and returns the Exception to be raised.
+        Shared with the asyncio client.
+        :param cmn: str - name of the called method
+        :return: Exception - to be raised (or logged only) by the caller
+        ========================================================================================== by Sziller ==="""
+        msg = "Method only usable as RPC call - says {} at {}".format(cmn, self.ccn)
+        lg.error(msg, exc_info=True)
+        return Exception(msg)
+
+    @staticmethod
+    def _api_endpoint_getrawtransaction(tx_hash: str, verbose: bool) -> str:
+        """=== Internal utility method =================================================================================
+        Returns the external API endpoint serving a transaction. Shared with the asyncio client.
+        :param tx_hash: str - The transaction hash (ID)
+        :param verbose: bool - If True, the endpoint answers JSON; if False, raw hex
+        :return: str - endpoint relative to <ext_node_url>
+        ========================================================================================== by Sziller ==="""
+        endpoint = f"rawtx/{tx_hash}"
+        if not verbose:
+            endpoint += "?format=hex"
+        return endpoint
+
+    def _extract_outpoint_value(self, raw_tx: dict, n: int):
+        """=== Internal utility method =================================================================================
+        Reads the value of output <n> from a verbose transaction, as answered by this kind of node.
+        Shared with the asyncio client.
+        :param raw_tx: dict - verbose transaction data
+        :param n: int - index of the output
+        :return: value of the output - RPC: in btc, external API: in sats
+        ========================================================================================== by Sziller ==="""
+        if self.is_rpc:
+            # If using RPC, raw_tx is likely a dictionary from the verbose call
+            return raw_tx["vout"][n]["value"]
+        # If using the external API, the structure might differ
+        # Adjust accordingly if the API response format differs
+        return raw_tx["out"][n]["value"]
+
+    def _value_to_sat(self, value) -> int:
+        """=== Internal utility method =================================================================================
+        Converts an output value, as answered by this kind of node, to integer sats.
+        :param value: RPC: float in btc, external API: int in sats
+        :return: int - value in sats
+        ========================================================================================== by Sziller ==="""
+        return int(round(value * 10 ** 8)) if self.is_rpc else int(value)
+
+    def _sat_to_value(self, value_sat: int):
+        """=== Internal utility method =================================================================================
+        Converts integer sats to an output value, as this kind of node would answer it.
+        :param value_sat: int - value in sats
+        :return: RPC: float in btc, external API: int in sats
+        ========================================================================================== by Sziller ==="""
+        return value_sat / 10 ** 8 if self.is_rpc else value_sat
+
+    def _index_tx(self, tx_hash: str, tx_data: dict):
+        """=== Internal utility method =================================================================================
+        Records the output values - and the prevout values, if present - of a verbose TX in <outpoint_index>.
+        :param tx_hash: str - The transaction hash (ID)
+        :param tx_data: dict - verbose transaction data
+        ========================================================================================== by Sziller ==="""
+        try:
+            outputs = tx_data["vout"] if self.is_rpc else tx_data["out"]
+            self.outpoint_index.add_tx(txid=tx_hash, values_sat=[self._value_to_sat(_["value"]) for _ in outputs])
+            for vin in tx_data.get("vin", []):  # prevouts: RPC answers of verbosity 2 only
+                if "prevout" in vin:
+                    self.outpoint_index.add_outpoint(txid=vin["txid"], n=vin["vout"],
+                                                     value_sat=self._value_to_sat(vin["prevout"]["value"]))
+        except (KeyError, TypeError, ValueError) as e:
+            lg.warning("index     : failed to index outputs of TX {} - {}".format(tx_hash, e))
+
+    def _extract_confirmations(self, tx_data: dict, actual_blockcount: Optional[int] = None) -> int:
+        """=== Internal utility method =================================================================================
+        Calculates the number of confirmations from a verbose transaction. Shared with the asyncio client.
+        :param tx_data: dict - verbose transaction data
+        :param actual_blockcount: int - current blockcount, only needed for external API nodes
+        :return: int - number of confirmations
+        ========================================================================================== by Sziller ==="""
+        if self.is_rpc:
+            return tx_data.get("confirmations", 0)
+        lg.debug("using     : {:<30} - {:>20}: {:>8}".format("", "actual blockcount", actual_blockcount))
+        tx_blockindex = tx_data.get("block_height", 0)
+        lg.debug("using     : {:<30} - {:>20}: {:>8}".format("", "tx_blockindex", tx_blockindex))
+        return max(0, actual_blockcount - tx_blockindex + 1)
+
+    @staticmethod
+    def _scan_descriptors(address_list) -> list:
+        """=== Internal utility method =================================================================================
+        Turns a list of addresses into the scan objects understood by BitcoinCore's <scantxoutset>.
+        :param address_list: list - List of addresses in Base58 format
+        :return: list - of descriptors
+        ========================================================================================== by Sziller ==="""
+        return ['addr({})'.format(_) for _ in address_list]  # syntax used by BitcoinCore
     
     def validate_api_url(self):
         """=== Instance method =========================================================================================
@@ -203,16 +503,67 @@ class Node(object):
             raise Exception(
                 f"API URL '{self.ext_node_url}' is not reachable. Please check the URL or your connection.\n{e}")
     
+    def _drive(self, op):
+        """=== Internal utility method =================================================================================
+        Runs an operation (<_op_*> generator): the I/O steps it yields are done here - blocking - and their results
+        sent back into it, errors raised into it. AsyncNode drives the very same operations by awaiting the steps.
+        :param op: generator - the operation
+        :return: what the operation returns
+        ========================================================================================== by Sziller ==="""
+        result, error = None, None
+        while True:
+            try:
+                method, args, kwargs = op.send(result) if error is None else op.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                if method is None:  # blocking local work
+                    result = args[0](*args[1:], **kwargs)
+                else:
+                    result = getattr(self, method)(*args, **kwargs)
+            except Exception as e:
+                error = e
+
+    def _post_external_api(self, endpoint: str, data: dict) -> int:
+        """=== Internal utility method =================================================================================
+        Posts <data> to the external API - e.g. a TX to be published. Never retried: a post may not be idempotent.
+        :param endpoint: str - API endpoint to post to
+        :param data: dict - form data posted
+        :return: int - http status of the answer
+        ========================================================================================== by Sziller ==="""
+        return reqs.post("{}/{}".format(self.ext_node_url, endpoint), data=data).status_code
+
+    def _prefetch_rawtransactions(self, tx_hashes: list, verbose: bool):
+        """=== Internal utility method =================================================================================
+        Fetches TXs in bulk for their side effects only: every verbose TX fetched is recorded in <outpoint_index>.
+        :param tx_hashes: list - of transaction hashes (IDs)
+        :param verbose: bool - If True, detailed JSON; if False, raw hex
+        ========================================================================================== by Sziller ==="""
+        for _ in self.nodeop_getrawtransactions(tx_hashes=tx_hashes, verbose=verbose, ordered=False):
+            pass
+
+    def _sleep(self, seconds: float):
+        """=== Internal utility method =================================================================================
+        :param seconds: float - time to wait between two steps of an operation
+        ========================================================================================== by Sziller ==="""
+        time.sleep(seconds)
+
     def nodeop_getconnectioncount(self):
         """=== Instance method =========================================================================================
         Retrieves the number of active connections to the node. Only available for RPC nodes.
         :return: int - Number of active connections
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getconnectioncount())
+
+    def _op_getconnectioncount(self):
+        """=== Operation: nodeop_getconnectioncount ===================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         if self.is_rpc:
             command = "getconnectioncount"
             lg.debug("running   : {}".format(cmn))
-            resp = self._make_rpc_call(command)
+            resp = yield _io("_make_rpc_call", command)
             lg.debug("returning : {:<30} - {:>20}: {:>8}".format(cmn, command, resp))
             lg.debug("exit      : {}".format(cmn))
             return resp
@@ -221,61 +572,177 @@ class Node(object):
             lg.error(msg, exc_info=False)
             raise Exception(msg)
 
-    def nodeop_getblockhash(self, sequence_nr: int):
+    def nodeop_getblockhash(self, sequence_nr: int, use_cache: bool = True):
         """=== Instance method =========================================================================================
         Retrieves the block hash at a specific block height.
+        Hashes deeper than the reorg-safety depth of <chain_state> are asked from the node only once.
         :param sequence_nr: int - The block height (sequence number)
+        :param use_cache: bool - False: the node is asked in any case
         :return: str - The block hash at the given height
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getblockhash(sequence_nr=sequence_nr, use_cache=use_cache))
+
+    def _op_getblockhash(self, sequence_nr: int, use_cache: bool):
+        """=== Operation: nodeop_getblockhash =========================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         command = "getblockhash"
         lg.debug("running   : {}".format(cmn))
         if self.is_rpc:
-            resp = self._make_rpc_call(command, sequence_nr)
+            resp = self.chain_state.peek_blockhash(height=sequence_nr) if use_cache else None
+            if resp is None:
+                resp = yield _io("_make_rpc_call", command, sequence_nr)
+                self.chain_state.remember_blockhash(height=sequence_nr, block_hash=resp)
             lg.debug("returning : {:<30} - {:>20}: {:>8}".format(cmn, command, resp))
             lg.debug("exit      : {}".format(cmn))
             return resp
         else:
-            msg = "Method only usable as RPC call - says {} at {}".format(cmn, self.ccn)
-            lg.error(msg, exc_info=True)
+            self._rpc_only_failure(cmn)
             # endpoint = f"q/{command}/{sequence_nr}"
             # resp = self._make_external_api_call(endpoint)
             return False
-        
-    def nodeop_getblockcount(self):
+
+    def nodeop_getblockcount(self, use_cache: bool = True):
         """=== Instance method =========================================================================================
         Retrieves the total number of blocks in the blockchain.
+        The answer is reused for <chain_state.tip_ttl> seconds: checking many TXs costs one tip lookup.
+        :param use_cache: bool - False: the node is asked in any case
         :return: int - The current block count
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getblockcount(use_cache=use_cache))
+
+    def _op_getblockcount(self, use_cache: bool = True):
+        """=== Operation: nodeop_getblockcount ========================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         command = "getblockcount"
         lg.debug("running   : {}".format(cmn))
-        if self.is_rpc:
-            resp = self._make_rpc_call(command)
-        else:
-            endpoint = f"q/{command}"
-            resp = self._make_external_api_call(endpoint)
+        resp = self.chain_state.peek_blockcount() if use_cache else None
+        if resp is None:
+            if self.is_rpc:
+                resp = yield _io("_make_rpc_call", command)
+            else:
+                resp = yield _io("_make_external_api_call", f"q/{command}")
+            self.chain_state.observe_tip(height=resp)
         lg.debug("returning : {:<30} - {:>20}: {:>8}".format(cmn, command, resp))
         lg.debug("exiting   : {}".format(cmn))
         return resp
-        
+
     def nodeop_getblock(self, block_hash: str):
         """=== Instance method =========================================================================================
         Retrieves detailed information about a specific block by its hash.
+        Its header fields are remembered in <chain_state>.
         :param block_hash: str - The block hash to retrieve
         :return: dict - Details of the block
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getblock(block_hash=block_hash))
+
+    def _op_getblock(self, block_hash: str):
+        """=== Operation: nodeop_getblock =============================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         command = "getblock"
         lg.debug("running   : {}".format(cmn))
         if self.is_rpc:
-            resp = self._make_rpc_call(command, block_hash)
+            resp = yield _io("_make_rpc_call", command, block_hash)
         else:
-            resp = self._make_external_api_call(f"rawblock/{block_hash}")
+            resp = yield _io("_make_external_api_call", f"rawblock/{block_hash}")
+        if isinstance(resp, dict):
+            self.chain_state.remember_header(block_hash=block_hash, header=self._header_of_block(resp))
         lg.debug("returning : {:<30} - {:>20}:\n{}".format(cmn, command, block_hash))
         lg.debug("exiting   : {}".format(cmn))
         return resp
 
+    def nodeop_getblockheader(self, block_hash: str) -> dict:
+        """=== Instance method =========================================================================================
+        Retrieves the header of a block - cached by hash, a block hash identifies its header for good.
+        External API nodes have no header call: the block is fetched, its transactions dropped.
+        :param block_hash: str - The block hash
+        :return: dict - header of the block, 'height' included
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getblockheader(block_hash=block_hash))
+
+    def _op_getblockheader(self, block_hash: str):
+        """=== Operation: nodeop_getblockheader =======================================================================
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        lg.debug("running   : {}".format(cmn))
+        header = self.chain_state.peek_header(block_hash=block_hash)
+        if header is None:
+            if self.is_rpc:
+                header = yield _io("_make_rpc_call", "getblockheader", block_hash, True)
+            else:
+                header = self._header_of_block((yield _io("_make_external_api_call", f"rawblock/{block_hash}")))
+            self.chain_state.remember_header(block_hash=block_hash, header=header)
+            header = dict(header)
+        return header
+
+    def nodeop_getblockheight(self, block_hash: str) -> int:
+        """=== Instance method =========================================================================================
+        :param block_hash: str - The block hash
+        :return: int - height of the block - without fetching the entire block
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getblockheight(block_hash=block_hash))
+
+    def _op_getblockheight(self, block_hash: str):
+        """=== Operation: nodeop_getblockheight =======================================================================
+        ========================================================================================== by Sziller ==="""
+        height = self.chain_state.peek_height(block_hash=block_hash)
+        if height is None:
+            height = (yield from self._op_getblockheader(block_hash=block_hash))["height"]
+        return height
+
+    def nodeop_getblock_raw(self, block_hash: str) -> bytes:
+        """=== Instance method =========================================================================================
+        Retrieves an entire block serialized - <getblock hash 0> - far less to transfer and decode than its JSON.
+        :param block_hash: str - The block hash
+        :return: bytes - the serialized block
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getblock_raw(block_hash=block_hash))
+
+    def _op_getblock_raw(self, block_hash: str):
+        """=== Operation: nodeop_getblock_raw =========================================================================
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        lg.debug("running   : {}".format(cmn))
+        if self.is_rpc:
+            resp = yield _io("_make_rpc_call", "getblock", block_hash, 0)
+        else:
+            resp = yield _io("_make_external_api_call", f"rawblock/{block_hash}?format=hex", expect_json=False)
+        lg.debug("returning : {:<30} - {:>20}: {} bytes".format(cmn, block_hash, len(resp) // 2))
+        return bytes.fromhex(resp)
+
+    def nodeop_ingest_block(self, block_hash: str) -> list:
+        """=== Instance method =========================================================================================
+        Fetches a block serialized and parses ALL its transactions at once - recording their output values in
+        <outpoint_index>: later value lookups of outputs created in the block need no node access.
+        :param block_hash: str - The block hash
+        :return: list - of ParsedTx, in block order (coinbase first)
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_ingest_block(block_hash=block_hash))
+
+    def _op_ingest_block(self, block_hash: str):
+        """=== Operation: nodeop_ingest_block =========================================================================
+        Parsing a large block takes a while: it is a local step - AsyncNode does it in a worker thread.
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        raw_block = yield from self._op_getblock_raw(block_hash=block_hash)
+        header, txs = yield _local(RawTxParser.parse_block, raw_block)
+        if header["hash"] != block_hash:
+            raise ValueError("{}: node answered block {} for {}".format(cmn, header["hash"], block_hash))
+        for parsed in txs:
+            self.outpoint_index.add_tx(txid=parsed.txid, values_sat=parsed.values)
+        lg.info("ingested  : block {} - {} TXs - says {}".format(block_hash, len(txs), cmn))
+        return txs
+
+    @staticmethod
+    def _header_of_block(block_data: dict) -> dict:
+        """=== Internal utility method =================================================================================
+        :param block_data: dict - an entire block, as answered by the node
+        :return: dict - the block without its transactions
+        ========================================================================================== by Sziller ==="""
+        return {k: v for k, v in block_data.items() if k not in ("tx", "transactions")}
+
     def nodeop_check_tx_confirmation(self, tx_hash: str, limit: int = 6) -> bool:
         """=== Instance method =========================================================================================
         Checks if a transaction has reached the required number of confirmations.
@@ -283,9 +750,14 @@ class Node(object):
         :param limit: int - Minimum number of confirmations to be considered confirmed (default 6)
         :return: bool - True if the transaction is confirmed, False otherwise
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_check_tx_confirmation(tx_hash=tx_hash, limit=limit))
+
+    def _op_check_tx_confirmation(self, tx_hash: str, limit: int):
+        """=== Operation: nodeop_check_tx_confirmation ================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         try:
-            count = self.nodeop_confirmations(tx_hash=tx_hash)
+            count = yield from self._op_confirmations(tx_hash=tx_hash)
         except Exception as e:
             lg.error("nodeop_confirmations() threw an error:\n{}".format(e), exc_info=False)
             return False
@@ -300,12 +772,17 @@ class Node(object):
         :param tx_raw: str - The raw transaction in hexadecimal format
         :return: bool - True if the transaction was successfully published, False otherwise
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_publish_tx(tx_raw=tx_raw))
+
+    def _op_publish_tx(self, tx_raw: str):
+        """=== Operation: nodeop_publish_tx ===========================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         lg.debug("Node requ.: {:>16} - publish attempt...".format({True: "OWN NODE",
                                                                   False: "blockchain.info"}[self.is_rpc]))
         if self.is_rpc:
             try:
-                resp = self._make_rpc_call("sendrawtransaction", tx_raw)
+                resp = yield _io("_make_rpc_call", "sendrawtransaction", tx_raw)
                 lg.warning("Node resp.: {:<30} - rpc publish:PUBLISHED {:>20}".format(cmn, resp))
                 return True
             except Exception as e:
@@ -314,75 +791,284 @@ class Node(object):
         else:
             endpoint = "pushtx"
             try:
-                resp = reqs.post("{}/{}".format(self.ext_node_url, endpoint), data={"tx": tx_raw})
-                lg.warning("Node resp.: {:<30} - ext publish:PUBLISHED {:>20}"
-                           .format("blockchain.info", resp.status_code))
-                return resp.status_code == 200
-            except reqs.exceptions.RequestException as e:
+                status = yield _io("_post_external_api", endpoint, {"tx": tx_raw})
+                lg.warning("Node resp.: {:<30} - ext publish:PUBLISHED {:>20}".format("blockchain.info", status))
+                return status == 200
+            except Exception as e:
                 lg.error("Node resp.: {:<30} - ext publish:FAILED    {:>20}"
                          .format("blockchain.info", e), exc_info=False)
+                return False
 
-    def nodeop_getrawtransaction(self, tx_hash: str, verbose: bool = False):
+    def nodeop_getrawtransaction(self, tx_hash: str, verbose: bool = False, use_cache: bool = True):
         """=== Instance method =========================================================================================
         Retrieves raw transaction details by transaction hash.
+        If the Node has a <tx_cache>, confirmed transactions are served from - and stored into - it: decoded ones
+        without their 'confirmations' (see nodeop_confirmations()), raw hex only once the TX is known to be confirmed.
         :param tx_hash: str - The transaction hash (ID)
         :param verbose: bool - If True, returns detailed JSON; if False, returns raw hex (default False)
-        :return: dict or str - Transaction details (JSON) or raw hex string
+        :param use_cache: bool - False: ask the node even if the TX is cached (e.g. for up-to-date confirmations)
+        :return: dict or str - Transaction details (JSON) or raw hex string, None if the lookup failed
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_getrawtransaction(tx_hash=tx_hash, verbose=verbose, use_cache=use_cache))
+
+    def _op_getrawtransaction(self, tx_hash: str, verbose: bool = False, use_cache: bool = True):
+        """=== Operation: nodeop_getrawtransaction ====================================================================
         ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         command = "getrawtransaction"
         lg.debug("running   : {}".format(cmn))
+        if use_cache and self.tx_cache is not None:
+            cached = yield _local(self._tx_cache_lookup, tx_hash=tx_hash, verbose=verbose)
+            if cached is not None:
+                if verbose:
+                    self._index_tx(tx_hash=tx_hash, tx_data=cached)
+                lg.debug("returning : {:<30} - {:>20}:\n--- {} ---".format(cmn, "cached", tx_hash))
+                return cached
         try:
             if self.is_rpc:
-                resp = self._make_rpc_call(command, tx_hash, verbose)  # RPC path - pass verbosity to the RPC call
+                resp = yield _io("_make_rpc_call", command, tx_hash, verbose)  # pass verbosity to the RPC call
+                if verbose:
+                    self._index_tx(tx_hash=tx_hash, tx_data=resp)
+                if self.tx_cache is not None:
+                    yield _local(self._tx_cache_store, tx_hash=tx_hash, resp=resp, verbose=verbose)
             else:
-                endpoint = f"rawtx/{tx_hash}"
-                if not verbose:
-                    endpoint += "?format=hex"
-                
-                resp = self._make_external_api_call(endpoint, expect_json=verbose)
-
-                # If verbosity is set, the response is in JSON format, otherwise it's raw hex.
-                if not verbose:
-                    lg.debug(f"returning : raw hex for TX {tx_hash}")
-                    lg.debug("exiting   : {}".format(cmn))
-                else:
-                    lg.debug(f"returning : detailed JSON for TX {tx_hash}")
-                    lg.debug("exiting   : {}".format(cmn))
-                return resp
-            lg.debug("returning : {:<30} - {:>20}:\n--- {} ---".format(cmn, command, tx_hash))
+                endpoint = self._api_endpoint_getrawtransaction(tx_hash=tx_hash, verbose=verbose)
+                resp = yield _io("_make_external_api_call", endpoint, expect_json=verbose)
+                if verbose:
+                    self._index_tx(tx_hash=tx_hash, tx_data=resp)
+                if self.tx_cache is not None:
+                    mined = verbose and isinstance(resp, dict) and resp.get("block_height") is not None
+                    actual_blockcount = (yield from self._op_getblockcount()) if mined else None
+                    yield _local(self._tx_cache_store, tx_hash=tx_hash, resp=resp, verbose=verbose,
+                                 actual_blockcount=actual_blockcount)
+            # If verbosity is set, the response is in JSON format, otherwise it's raw hex.
+            lg.debug("returning : {:<30} - {:>20}:\n--- {} ---".format(cmn, "detailed JSON" if verbose else "raw hex",
+                                                                        tx_hash))
             lg.debug("exiting   : {}".format(cmn))
             return resp
         except Exception as e:
             lg.error(f"{cmn}: Failed to fetch raw transaction - 'Exception'", exc_info=True)
             return None
 
+    def nodeop_getrawtransactions(self,
+                                  tx_hashes: Iterable[str],
+                                  verbose: bool = False,
+                                  ordered: bool = True,
+                                  max_workers: Optional[int] = None) -> Iterator[tuple]:
+        """=== Instance method =========================================================================================
+        Bulk version of <nodeop_getrawtransaction>: yields (tx_hash, tx_data) pairs as results arrive.
+        - cached TXs are served from <tx_cache> without asking the node,
+        - RPC nodes are asked in JSON-RPC batches of <_RPC_BATCH_SIZE>,
+        - external API nodes are asked by a pool of <max_workers> parallel requests.
+        Failed lookups yield None as data (as nodeop_getrawtransaction returns None). Duplicates are fetched once.
+        :param tx_hashes: iterable - of transaction hashes (IDs)
+        :param verbose: bool - If True, yields detailed JSON; if False, raw hex (default False)
+        :param ordered: bool -  True:   pairs are yielded in the order of <tx_hashes> (duplicates repeated)
+                                False:  pairs are yielded as they complete, each TX once
+        :param max_workers: int or None - parallel requests towards the node (default: <_MAX_WORKERS>)
+        :return: iterator - of (tx_hash, tx_data) tuples
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        tx_hash_list = list(tx_hashes)
+        unique = list(dict.fromkeys(tx_hash_list))
+        lg.info("running   : {} - {} TXs ({} unique)".format(cmn, len(tx_hash_list), len(unique)))
+        results, tasks, fetch_op = self._bulk_plan(tx_hash_list=unique, verbose=verbose)
+
+        next_idx = 0  # ordered mode: index of the next pair to be yielded
+        if not ordered:
+            yield from list(results.items())
+        with ThreadPoolExecutor(max_workers=max_workers or self._MAX_WORKERS) as executor:
+            futures = [executor.submit(self._drive, fetch_op(task, verbose)) for task in tasks]
+            pending_futures = as_completed(futures)
+            while True:
+                if ordered:
+                    while next_idx < len(tx_hash_list) and tx_hash_list[next_idx] in results:
+                        yield tx_hash_list[next_idx], results[tx_hash_list[next_idx]]
+                        next_idx += 1
+                future = next(pending_futures, None)
+                if future is None:
+                    break
+                for tx_hash, tx_data in future.result():
+                    results[tx_hash] = tx_data
+                    if not ordered:
+                        yield tx_hash, tx_data
+        lg.debug("exiting   : {}".format(cmn))
+
+    def _bulk_plan(self, tx_hash_list: list, verbose: bool) -> tuple:
+        """=== Internal utility method =================================================================================
+        First half of a bulk TX lookup: serves what <tx_cache> has (blocking: the cache may be on disk), and splits
+        the rest into tasks to be fetched concurrently - by threads (Node) or by tasks of the event loop (AsyncNode).
+        :param tx_hash_list: list - of unique transaction hashes (IDs)
+        :param verbose: bool - If True, detailed JSON; if False, raw hex
+        :return: tuple - (dict: tx_hash - tx_data served from the cache,
+                          list: tasks, each a list of transaction hashes,
+                          function: the operation fetching a task - called with (task, verbose))
+        ========================================================================================== by Sziller ==="""
+        results: dict = {}
+        to_fetch: list = []
+        for tx_hash in tx_hash_list:
+            cached = None if self.tx_cache is None else self._tx_cache_lookup(tx_hash=tx_hash, verbose=verbose)
+            if cached is None:
+                to_fetch.append(tx_hash)
+            else:
+                if verbose:
+                    self._index_tx(tx_hash=tx_hash, tx_data=cached)
+                results[tx_hash] = cached
+        lg.debug("cached    : {} TXs - fetching {} TXs".format(len(results), len(to_fetch)))
+        if self.is_rpc:
+            tasks = [to_fetch[i:i + self._RPC_BATCH_SIZE] for i in range(0, len(to_fetch), self._RPC_BATCH_SIZE)]
+            return results, tasks, self._op_fetch_rawtransaction_batch
+        return results, [[_] for _ in to_fetch], self._op_fetch_rawtransaction_api
+
+    def _op_fetch_rawtransaction_batch(self, tx_hash_list: list, verbose: bool):
+        """=== Operation ===============================================================================================
+        Fetches several TXs from an RPC node in one JSON-RPC batch, storing confirmed ones in the cache.
+        :param tx_hash_list: list - of transaction hashes (IDs)
+        :param verbose: bool - If True, detailed JSON; if False, raw hex
+        :return: list - of (tx_hash, tx_data) tuples, tx_data being None if the lookup failed
+        ========================================================================================== by Sziller ==="""
+        try:
+            answers = yield _io("_make_rpc_batch_call", [("getrawtransaction", [_, verbose])
+                                                         for _ in tx_hash_list], raise_on_error=False)
+        except Exception as e:
+            lg.error("Failed to fetch batch of {} TXs - {}".format(len(tx_hash_list), e), exc_info=False)
+            return [(_, None) for _ in tx_hash_list]
+        fetched = []
+        for tx_hash, resp in zip(tx_hash_list, answers):
+            if isinstance(resp, Exception):
+                lg.error("Failed to fetch raw transaction {} - {}".format(tx_hash, resp), exc_info=False)
+                fetched.append((tx_hash, None))
+                continue
+            if verbose:
+                self._index_tx(tx_hash=tx_hash, tx_data=resp)
+            fetched.append((tx_hash, resp))
+        if self.tx_cache is not None:
+            def store():
+                for tx_hash, resp in fetched:
+                    self._tx_cache_store(tx_hash=tx_hash, resp=resp, verbose=verbose)
+            yield _local(store)
+        return fetched
+
+    def _op_fetch_rawtransaction_api(self, tx_hash_list: list, verbose: bool):
+        """=== Operation ===============================================================================================
+        Fetches TXs one-by-one (external APIs have no batch call), storing confirmed ones in the cache.
+        :param tx_hash_list: list - of transaction hashes (IDs)
+        :param verbose: bool - If True, detailed JSON; if False, raw hex
+        :return: list - of (tx_hash, tx_data) tuples, tx_data being None if the lookup failed
+        ========================================================================================== by Sziller ==="""
+        fetched = []
+        for tx_hash in tx_hash_list:
+            fetched.append((tx_hash, (yield from self._op_getrawtransaction(tx_hash=tx_hash, verbose=verbose,
+                                                                             use_cache=False))))
+        return fetched
+
+    def _tx_cache_flavor(self) -> str:
+        """=== Internal utility method =================================================================================
+        Decoded transactions look different coming from RPC or from an external API: they are cached separately.
+        :return: str - 'rpc' or 'api'
+        ========================================================================================== by Sziller ==="""
+        return "rpc" if self.is_rpc else "api"
+
+    def _strip_tip_dependent(self, tx_data: dict) -> dict:
+        """=== Internal utility method =================================================================================
+        :param tx_data: dict - verbose transaction data
+        :return: dict - the same without its fields of <_TIP_DEPENDENT>: cached answers carry no 'confirmations',
+                        ask nodeop_confirmations() for up-to-date ones
+        ========================================================================================== by Sziller ==="""
+        return {k: v for k, v in tx_data.items() if k not in self._TIP_DEPENDENT}
+
+    def _tx_cache_lookup(self, tx_hash: str, verbose: bool, flavor: Optional[str] = None):
+        """=== Internal utility method =================================================================================
+        :param tx_hash: str - The transaction hash (ID)
+        :param verbose: bool - True: decoded form is looked up, False: raw hex
+        :param flavor: str or None - decoded form to be looked up, None: the default one of the Node
+        :return: dict or str or None - cached form of the TX, None if not cached
+        ========================================================================================== by Sziller ==="""
+        if verbose:
+            tx_data = self.tx_cache.get_decoded(txid=tx_hash, flavor=flavor or self._tx_cache_flavor())
+            return None if tx_data is None else self._strip_tip_dependent(tx_data)  # rows stored before stripping
+        return self.tx_cache.get_hex(txid=tx_hash)
+
+    def _tx_cache_store(self, tx_hash: str, resp, verbose: bool, flavor: Optional[str] = None,
+                        actual_blockcount: Optional[int] = None):
+        """=== Internal utility method =================================================================================
+        Stores a freshly fetched TX in the cache - if it is confirmed deeply enough. Never raises: a failing cache
+        must not fail the lookup itself.
+        :param tx_hash: str - The transaction hash (ID)
+        :param resp: dict or str - answer of the node
+        :param verbose: bool - True: <resp> is the decoded form, False: raw hex
+        :param flavor: str or None - decoded form <resp> is, None: the default one of the Node
+        :param actual_blockcount: int or None - current blockcount for external API answers, None: not stored
+        Called as a local step of the operations (see _drive()): it asks the node nothing itself.
+        ========================================================================================== by Sziller ==="""
+        try:
+            if not resp:
+                return
+            if not verbose:
+                # raw hex tells nothing about confirmations: only stored if the TX is already known to be confirmed
+                if self.tx_cache.is_known_confirmed(txid=tx_hash):
+                    self.tx_cache.put_hex(txid=tx_hash, hex_str=resp)
+                return
+            if self.is_rpc:
+                confirmations = self._extract_confirmations(tx_data=resp)
+            elif resp.get("block_height") is None or actual_blockcount is None:
+                return  # not mined yet - or depth unknown
+            else:
+                confirmations = self._extract_confirmations(tx_data=resp, actual_blockcount=actual_blockcount)
+            if confirmations < self.tx_cache.min_confirmations:
+                return
+            self.tx_cache.put_decoded(txid=tx_hash, flavor=flavor or self._tx_cache_flavor(),
+                                      data=self._strip_tip_dependent(resp))
+            if "hex" in resp:
+                self.tx_cache.put_hex(txid=tx_hash, hex_str=resp["hex"])
+        except Exception as e:
+            lg.warning("tx cache  : failed to store TX {} - {}".format(tx_hash, e))
+
+
     def nodeop_get_tx_outpoint_value(self, tx_outpoint: UtxoId) -> int:
         """=== Instance method =========================================================================================
-        Retrieves the value of a specific transaction outpoint (UTXO).
+        Retrieves the value of a specific transaction outpoint (UTXO) - taking the cheapest path available:
+        1. <outpoint_index> - values of every TX (and prevout) the Node has seen
+        2. RPC <gettxout> - if the outpoint is unspent, the UTXO set answers without decoding the parent TX
+        3. the entire verbose parent TX (served by <tx_cache> if cached)
         :param tx_outpoint: UtxoId - The UTXO outpoint to get the value for
-        :return: int - The value of the UTXO
+        :return: int - The value of the UTXO - RPC: in btc, external API: in sats
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_get_tx_outpoint_value(tx_outpoint=tx_outpoint))
+
+    def _op_get_tx_outpoint_value(self, tx_outpoint: UtxoId):
+        """=== Operation: nodeop_get_tx_outpoint_value ================================================================
         ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         lg.debug("running   : {}".format(cmn))
 
         try:
+            value_sat = self.outpoint_index.get(txid=tx_outpoint.txid, n=tx_outpoint.n)
+            if value_sat is not None:
+                lg.debug(f"returning : indexed UTXO value: {value_sat} sat - says {cmn}")
+                return self._sat_to_value(value_sat)
+
+            parent_cached = self.tx_cache is not None and \
+                (yield _local(self.tx_cache.is_known_confirmed, txid=tx_outpoint.txid))
+            if self.is_rpc and not parent_cached:
+                txout = yield _io("_make_rpc_call", "gettxout", tx_outpoint.txid, tx_outpoint.n, True)
+                if txout:  # None if spent (or never existed)
+                    value = txout["value"]
+                    self.outpoint_index.add_outpoint(txid=tx_outpoint.txid, n=tx_outpoint.n,
+                                                     value_sat=self._value_to_sat(value))
+                    lg.debug(f"returning : unspent UTXO value: {value} - says {cmn}")
+                    return value
+
             # Use nodeop_getrawtransaction to fetch the raw transaction data (handles both RPC and API)
             lg.debug(f"Fetching raw transaction data for TX: {tx_outpoint.txid}")
-            raw_tx = self.nodeop_getrawtransaction(tx_outpoint.txid, verbose=True)  # Use verbose=1 to get detailed info
+            raw_tx = yield from self._op_getrawtransaction(tx_outpoint.txid, verbose=True)  # detailed info
             if not raw_tx:
                 msg = f"Transaction data for {tx_outpoint.txid} could not be retrieved."
                 lg.critical(msg)
                 raise Exception(msg)
 
             # Extract the output value from the transaction data
-            if self.is_rpc:
-                # If using RPC, raw_tx is likely a dictionary from the verbose call
-                value = raw_tx["vout"][tx_outpoint.n]["value"]
-            else:
-                # If using the external API, the structure might differ
-                # Adjust accordingly if the API response format differs
-                value = raw_tx["out"][tx_outpoint.n]["value"]
+            value = self._extract_outpoint_value(raw_tx=raw_tx, n=tx_outpoint.n)
 
             lg.debug(f"returning : UTXO value: {value} - says {cmn}")
             return value
@@ -392,44 +1078,117 @@ class Node(object):
             lg.error(msg, exc_info=False)
             raise Exception(msg)
 
-    def nodeop_get_utxo_set_by_addresslist(self, address_list) -> dict:
+    def nodeop_get_input_values_sat(self, tx_hash: str, with_raw: bool = False):
         """=== Instance method =========================================================================================
-        Scans the UTXO set for all UTXOs associated with a list of addresses.
-        :param address_list: list - List of addresses in Base58 format
-        :return: dict - UTXO data for the provided addresses
+        Resolves the values of ALL inputs of a TX in one go - instead of one parent TX lookup per input:
+        - RPC: <getrawtransaction> of verbosity 2 carries the <prevout> of every input (BitcoinCore 25+),
+        - external API: the verbose TX carries <prev_out> of every input - one lacking it raises, unless it is the
+          input of a coinbase TX (told by its null prevout, as RawTxParser does).
+        Inputs the answer has no prevout for (older BitcoinCore, missing undo data) are resolved through
+        <outpoint_index> and a bulk lookup of their parents.
+        With <with_raw> the raw TX is handed over too: on RPC it comes with the same answer - no second fetch.
+        :param tx_hash: str - The transaction hash (ID)
+        :param with_raw: bool - True: (raw TX hex, values) is returned
+        :return: list - of input values in sats, in input order; None for the input of a coinbase TX
+                 tuple - (str, list): the raw TX hex and the values, if <with_raw>
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_get_input_values_sat(tx_hash=tx_hash, with_raw=with_raw))
+
+    def _op_get_input_values_sat(self, tx_hash: str, with_raw: bool):
+        """=== Operation: nodeop_get_input_values_sat =================================================================
         ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
+        lg.debug("running   : {}".format(cmn))
         if self.is_rpc:
-            command = "scantxoutset"
-            lg.info("starting  : UtxoSet processing - {} at {}".format(cmn, self.ccn))
-            formatted_list = ['addr({})'.format(_) for _ in address_list]  # syntax used by BitcoinCore
-            lg.debug("converted : list to BitcoinCore request format for command: '{}'".format(command))
-
-            # Abort if a scan is already in progress, and cannot be stopped
-            try:
-                # Use the hidden static method to handle the retry logic
-                self._retry_abort_scan(command)
+            flavor = "rpc-prevout"
+            tx_data = None if self.tx_cache is None else \
+                (yield _local(self._tx_cache_lookup, tx_hash, verbose=True, flavor=flavor))
+            if tx_data is None:
+                tx_data = yield _io("_make_rpc_call", "getrawtransaction", tx_hash, 2)
+                if self.tx_cache is not None:
+                    yield _local(self._tx_cache_store, tx_hash=tx_hash, resp=tx_data, verbose=True, flavor=flavor)
+            self._index_tx(tx_hash=tx_hash, tx_data=tx_data)
+            inputs = [(_.get("txid"), _.get("vout"), _.get("prevout", {}).get("value"), "coinbase" in _)
+                      for _ in tx_data["vin"]]
+            tx_data_raw = tx_data.get("hex") if with_raw else None
+        else:
+            tx_data = yield from self._op_getrawtransaction(tx_hash=tx_hash, verbose=True)
+            if not tx_data:
+                msg = f"Transaction data for {tx_hash} could not be retrieved."
+                lg.critical(msg)
+                raise Exception(msg)
+            prev_outs = [_.get("prev_out") for _ in tx_data["inputs"]]
+            tx_data_raw = (yield from self._op_getrawtransaction(tx_hash=tx_hash, verbose=False)) if with_raw else None
+            # coinbase: its only input spends the null outpoint - the API answers its index, or no prev_out at all
+            is_coinbase = len(prev_outs) == 1 and (prev_outs[0] or {}).get("n") == 0xffffffff
+            if len(prev_outs) == 1 and not prev_outs[0]:  # no prev_out: the serialized TX tells
+                if tx_data_raw is None:
+                    tx_data_raw = yield from self._op_getrawtransaction(tx_hash=tx_hash, verbose=False)
+                if tx_data_raw:
+                    is_coinbase = (yield _local(RawTxParser.parse_tx, tx_data_raw)).is_coinbase
+            missing = [c for c, prev_out in enumerate(prev_outs) if not prev_out]
+            if missing and not is_coinbase:
+                msg = f"Input(s) {missing} of TX {tx_hash} - not a coinbase TX - answered without prev_out."
+                lg.critical(msg)
+                raise Exception(msg)
+            inputs = [(None, None, None if is_coinbase else prev_out["value"], is_coinbase) for prev_out in prev_outs]
+        if with_raw and not tx_data_raw:
+            msg = f"Raw transaction {tx_hash} could not be retrieved."
+            lg.critical(msg)
+            raise Exception(msg)
 
-                # Proceed with initiating a new scan
-                lg.warning("Running: UTXO set scan might take several minutes... please be patient!")
-            except Exception as e:
-                lg.error(f"Error while managing UTXO scan: {e}")
-                raise
+        values: list = [None if is_coinbase or value is None else self._value_to_sat(value)
+                        for _, _, value, is_coinbase in inputs]
+        unresolved = [c for c, (txid, _, value, is_coinbase) in enumerate(inputs)
+                      if value is None and not is_coinbase and txid is not None]
+        if unresolved:
+            lg.debug("resolving : {} inputs without prevout - says {}".format(len(unresolved), cmn))
+            parents = [inputs[c][0] for c in unresolved
+                       if self.outpoint_index.get(txid=inputs[c][0], n=inputs[c][1]) is None]
+            # fetching is enough: every verbose TX fetched is recorded in <outpoint_index>
+            yield _io("_prefetch_rawtransactions", parents, True)
+            for c in unresolved:
+                value_sat = self.outpoint_index.get(txid=inputs[c][0], n=inputs[c][1])
+                if value_sat is None:
+                    value = yield from self._op_get_tx_outpoint_value(UtxoId(txid=inputs[c][0], n=inputs[c][1]))
+                    values[c] = self._value_to_sat(value)
+                else:
+                    values[c] = value_sat
+        lg.debug("returning : {} input values - says {}".format(len(values), cmn))
+        if with_raw:
+            return tx_data_raw, values
+        return values
 
-            try:
-                # Start the scan with the formatted address list
-                resp = self._make_rpc_call(command, 'start', formatted_list)
+    def nodeop_start_utxo_scan(self, address_list=None, descriptors=None) -> ScanJob:
+        """=== Instance method =========================================================================================
+        Starts scanning the UTXO set for all UTXOs associated with addresses and/or descriptors - without waiting.
+        Duplicates are dropped, large sets are scanned in chunks (see ScanPlanner), partial results are merged.
+        The returned job reports progress and ETA, can be cancelled, and hands over the result once done.
+        A repeated scan of the same items at the same tip is served from the cache of the Node's job manager.
+        :param address_list: list - List of addresses in Base58 format
+        :param descriptors: list - of descriptors: plain ('wpkh(...)'), ranged ('wpkh(xpub.../0/*)'), or
+                                   ranged with explicit range ({"desc": 'wpkh(xpub.../0/*)', "range": [0, 4999]})
+        :return: ScanJob - the running (or already finished) scan
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        if not self.is_rpc:
+            raise self._rpc_only_failure(cmn)
+        lg.info("starting  : UtxoSet processing - {} at {}".format(cmn, self.ccn))
+        if self.scan_manager is None:
+            self.scan_manager = ScanJobManager(node=self)
+        return self.scan_manager.start(items=list(address_list or []) + list(descriptors or []))
 
-                lg.info("returned  : UtxoSet scan result!")
-                lg.debug("    {}".format(resp))
-                return resp
-            except Exception as e:
-                lg.error(f"Failed to scan UTXO set: {e}", exc_info=True)
-                raise Exception(f"Failed to complete UTXO scan: {e}")
-        else:
-            msg = "Method only usable as RPC call - says {} at {}".format(cmn, self.ccn)
-            lg.error(msg, exc_info=True)
-            raise Exception(msg)
+    def nodeop_get_utxo_set_by_addresslist(self, address_list, descriptors=None) -> dict:
+        """=== Instance method =========================================================================================
+        Scans the UTXO set for all UTXOs associated with a list of addresses (and descriptors) - waiting for it.
+        See nodeop_start_utxo_scan() for the non-blocking version.
+        :param address_list: list - List of addresses in Base58 format
+        :param descriptors: list - of descriptors, see nodeop_start_utxo_scan()
+        :return: dict - UTXO data for the provided addresses
+        ========================================================================================== by Sziller ==="""
+        resp = self.nodeop_start_utxo_scan(address_list=address_list, descriptors=descriptors).result()
+        lg.debug("    {}".format(resp))
+        return resp
     
     def nodeop_confirmations(self, tx_hash: str) -> int:
         """=== Instance method =========================================================================================
@@ -437,20 +1196,19 @@ class Node(object):
         :param tx_hash: str - The transaction hash (ID)
         :return: int - The number of confirmations
         ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_confirmations(tx_hash=tx_hash))
+
+    def _op_confirmations(self, tx_hash: str):
+        """=== Operation: nodeop_confirmations ========================================================================
+        ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         command = "confirmations"
         lg.debug("running   : {}".format(cmn))
         
         try:
-            tx_data = self.nodeop_getrawtransaction(tx_hash, verbose=True)
-            if self.is_rpc:
-                confirmations = tx_data.get("confirmations", 0)
-            else:
-                actual_blockcount = self.nodeop_getblockcount()
-                lg.debug("using     : {:<30} - {:>20}: {:>8}".format("", "actual blockcount", actual_blockcount))
-                tx_blockindex = tx_data.get("block_height", 0)
-                lg.debug("using     : {:<30} - {:>20}: {:>8}".format("", "tx_blockindex", tx_blockindex))
-                confirmations = max(0, actual_blockcount - tx_blockindex + 1)
+            tx_data = yield from self._op_getrawtransaction(tx_hash, verbose=True, use_cache=False)  # cached: stale
+            actual_blockcount = None if self.is_rpc else (yield from self._op_getblockcount())
+            confirmations = self._extract_confirmations(tx_data=tx_data, actual_blockcount=actual_blockcount)
             lg.debug("returning : {:<30} - {:>20}: {:>8}".format(cmn, command, confirmations))
             lg.debug("exiting   : {}".format(cmn))
             return confirmations
@@ -460,42 +1218,24 @@ class Node(object):
             return 0
 
     def _retry_abort_scan(self, command):
-        """
-        A hidden static method to handle retries for aborting a UTXO scan.
-        """
-        retries = 0
-        while mark := self._make_rpc_call(command, 'status'):
-            print(f"mark: {mark}")
-            if retries >= self._MAX_RETRIES:
-                lg.error("Exceeded maximum retries to abort the UTXO set scan. Exiting...")
-                raise RuntimeError("Unable to terminate the active UTXO set scan after retries.")
-
-            # Attempt to abort the scan
-            lg.warning(
-                f"Retry {retries + 1}/{self._MAX_RETRIES}: UTXO set scan still active - attempting to abort.")
-            self._make_rpc_call(command, 'abort')
-
-            # Wait before the next retry
-            lg.warning(f"Waiting: {self._WAIT_TIME_SECONDS} seconds before retrying...")
-            for remaining in range(self._WAIT_TIME_SECONDS, 0, -1):
-                time.sleep(1)
-                print(f"Waiting: {remaining} seconds remaining.")
-                lg.debug(f"Waiting: {remaining} seconds remaining.")
-
-            retries += 1
-        print(f"mark: {mark}")
-
-        # Additional post-abort status validation
-        lg.warning("Scan aborted. Verifying that the status has cleared...")
+        """=== Internal utility method =================================================================================
+        Aborts the UTXO set scan the node may be running - it runs one at a time -, and waits till its status clears.
+        :param command: str - the scan command ('scantxoutset')
+        ========================================================================================== by Sziller ==="""
+        return self._drive(self._op_retry_abort_scan(command=command))
+
+    def _op_retry_abort_scan(self, command):
+        """=== Operation: _retry_abort_scan ===========================================================================
+        ========================================================================================== by Sziller ==="""
         for attempt in range(self._MAX_RETRIES):
-            status = self._make_rpc_call(command, 'status')
-            print(f"status: {status}")
-            if not status:  # If the status is cleared, break the loop
-                lg.info("Scan status successfully cleared.")
-                break
-            lg.debug(f"Status still not cleared. Attempt {attempt + 1}/{self._MAX_RETRIES}. Waiting...")
-            time.sleep(self._WAIT_TIME_SECONDS)
-        else:
-            lg.error("Unable to verify that the scan status has cleared after abort.")
-            raise RuntimeError("Node still reports an active scan even after abort attempts.")
-        print(f"status: {status}")
+            status = yield _io("_make_rpc_call", command, 'status')
+            if not status:
+                lg.debug("status    : no UTXO set scan in progress")
+                return
+            lg.warning("Retry {}/{}: UTXO set scan still active at {:.1f}% - attempting to abort."
+                       .format(attempt + 1, self._MAX_RETRIES, status.get("progress", 0)))
+            yield _io("_make_rpc_call", command, 'abort')
+            yield _io("_sleep", self._WAIT_TIME_SECONDS)
+        if (yield _io("_make_rpc_call", command, 'status')):
+            lg.error("Exceeded maximum retries to abort the UTXO set scan.")
+            raise RuntimeError("Unable to terminate the active UTXO set scan after retries.")
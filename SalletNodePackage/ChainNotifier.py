@@ -0,0 +1,273 @@
+"""
+Chain event notifications.
+Instead of polling the node - and re-running queries - to find out whether anything happened, consumers subscribe to
+chain events. Sources, best first:
+- BitcoinCore's ZMQ publisher (zmqpubhashblock / zmqpubrawtx) - needs pyzmq and the node configured to publish,
+- <waitfornewblock> long-polling of an RPC node - blocks only,
+- polling of the block count - blocks only, any node.
+FakePublisher emits events from inside the process: consumers can be tested offline.
+by Sziller
+"""
+
+import os
+import time
+import inspect
+import logging
+import threading
+from typing import Optional, Callable
+
+try:
+    import zmq  # optional: only needed to listen to BitcoinCore's ZMQ publisher
+except ImportError:
+    zmq = None
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('ChainNotifier.py'))
+
+
+class ChainEvent(object):
+    """=== Class name: ChainEvent ======================================================================================
+    A new block ('block'), or a new transaction seen by the node ('tx').
+    :param topic: str - 'block' or 'tx'
+    :param block_hash: str or None - hash of the new block (topic 'block')
+    :param height: int or None - height of the new block (topic 'block'), if known
+    :param tx_hex: str or None - raw hex of the new transaction (topic 'tx')
+    :param source: str - what reported the event: 'zmq', 'longpoll', 'poll' or 'fake'
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+    __slots__ = ("topic", "block_hash", "height", "tx_hex", "source", "received_at")
+
+    def __init__(self, topic: str, block_hash: Optional[str] = None, height: Optional[int] = None,
+                 tx_hex: Optional[str] = None, source: str = ""):
+        self.topic: str                     = topic
+        self.block_hash: Optional[str]      = block_hash
+        self.height: Optional[int]          = height
+        self.tx_hex: Optional[str]          = tx_hex
+        self.source: str                    = source
+        self.received_at: float             = time.time()
+
+    def __repr__(self):
+        if self.topic == "block":
+            return "{}(block {} at {} - {})".format(self.ccn, self.block_hash, self.height, self.source)
+        return "{}(tx of {} bytes - {})".format(self.ccn, len(self.tx_hex or "") // 2, self.source)
+
+
+class ChainNotifier(object):
+    """=== Class name: ChainNotifier ===================================================================================
+    Listens to ONE source of chain events on a daemon thread, and fans every event out to the consumers subscribed.
+    Block events also update the chain-state cache of the Node - the tip is known without asking for it.
+    Consumers are called on the listener thread, one after the other: keep them short, and hand heavy work over to
+    threads of your own. A failing consumer does not stop the others.
+    :param node: Node - the node whose events are listened to
+    :param zmq_block_endpoint: str or None - e.g. 'tcp://127.0.0.1:28332' as set by <zmqpubhashblock>,
+                                None: read from the ZMQ_BLOCK_ENDPOINT environment variable
+    :param zmq_tx_endpoint: str or None - as set by <zmqpubrawtx>, None: read from ZMQ_TX_ENDPOINT
+    :param longpoll_timeout: int - seconds one <waitfornewblock> waits at most (default is 30)
+    :param poll_interval: float - seconds between block count polls (default is 30.0)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self,
+                 node,
+                 zmq_block_endpoint: Optional[str] = None,
+                 zmq_tx_endpoint: Optional[str] = None,
+                 longpoll_timeout: int = 30,
+                 poll_interval: float = 30.0):
+        self.node                           = node
+        self.zmq_block_endpoint: Optional[str] = zmq_block_endpoint or os.getenv("ZMQ_BLOCK_ENDPOINT")
+        self.zmq_tx_endpoint: Optional[str] = zmq_tx_endpoint or os.getenv("ZMQ_TX_ENDPOINT")
+        self.longpoll_timeout: int          = longpoll_timeout
+        self.poll_interval: float           = poll_interval
+        # -------------------------------------------------------------------
+        self.source: Optional[str]          = None
+        self.last_block_hash: Optional[str] = None
+        self.events: int                    = 0
+        self._consumers: list               = []  # list of (callback, topics)
+        self._lock: threading.Lock          = threading.Lock()
+        self._stop: threading.Event         = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- consumers --------------------------------------------------------------------------------------------------
+
+    def subscribe(self, callback: Callable[[ChainEvent], None], topics: tuple = ("block", "tx")):
+        """=== Instance method =========================================================================================
+        :param callback: callable - called as callback(event) with a ChainEvent
+        :param topics: tuple - topics the consumer is interested in: 'block' and/or 'tx'
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._consumers.append((callback, tuple(topics)))
+
+    def unsubscribe(self, callback: Callable[[ChainEvent], None]):
+        """=== Instance method =========================================================================================
+        :param callback: callable - a consumer subscribed earlier
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._consumers = [_ for _ in self._consumers if _[0] is not callback]
+
+    def publish(self, event: ChainEvent):
+        """=== Instance method =========================================================================================
+        Fans <event> out to the consumers of its topic. Called by the sources - and by FakePublisher.
+        :param event: ChainEvent
+        ========================================================================================== by Sziller ==="""
+        if event.topic == "block":
+            if event.block_hash is not None and event.block_hash == self.last_block_hash:
+                return  # the same block reported twice (e.g. long-poll timing out on the same tip)
+            self.last_block_hash = event.block_hash
+            if event.height is None and event.block_hash is not None:
+                try:
+                    event.height = self.node.nodeop_getblockheight(block_hash=event.block_hash)
+                except Exception as e:
+                    lg.warning("event     : height of block {} unknown - {}".format(event.block_hash, e))
+            if event.height is not None:
+                self.node.chain_state.observe_tip(height=event.height, block_hash=event.block_hash)
+        self.events += 1
+        lg.debug("event     : {}".format(event))
+        with self._lock:
+            consumers = [callback for callback, topics in self._consumers if event.topic in topics]
+        for callback in consumers:
+            try:
+                callback(event)
+            except Exception as e:
+                lg.error("consumer  : {} failed on {} - {}".format(callback, event, e), exc_info=True)
+
+    # --- control ----------------------------------------------------------------------------------------------------
+
+    def start(self, source: str = "auto"):
+        """=== Instance method =========================================================================================
+        Starts listening on a daemon thread.
+        :param source: str - 'zmq', 'longpoll', 'poll', or 'auto': the best one available
+        ========================================================================================== by Sziller ==="""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if source == "auto":
+            if zmq is not None and (self.zmq_block_endpoint or self.zmq_tx_endpoint):
+                source = "zmq"
+            elif self.node.is_rpc:
+                source = "longpoll"
+            else:
+                source = "poll"
+        if source == "zmq" and zmq is None:
+            raise ImportError("pyzmq is needed to listen to BitcoinCore's ZMQ publisher: pip install pyzmq")
+        self.source = source
+        self._stop.clear()
+        target = {"zmq": self._run_zmq, "longpoll": self._run_longpoll, "poll": self._run_poll}[source]
+        self._thread = threading.Thread(target=target, name="chain-notifier", daemon=True)
+        self._thread.start()
+        lg.info("listening : chain events of < {:>20} > - source: {}".format(self.node.alias, source))
+
+    def stop(self):
+        """=== Instance method =========================================================================================
+        Stops listening. Returns once the listener thread has finished (a pending long-poll is waited out).
+        ========================================================================================== by Sziller ==="""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- sources ----------------------------------------------------------------------------------------------------
+
+    def _run_zmq(self):
+        """=== Internal utility method =================================================================================
+        Listens to BitcoinCore's ZMQ publisher. Messages: [topic, body, sequence number].
+        ========================================================================================== by Sziller ==="""
+        context = zmq.Context.instance()
+        socket = context.socket(zmq.SUB)
+        try:
+            if self.zmq_block_endpoint:
+                socket.connect(self.zmq_block_endpoint)
+                socket.setsockopt(zmq.SUBSCRIBE, b"hashblock")
+            if self.zmq_tx_endpoint:
+                if self.zmq_tx_endpoint != self.zmq_block_endpoint:
+                    socket.connect(self.zmq_tx_endpoint)
+                socket.setsockopt(zmq.SUBSCRIBE, b"rawtx")
+            poller = zmq.Poller()
+            poller.register(socket, zmq.POLLIN)
+            while not self._stop.is_set():
+                if not dict(poller.poll(timeout=500)):
+                    continue
+                topic, body = socket.recv_multipart()[:2]
+                if topic == b"hashblock":
+                    self.publish(ChainEvent(topic="block", block_hash=body.hex(), source="zmq"))
+                elif topic == b"rawtx":
+                    self.publish(ChainEvent(topic="tx", tx_hex=body.hex(), source="zmq"))
+        except Exception as e:
+            lg.error("zmq       : listener failed - {}".format(e), exc_info=True)
+        finally:
+            socket.close(linger=0)
+
+    def _run_longpoll(self):
+        """=== Internal utility method =================================================================================
+        Waits for new blocks by <waitfornewblock> - the node answers the moment a new tip arrives.
+        ========================================================================================== by Sziller ==="""
+        while not self._stop.is_set():
+            try:
+                tip = self.node._make_rpc_call("waitfornewblock", self.longpoll_timeout * 1000,
+                                               timeout=self.longpoll_timeout + 10)
+                self.publish(ChainEvent(topic="block", block_hash=tip["hash"], height=tip["height"],
+                                        source="longpoll"))
+            except Exception as e:
+                lg.warning("longpoll  : waitfornewblock failed - {}".format(e))
+                self._stop.wait(self.poll_interval)
+
+    def _run_poll(self):
+        """=== Internal utility method =================================================================================
+        Polls the block count - the fallback for nodes offering nothing better.
+        ========================================================================================== by Sziller ==="""
+        last_height = None
+        while not self._stop.is_set():
+            try:
+                height = self.node.nodeop_getblockcount(use_cache=False)
+                if height != last_height:
+                    last_height = height
+                    self.publish(ChainEvent(topic="block", height=height, source="poll"))
+            except Exception as e:
+                lg.warning("poll      : block count unavailable - {}".format(e))
+            self._stop.wait(self.poll_interval)
+
+
+class FakePublisher(object):
+    """=== Class name: FakePublisher ===================================================================================
+    Emits made-up chain events into a ChainNotifier - no node, no network: for testing consumers offline.
+    Block hashes are derived from the height, so they are deterministic.
+    :param notifier: ChainNotifier - the notifier whose consumers receive the events
+    :param height: int - height of the first block published (default is 1)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, notifier: ChainNotifier, height: int = 1):
+        self.notifier: ChainNotifier        = notifier
+        self.height: int                    = height
+
+    def block(self, block_hash: Optional[str] = None) -> ChainEvent:
+        """=== Instance method =========================================================================================
+        Publishes the next block.
+        :param block_hash: str or None - hash of the block, None: made up from the height
+        :return: ChainEvent - the event published
+        ========================================================================================== by Sziller ==="""
+        event = ChainEvent(topic="block", block_hash=block_hash or "{:064x}".format(self.height),
+                           height=self.height, source="fake")
+        self.height += 1
+        self.notifier.publish(event)
+        return event
+
+    def reorg(self, depth: int) -> ChainEvent:
+        """=== Instance method =========================================================================================
+        Publishes a competing block <depth> blocks below the next height - as a reorg would be seen.
+        :param depth: int - number of blocks replaced
+        :return: ChainEvent - the event published
+        ========================================================================================== by Sziller ==="""
+        self.height -= depth
+        return self.block(block_hash="{:064x}".format(self.height + (1 << 128)))
+
+    def tx(self, tx_hex: str) -> ChainEvent:
+        """=== Instance method =========================================================================================
+        Publishes a transaction.
+        :param tx_hex: str - raw hex of the transaction
+        :return: ChainEvent - the event published
+        ========================================================================================== by Sziller ==="""
+        event = ChainEvent(topic="tx", tx_hex=tx_hex, source="fake")
+        self.notifier.publish(event)
+        return event
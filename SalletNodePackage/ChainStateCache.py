@@ -0,0 +1,157 @@
+"""
+Cache of chain-state queries.
+What can be cached - and for how long - depends on how deep in the chain the answer lies:
+- the block count (tip) changes every ~10 minutes: cached for a short TTL, or until a new tip is observed,
+- the hash at a given height is final below a reorg-safety depth: cached forever there,
+- a block hash identifies its header (and height) for good: cached by hash.
+by Sziller
+"""
+
+import time
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('ChainStateCache.py'))
+
+
+class ChainStateCache(object):
+    """=== Class name: ChainStateCache =================================================================================
+    Thread safe, tip-aware cache of block count, block hashes by height and block headers by hash.
+    Lookups are split in two halves: <peek_*> answers from the cache - None on a miss -, and the caller reports
+    what it fetched from the node on a miss by <observe_tip()> / <remember_*()>. The cache never asks the node itself:
+    the same operations are driven blocking (Node) and on an event loop (AsyncNode).
+    :param tip_ttl: float - seconds the block count is trusted for (default is 10.0)
+    :param reorg_depth: int - hashes of blocks at least this deep are cached forever (default is 6)
+    :param max_headers: int - number of block headers kept - and of hashes by height, and of heights by hash: the
+                                least recently used ones are dropped beyond it (default is 10_000)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, tip_ttl: float = 10.0, reorg_depth: int = 6, max_headers: int = 10_000):
+        self.tip_ttl: float                 = tip_ttl
+        self.reorg_depth: int               = reorg_depth
+        self.max_headers: int               = max_headers
+        # -------------------------------------------------------------------
+        self.tip_height: Optional[int]      = None
+        self._tip_stamp: float              = 0.0
+        self._hashes: OrderedDict           = OrderedDict()  # key: height, value: block hash - final ones only
+        self._heights: OrderedDict          = OrderedDict()  # key: block hash, value: height
+        self._headers: OrderedDict          = OrderedDict()  # key: block hash, value: dict
+        self._lock: threading.Lock          = threading.Lock()
+        self.hits: int                      = 0
+        self.misses: int                    = 0
+
+    def peek_blockcount(self) -> Optional[int]:
+        """=== Instance method =========================================================================================
+        On a miss the caller reports the block count it fetched by <observe_tip()>.
+        :return: int or None - block count, None if the cached one is older than <tip_ttl>
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if self.tip_height is not None and time.monotonic() - self._tip_stamp < self.tip_ttl:
+                self.hits += 1
+                return self.tip_height
+            self.misses += 1
+        return None
+
+    def observe_tip(self, height: int, block_hash: Optional[str] = None):
+        """=== Instance method =========================================================================================
+        Records the tip - as fetched, or as learnt from elsewhere (e.g. a new block notification).
+        A tip lower than the one known means a reorg: hashes no longer deep enough to be final are dropped - with
+        the heights recorded for them.
+        :param height: int - height of the tip
+        :param block_hash: str or None - hash of the tip, if known
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if self.tip_height is not None and height < self.tip_height:
+                lg.warning("reorg     : tip moved back from {} to {} - says {}"
+                           .format(self.tip_height, height, self.ccn))
+                for h in [_ for _ in self._hashes if _ > height - self.reorg_depth]:
+                    self._heights.pop(self._hashes.pop(h), None)
+            self.tip_height = height
+            self._tip_stamp = time.monotonic()
+            if block_hash is not None:
+                self._remember_height(block_hash=block_hash, height=height)
+
+    def peek_blockhash(self, height: int) -> Optional[str]:
+        """=== Instance method =========================================================================================
+        On a miss, the caller reports the hash fetched by <remember_blockhash()>.
+        :param height: int - block height
+        :return: str or None - block hash, None if not cached
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            block_hash = self._hashes.get(height)
+            if block_hash is not None:
+                self._hashes.move_to_end(height)
+                self.hits += 1
+                return block_hash
+            self.misses += 1
+        return None
+
+    def remember_blockhash(self, height: int, block_hash: str):
+        """=== Instance method =========================================================================================
+        Records the hash of the block at <height> - kept for good if at least <reorg_depth> deep below the known tip.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._remember_height(block_hash=block_hash, height=height)
+            if self.tip_height is not None and height <= self.tip_height - self.reorg_depth:
+                self._hashes[height] = block_hash
+                self._hashes.move_to_end(height)
+                while len(self._hashes) > self.max_headers:
+                    self._hashes.popitem(last=False)
+
+    def peek_header(self, block_hash: str) -> Optional[dict]:
+        """=== Instance method =========================================================================================
+        On a miss, the caller reports the header fetched by <remember_header()>.
+        :param block_hash: str - block hash
+        :return: dict or None - copy of the block header, None if not cached
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            header = self._headers.get(block_hash)
+            if header is not None:
+                self._headers.move_to_end(block_hash)
+                self.hits += 1
+                return dict(header)
+            self.misses += 1
+        return None
+
+    def peek_height(self, block_hash: str) -> Optional[int]:
+        """=== Instance method =========================================================================================
+        :param block_hash: str - block hash
+        :return: int or None - height of the block, None if neither the height nor the header is known
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            height = self._heights.get(block_hash)
+            if height is not None:
+                self._heights.move_to_end(block_hash)
+                self.hits += 1
+                return height
+        return None
+
+    def remember_header(self, block_hash: str, header: dict):
+        """=== Instance method =========================================================================================
+        Records a block header - e.g. the header fields of an entire block fetched for another purpose.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._headers[block_hash] = header
+            self._headers.move_to_end(block_hash)
+            while len(self._headers) > self.max_headers:
+                self._headers.popitem(last=False)
+            if "height" in header:
+                self._remember_height(block_hash=block_hash, height=header["height"])
+
+    def _remember_height(self, block_hash: str, height: int):
+        """=== Internal utility method =================================================================================
+        Records the height of a block, dropping the least recently used heights beyond <max_headers>.
+        Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        self._heights[block_hash] = height
+        self._heights.move_to_end(block_hash)
+        while len(self._heights) > self.max_headers:
+            self._heights.popitem(last=False)
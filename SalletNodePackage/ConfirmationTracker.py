@@ -0,0 +1,205 @@
+"""
+Tracking confirmations of many transactions at once.
+Instead of re-reading every watched transaction on every check, the block height of each is recorded once it is
+mined; from then on its confirmations are simple arithmetic on the tip. A refresh costs one tip lookup, plus one bulk
+lookup of the transactions not mined yet.
+by Sziller
+"""
+
+import inspect
+import logging
+import threading
+from typing import Optional, Callable
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('ConfirmationTracker.py'))
+
+
+class ConfirmationTracker(object):
+    """=== Class name: ConfirmationTracker =============================================================================
+    Holds a set of watched txids, refreshes them in batches - on demand, or on a schedule by its own thread.
+    Callbacks registered by <on_threshold()> are called as callback(txid, confirmations, threshold) once a watched
+    transaction reaches a threshold (each threshold reported once per transaction - and once more if a reorg drops it).
+    Mined transactions shallower than the reorg-safety depth of the Node's chain state are re-verified on RPC nodes:
+    if the block at their recorded height has changed, they are considered unconfirmed again - thresholds crossed are
+    forgotten, so they are reported again once the transaction is re-mined.
+    :param node: Node - the node asked
+    :param thresholds: tuple - confirmation counts to call back on (default is (1, 6))
+    :param interval: float - seconds between scheduled refreshes (default is 30.0)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, node, thresholds: tuple = (1, 6), interval: float = 30.0):
+        self.node                           = node
+        self.thresholds: tuple              = tuple(sorted(thresholds))
+        self.interval: float                = interval
+        # -------------------------------------------------------------------
+        self.tip_height: Optional[int]      = None
+        self._watched: dict                 = {}  # key: txid, value: dict of height, blockhash, crossed thresholds
+        self._callbacks: list               = []
+        self._lock: threading.RLock         = threading.RLock()
+        self._stop: threading.Event         = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self._watched)
+
+    # --- watch list -------------------------------------------------------------------------------------------------
+
+    def watch(self, txid: str):
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID to be watched (watching it again changes nothing)
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._watched.setdefault(txid, {"height": None, "blockhash": None, "crossed": set()})
+
+    def unwatch(self, txid: str):
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID not to be watched any more
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._watched.pop(txid, None)
+
+    def on_threshold(self, callback: Callable[[str, int, int], None]):
+        """=== Instance method =========================================================================================
+        :param callback: callable - called as callback(txid, confirmations, threshold)
+        ========================================================================================== by Sziller ==="""
+        self._callbacks.append(callback)
+
+    # --- queries ----------------------------------------------------------------------------------------------------
+
+    def confirmations(self, txid: str) -> int:
+        """=== Instance method =========================================================================================
+        Computed from the recorded block height and the tip of the last refresh - the node is not asked.
+        :param txid: str - a watched transaction ID
+        :return: int - number of confirmations, 0 if not mined (or not watched)
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            entry = self._watched.get(txid)
+            if entry is None or entry["height"] is None or self.tip_height is None:
+                return 0
+            return max(0, self.tip_height - entry["height"] + 1)
+
+    def is_confirmed(self, txid: str, limit: int = 6) -> bool:
+        """=== Instance method =========================================================================================
+        :param txid: str - a watched transaction ID
+        :param limit: int - Minimum number of confirmations to be considered confirmed (default 6)
+        :return: bool - True if the transaction is confirmed, False otherwise
+        ========================================================================================== by Sziller ==="""
+        return self.confirmations(txid=txid) >= limit
+
+    # --- refresh ----------------------------------------------------------------------------------------------------
+
+    def refresh(self):
+        """=== Instance method =========================================================================================
+        One tip lookup, one bulk lookup of the transactions not mined yet, verification of the shallow ones - then
+        callbacks of every threshold crossed.
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        tip = self.node.nodeop_getblockcount()
+        with self._lock:
+            self.tip_height = tip
+            pending = [txid for txid, entry in self._watched.items() if entry["height"] is None]
+            shallow = [(txid, entry["height"], entry["blockhash"]) for txid, entry in self._watched.items()
+                       if entry["height"] is not None and entry["blockhash"] is not None
+                       and tip - entry["height"] + 1 < self.node.chain_state.reorg_depth]
+        lg.debug("refresh   : tip {} - {} pending, {} shallow - says {}".format(tip, len(pending), len(shallow), cmn))
+
+        if pending:
+            for txid, tx_data in self.node.nodeop_getrawtransactions(tx_hashes=pending, verbose=True, ordered=False):
+                if tx_data:
+                    self._record_block(txid=txid, tx_data=tx_data)
+        if self.node.is_rpc:
+            for txid, height, block_hash in shallow:
+                try:
+                    still_there = self.node.nodeop_getblockhash(height) == block_hash
+                except Exception as e:
+                    lg.warning("verify    : {} at height {} failed - {}".format(txid, height, e))
+                    continue
+                if not still_there:
+                    lg.warning("reorg     : {} no longer in block {} - says {}".format(txid, block_hash, self.ccn))
+                    with self._lock:
+                        if txid in self._watched:
+                            self._watched[txid].update(height=None, blockhash=None, crossed=set())
+        self._fire_callbacks()
+
+    def _record_block(self, txid: str, tx_data: dict):
+        """=== Internal utility method =================================================================================
+        Records the block height (and hash) of a mined transaction - as told by the verbose TX.
+        ========================================================================================== by Sziller ==="""
+        if self.node.is_rpc:
+            block_hash = tx_data.get("blockhash")
+            if not block_hash:
+                return
+            height = self.node.nodeop_getblockheight(block_hash=block_hash)
+        else:
+            block_hash, height = None, tx_data.get("block_height")
+            if not height:
+                return
+        with self._lock:
+            if txid in self._watched:
+                self._watched[txid].update(height=height, blockhash=block_hash)
+                lg.info("mined     : {} at height {}".format(txid, height))
+
+    def _fire_callbacks(self):
+        """=== Internal utility method =================================================================================
+        Calls back on thresholds newly crossed. A failing callback does not stop the others.
+        ========================================================================================== by Sziller ==="""
+        events = []
+        with self._lock:
+            for txid, entry in self._watched.items():
+                confirmations = self.confirmations(txid=txid)
+                for threshold in self.thresholds:
+                    if confirmations >= threshold and threshold not in entry["crossed"]:
+                        entry["crossed"].add(threshold)
+                        events.append((txid, confirmations, threshold))
+        for event in events:
+            for callback in self._callbacks:
+                try:
+                    callback(*event)
+                except Exception as e:
+                    lg.error("callback  : {} failed on {} - {}".format(callback, event, e), exc_info=True)
+
+    def on_chain_event(self, event):
+        """=== Instance method =========================================================================================
+        Consumer of a ChainNotifier: refreshes on every new block - instead of (or next to) the schedule.
+        notifier.subscribe(tracker.on_chain_event, topics=("block",))
+        :param event: ChainEvent - the event received
+        ========================================================================================== by Sziller ==="""
+        if event.topic == "block":
+            self.refresh()
+
+    # --- schedule ---------------------------------------------------------------------------------------------------
+
+    def start(self):
+        """=== Instance method =========================================================================================
+        Starts refreshing every <interval> seconds on a daemon thread.
+        ========================================================================================== by Sziller ==="""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="confirmations", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """=== Instance method =========================================================================================
+        Stops the scheduled refreshes.
+        ========================================================================================== by Sziller ==="""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """=== Internal utility method =================================================================================
+        Body of the scheduler thread.
+        ========================================================================================== by Sziller ==="""
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                lg.error("refresh   : failed - {}".format(e), exc_info=False)
+            self._stop.wait(self.interval)
@@ -0,0 +1,134 @@
+"""
+Health bookkeeping of a node.
+Every call made to a node - and every probe - is recorded: latency and success feed exponentially weighted moving
+averages, consecutive failures trip a circuit breaker that keeps the node out of the rotation for a while.
+by Sziller
+"""
+
+import time
+import inspect
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('NodeHealth.py'))
+
+
+class NodeHealth(object):
+    """=== Class name: NodeHealth ======================================================================================
+    Health of ONE node, identified by its alias. Thread safe.
+    Circuit breaker:
+    - closed:       the node is used,
+    - open:         after <trip_after> consecutive failures the node is ejected for <cooldown> seconds,
+    - half-open:    once <cooldown> has passed, the node is re-admitted on trial: one success closes the breaker,
+                    one failure opens it again - for twice as long (up to <max_cooldown>).
+    :param alias: str - alias of the node
+    :param alpha: float - weight of the newest sample in the moving averages (default is 0.2)
+    :param trip_after: int - consecutive failures opening the breaker (default is 3)
+    :param cooldown: float - seconds the node is ejected for at first (default is 30.0)
+    :param max_cooldown: float - upper limit of the growing ejection time (default is 600.0)
+    :param window: int - number of latest latencies kept for percentiles (default is 100)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self,
+                 alias: str,
+                 alpha: float = 0.2,
+                 trip_after: int = 3,
+                 cooldown: float = 30.0,
+                 max_cooldown: float = 600.0,
+                 window: int = 100):
+        self.alias: str                     = alias
+        self.alpha: float                   = alpha
+        self.trip_after: int                = trip_after
+        self.base_cooldown: float           = cooldown
+        self.max_cooldown: float            = max_cooldown
+        # -------------------------------------------------------------------
+        self.latency: Optional[float]       = None  # EWMA of successful calls, in seconds
+        self.error_rate: float              = 0.0   # EWMA of failures: 0.0 - never fails, 1.0 - always fails
+        self.calls: int                     = 0
+        self.failures: int                  = 0
+        self.consecutive_failures: int      = 0
+        self.cooldown: float                = cooldown
+        self.open_until: Optional[float]    = None  # breaker open till this time
+        self._latencies: deque              = deque(maxlen=window)
+        self._lock: threading.Lock          = threading.Lock()
+
+    def __repr__(self):
+        latency = "n/a" if self.latency is None else "{:.0f} ms".format(self.latency * 1000)
+        return "{}({} - {} - err: {:.0%} - {})".format(self.ccn, self.alias, latency, self.error_rate, self.state())
+
+    def record_success(self, latency: float):
+        """=== Instance method =========================================================================================
+        :param latency: float - duration of the successful call in seconds
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self.calls += 1
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+            self.error_rate = (1 - self.alpha) * self.error_rate
+            self._latencies.append(latency)
+            if self.open_until is not None:
+                lg.info("readmit   : node < {:>20} > - breaker closed".format(self.alias))
+            self.consecutive_failures = 0
+            self.cooldown = self.base_cooldown
+            self.open_until = None
+
+    def record_failure(self):
+        """=== Instance method =========================================================================================
+        Records a failed call, opening the breaker if the node failed too many times in a row - or failed its trial.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            now = time.time()
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            if self.open_until is not None and now >= self.open_until:  # failed on trial (half-open)
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.open_until = now + self.cooldown
+            elif self.open_until is None and self.consecutive_failures >= self.trip_after:
+                self.open_until = now + self.cooldown
+            else:
+                return
+            lg.warning("eject     : node < {:>20} > for {:.0f} sec - {} failures in a row"
+                       .format(self.alias, self.cooldown, self.consecutive_failures))
+
+    def state(self) -> str:
+        """=== Instance method =========================================================================================
+        :return: str - 'closed', 'open' or 'half-open'
+        ========================================================================================== by Sziller ==="""
+        if self.open_until is None:
+            return "closed"
+        return "open" if time.time() < self.open_until else "half-open"
+
+    def is_available(self) -> bool:
+        """=== Instance method =========================================================================================
+        :return: bool - True if the node may be called (breaker closed or half-open)
+        ========================================================================================== by Sziller ==="""
+        return self.state() != "open"
+
+    def score(self, error_penalty: float = 4.0) -> float:
+        """=== Instance method =========================================================================================
+        Expected cost of a call: the lower, the better. Unmeasured nodes score 0.0 - so they get measured.
+        :param error_penalty: float - how many times slower a node failing all the time is deemed to be
+        :return: float - latency weighted by error rate
+        ========================================================================================== by Sziller ==="""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + error_penalty * self.error_rate)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """=== Instance method =========================================================================================
+        :param p: float - percentile in 0.0 - 100.0
+        :return: float or None - <p>-th percentile of the latest latencies in seconds, None if none recorded
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
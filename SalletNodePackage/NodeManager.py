@@ -4,15 +4,22 @@ by Sziller
 """
 
 import os
+import time
 import inspect
 import logging
+import threading
 from typing import Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 from sql_access import sql_interface as sqla
 from sql_bases.sqlbase_node.sqlbase_node import Node as sqlNode
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import declarative_base
 from SalletNodePackage.BitcoinNodeObject import Node
+from SalletNodePackage.TxCache import TxCache
+from SalletNodePackage.OutpointIndex import OutpointValueIndex
+from SalletNodePackage.NodeHealth import NodeHealth
 
 Base = declarative_base()
 
@@ -31,6 +38,12 @@ class NODEManager:
     :param session_in: Optional[Session] - Optional SQLAlchemy session for database interaction.
     ============================================================================================== by Sziller ==="""
     ccn = inspect.currentframe().f_code.co_name  # current class name
+    # Node operations safe to send twice: they only read. Never hedged: <nodeop_publish_tx> and other writes
+    _READ_ONLY_COMMANDS: tuple = ("nodeop_getconnectioncount", "nodeop_getblockcount", "nodeop_getblockhash",
+                                  "nodeop_getblock", "nodeop_getblockheader", "nodeop_getblockheight",
+                                  "nodeop_getblock_raw", "nodeop_getrawtransaction", "nodeop_get_tx_outpoint_value",
+                                  "nodeop_get_input_values_sat", "nodeop_confirmations",
+                                  "nodeop_check_tx_confirmation")
 
     def __init__(self,
                  dotenv_path="./.env",
@@ -43,12 +56,29 @@ class NODEManager:
         # -------------------------------------------------------------------
         self.node_obj_dict: Optional[dict]      = None
         self.active_alias: Optional[str]        = None
+        self.tx_cache: Optional[TxCache]        = None  # shared by all Nodes handed out
+        self.outpoint_index: OutpointValueIndex = OutpointValueIndex()  # shared by all Nodes handed out
+        self.health: dict                       = {}    # key: alias, value: NodeHealth
+        self.max_lag: int                       = 2     # blocks a node may lag behind the best one when probed
+        self._node_instances: dict              = {}    # key: alias, value: Node - keeps connection pools alive
+        self._lock: threading.Lock              = threading.Lock()
+        # --- hedged requests (opt-in) ---------------------------------------
+        self.hedging: bool                      = False  # True: call() duplicates slow requests to a second node
+        self.hedge_commands: tuple              = self._READ_ONLY_COMMANDS  # only these are ever duplicated
+        self.hedge_percentile: float            = 95.0   # primary's latency percentile to wait before hedging
+        self.hedge_default_delay: float         = 0.5    # seconds to wait before hedging, while nothing is measured
+        self.hedge_stats: dict                  = {"requests": 0, "hedged": 0, "won_by_primary": 0,
+                                                   "won_by_hedge": 0, "cancelled": 0, "failed": 0}
+        self.hedge_log: deque                   = deque(maxlen=1000)  # per-request accounting, latest ones
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
         # -------------------------------------------------------------------
         try:
             load_dotenv(dotenv_path=dotenv_path)
         except Exception as e:
             lg.error(f"dotenv    : Error loading .env file:\n{e}")
             raise
+        # persistent tier of the TX cache only if a path is set in the .env file
+        self.tx_cache = TxCache(db_path=os.getenv("DB_PATH_TXCACHE"))
     
     def read_db(self) -> list:
         """=== Instance method =========================================================================================
@@ -82,39 +112,250 @@ class NODEManager:
         """=== Instance method =========================================================================================
         Iterates through the list of nodes and returns the next valid Node instance.
         This method checks if the node is RPC or API-based and loads the sensitive data accordingly.
+        Nodes ejected by their circuit breaker are skipped.
         :return: Node - The next valid Node instance.
         ========================================================================================== by Sziller ==="""
-        active_Node = None
-        valid = False
-        while not valid:
-            # Dynamically get the list of keys
-            rpc_node_var = os.getenv("RPC_NODE_VARIABLE")
-            api_node_var = os.getenv("API_NODE_VARIABLE")
-            keys = list(self.node_obj_dict.keys())
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        keys = list(self.node_obj_dict.keys())
+        for _ in range(len(keys)):
             # Determine the current index based on the active_key
-            if self.active_alias is None:
+            if self.active_alias is None or self.active_alias not in keys:
                 # If it's the first call, start from the first key
                 self.active_alias = keys[0]
             else:
-                # Find the current index of active_key
-                current_index = keys.index(self.active_alias)
                 # Move to the next index, wrapping around
-                self.active_alias = keys[(current_index + 1) % len(keys)]
-            is_rpc = bool(self.node_obj_dict[self.active_alias]['is_rpc'])
-            active_Node = Node(alias=self.active_alias, is_rpc=is_rpc)
-            if is_rpc:
-                active_Node.update_sensitive_data(
-                    rpc_ip=os.getenv(rpc_node_var.format(self.active_alias.upper()) + "_IP"),
-                    rpc_port=os.getenv(rpc_node_var.format(self.active_alias.upper()) + "_PORT"),
-                    rpc_user=os.getenv(rpc_node_var.format(self.active_alias.upper()) + "_USER"),
-                    rpc_password=os.getenv(rpc_node_var.format(self.active_alias.upper()) + "_PSSW"))
+                self.active_alias = keys[(keys.index(self.active_alias) + 1) % len(keys)]
+            if not self.get_health(self.active_alias).is_available():
+                continue
+            active_Node = self._instantiate_node(alias=self.active_alias)
+            if active_Node is not None:
+                return active_Node
+        msg = "not found : no valid and available Node among {} - says {}.{}".format(keys, self.ccn, cmn)
+        lg.critical(msg)
+        raise Exception(msg)
+
+    def return_best_node_instance(self, exclude: tuple = (), is_rpc: Optional[bool] = None):
+        """=== Instance method =========================================================================================
+        Returns the Node expected to answer fastest: the available one of the lowest health score.
+        Nodes never measured score best - so a fresh manager spreads its first calls, measuring every node.
+        :param exclude: tuple - aliases not to be returned (e.g. the one that has just failed)
+        :param is_rpc: bool or None - only RPC (True) or only external API (False) nodes, None: either.
+                                      RPC and API nodes answer the same operation in differently shaped data:
+                                      a node standing in for another must be of the same kind.
+        :return: Node - The best valid and available Node instance.
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        candidates = sorted((self.get_health(_).score(), _) for _ in self.node_obj_dict
+                            if _ not in exclude and self.get_health(_).is_available()
+                            and (is_rpc is None or bool(self.node_obj_dict[_]['is_rpc']) == is_rpc))
+        for _, alias in candidates:
+            active_Node = self._instantiate_node(alias=alias)
+            if active_Node is not None:
+                self.active_alias = alias
+                return active_Node
+        msg = "not found : no valid and available Node - says {}.{}".format(self.ccn, cmn)
+        lg.critical(msg)
+        raise Exception(msg)
+
+    def probe_nodes(self, max_workers: int = 8) -> dict:
+        """=== Instance method =========================================================================================
+        Probes ALL configured nodes in parallel with <getblockcount>, recording latency and success.
+        A node lagging more than <max_lag> blocks behind the best one counts as failed.
+        :param max_workers: int - number of nodes probed at once
+        :return: dict - key: alias, value: block count - None if the probe failed
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        aliases = list(self.node_obj_dict.keys())
+
+        def probe(alias):
+            node = self._instantiate_node(alias=alias)
+            if node is None:
+                return None, None
+            start = time.perf_counter()
+            try:
+                return node.nodeop_getblockcount(use_cache=False), time.perf_counter() - start
+            except Exception as e:
+                lg.warning("probe     : node < {:>20} > failed - {}".format(alias, e))
+                return None, None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(aliases)))) as executor:
+            answers = dict(zip(aliases, executor.map(probe, aliases)))
+        counts = [count for count, _ in answers.values() if isinstance(count, int)]
+        best = max(counts) if counts else None
+        result = {}
+        for alias, (count, latency) in answers.items():
+            if isinstance(count, int) and count >= best - self.max_lag:
+                self.get_health(alias).record_success(latency=latency)
+                result[alias] = count
             else:
-                active_Node.update_sensitive_data(
-                    ext_node_url=os.getenv(api_node_var.format(self.active_alias.upper()) + "_URL"))
-            if active_Node.is_valid():
-                active_Node.features   = self.node_obj_dict[self.active_alias]['features']
-                active_Node.owner      = self.node_obj_dict[self.active_alias]['owner']
-                active_Node.desc       = self.node_obj_dict[self.active_alias]['desc']
-                valid = True
-        return active_Node
-    
+                self.get_health(alias).record_failure()
+                result[alias] = None
+            lg.info("probed    : {} - block count: {}".format(self.get_health(alias), result[alias]))
+        lg.debug("returning : {} probes - says {}".format(len(result), cmn))
+        return result
+
+    def call(self, command: str, *args, **kwargs):
+        """=== Instance method =========================================================================================
+        Routes a Node operation to the best healthy node, falling over to the next best one of the same kind (RPC or
+        API) if it raises - or answers None (Node methods' way of failing silently). Every attempt is recorded in the
+        health of the node called.
+        With <hedging> on, read-only requests (<hedge_commands>) are hedged instead - see hedged_call().
+        :param command: str - name of the Node method, e.g. 'nodeop_getrawtransaction'
+        :return: whatever the Node method returns
+        ========================================================================================== by Sziller ==="""
+        if self.hedging and command in self.hedge_commands:
+            return self.hedged_call(command, *args, **kwargs)
+        return self._failover_call(command, args, kwargs)
+
+    def _failover_call(self, command: str, args: tuple, kwargs: dict, tried: tuple = (),
+                       is_rpc: Optional[bool] = None, last_error: Optional[Exception] = None):
+        """=== Internal utility method =================================================================================
+        Tries the healthy nodes one after the other, best first, till one answers - see call().
+        :param tried: tuple - aliases of the nodes already tried: skipped
+        :param is_rpc: bool or None - kind of nodes to be tried, None: that of the best node
+        :param last_error: Exception or None - error of the nodes already tried, reported if none answers
+        ========================================================================================== by Sziller ==="""
+        for _ in range(len(self.node_obj_dict)):
+            try:
+                node = self.return_best_node_instance(exclude=tried, is_rpc=is_rpc)
+            except Exception:
+                break
+            tried, is_rpc = tried + (node.alias,), node.is_rpc  # failover keeps the shape of the answer
+            try:
+                return self._timed_call(node, command, args, kwargs)
+            except Exception as e:
+                lg.warning("failover  : {} failed on < {:>20} > - {}".format(command, node.alias, e))
+                last_error = e
+        raise Exception("{} failed on every available node {} - last error: {}".format(command, tried, last_error))
+
+    def hedged_call(self, command: str, *args, **kwargs):
+        """=== Instance method =========================================================================================
+        Sends a read-only Node operation to the best node, and - if it has not answered within its own
+        <hedge_percentile> latency - a duplicate to the second best one of the same kind (RPC or API: their answers
+        are shaped differently). Whichever answers first wins, the other request is cancelled if not yet started,
+        its answer ignored otherwise.
+        A node raising, or answering None (Node methods' way of failing silently), does not win. If both fail, the
+        remaining nodes of the same kind are tried one after the other, as by call().
+        Commands not in <hedge_commands> are never duplicated: they go down the failover of call() right away.
+        Accounting: <hedge_stats> counts outcomes, <hedge_log> keeps a record of each request.
+        :param command: str - name of the Node method, e.g. 'nodeop_getrawtransaction'
+        :return: whatever the Node method returns
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        if command not in self.hedge_commands:
+            return self._failover_call(command, args, kwargs)
+        start = time.perf_counter()
+        primary = self.return_best_node_instance()
+        try:
+            secondary = self.return_best_node_instance(exclude=(primary.alias,), is_rpc=primary.is_rpc)
+        except Exception:
+            secondary = None
+        delay = self.get_health(primary.alias).percentile(self.hedge_percentile) or self.hedge_default_delay
+        record = {"command": command, "primary": primary.alias, "secondary": None, "delay": delay,
+                  "hedged": False, "winner": None, "latency": None}
+        with self._lock:
+            self.hedge_stats["requests"] += 1
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        pending = {self._hedge_executor.submit(self._timed_call, primary, command, args, kwargs): primary.alias}
+        done, _ = wait(pending, timeout=delay)
+        primary_failed = bool(done) and next(iter(done)).exception() is not None
+        if secondary is not None and (not done or primary_failed):
+            lg.debug("hedging   : {} on < {:>20} > after {:.0f} ms".format(command, secondary.alias, delay * 1000))
+            record["hedged"], record["secondary"] = True, secondary.alias
+            pending[self._hedge_executor.submit(self._timed_call, secondary, command, args, kwargs)] = secondary.alias
+
+        last_error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                alias = pending.pop(future)
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                record["winner"], record["latency"] = alias, time.perf_counter() - start
+                with self._lock:
+                    self.hedge_stats["won_by_primary" if alias == primary.alias else "won_by_hedge"] += 1
+                    self.hedge_stats["hedged"] += record["hedged"]
+                    for loser in pending:
+                        self.hedge_stats["cancelled"] += loser.cancel()
+                    self.hedge_log.append(record)
+                lg.debug("returning : {} answered by < {:>20} > in {:.0f} ms - says {}"
+                         .format(command, alias, record["latency"] * 1000, cmn))
+                return future.result()
+        record["latency"] = time.perf_counter() - start
+        with self._lock:
+            self.hedge_stats["hedged"] += record["hedged"]
+            self.hedge_stats["failed"] += 1
+            self.hedge_log.append(record)
+        lg.warning("failover  : hedged {} failed on < {} > - {}".format(command, record, last_error))
+        tried = tuple(_ for _ in (primary.alias, record["secondary"]) if _ is not None)
+        return self._failover_call(command, args, kwargs, tried=tried, is_rpc=primary.is_rpc, last_error=last_error)
+
+    def _timed_call(self, node, command: str, args: tuple, kwargs: dict):
+        """=== Internal utility method =================================================================================
+        Runs one Node operation, recording its outcome in the health of the node - also if it lost a hedged race.
+        ========================================================================================== by Sziller ==="""
+        start = time.perf_counter()
+        try:
+            resp = getattr(node, command)(*args, **kwargs)
+        except Exception:
+            self.record_call(alias=node.alias, latency=None, ok=False)
+            raise
+        if resp is None:
+            self.record_call(alias=node.alias, latency=None, ok=False)
+            raise Exception("{} answered None on < {} >".format(command, node.alias))
+        self.record_call(alias=node.alias, latency=time.perf_counter() - start, ok=True)
+        return resp
+
+    def record_call(self, alias: str, latency: Optional[float], ok: bool):
+        """=== Instance method =========================================================================================
+        Records the outcome of a call made to a node handed out earlier.
+        :param alias: str - alias of the node called
+        :param latency: float or None - duration of the call in seconds (ignored if not <ok>)
+        :param ok: bool - True if the call succeeded
+        ========================================================================================== by Sziller ==="""
+        if ok:
+            self.get_health(alias).record_success(latency=latency)
+        else:
+            self.get_health(alias).record_failure()
+
+    def get_health(self, alias: str) -> NodeHealth:
+        """=== Instance method =========================================================================================
+        :param alias: str - alias of a node
+        :return: NodeHealth - health of the node (created on first request)
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if alias not in self.health:
+                self.health[alias] = NodeHealth(alias=alias)
+            return self.health[alias]
+
+    def _instantiate_node(self, alias: str):
+        """=== Internal utility method =================================================================================
+        Returns the Node instance of <alias> - instantiated once, loaded with its sensitive data from the .env file.
+        :param alias: str - alias of a node in <node_obj_dict>
+        :return: Node or None - None if the configuration of the node is not valid
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if alias in self._node_instances:
+                return self._node_instances[alias]
+        rpc_node_var = os.getenv("RPC_NODE_VARIABLE")
+        api_node_var = os.getenv("API_NODE_VARIABLE")
+        is_rpc = bool(self.node_obj_dict[alias]['is_rpc'])
+        active_Node = Node(alias=alias, is_rpc=is_rpc, tx_cache=self.tx_cache, outpoint_index=self.outpoint_index)
+        if is_rpc:
+            active_Node.update_sensitive_data(
+                rpc_ip=os.getenv(rpc_node_var.format(alias.upper()) + "_IP"),
+                rpc_port=os.getenv(rpc_node_var.format(alias.upper()) + "_PORT"),
+                rpc_user=os.getenv(rpc_node_var.format(alias.upper()) + "_USER"),
+                rpc_password=os.getenv(rpc_node_var.format(alias.upper()) + "_PSSW"))
+        else:
+            active_Node.update_sensitive_data(
+                ext_node_url=os.getenv(api_node_var.format(alias.upper()) + "_URL"))
+        if not active_Node.is_valid():
+            return None
+        active_Node.features   = self.node_obj_dict[alias]['features']
+        active_Node.owner      = self.node_obj_dict[alias]['owner']
+        active_Node.desc       = self.node_obj_dict[alias]['desc']
+        with self._lock:
+            return self._node_instances.setdefault(alias, active_Node)
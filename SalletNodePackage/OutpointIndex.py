@@ -0,0 +1,93 @@
+"""
+Compact index of transaction output values.
+Whenever a Node sees a transaction (or a prevout of one), the values of its outputs are recorded, so later lookups of
+the same outpoints need no node access at all. Values are stored in integer satoshis, one compact array per TX.
+by Sziller
+"""
+
+import inspect
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('OutpointIndex.py'))
+
+
+class OutpointValueIndex(object):
+    """=== Class name: OutpointValueIndex ==============================================================================
+    Thread safe map of outpoint (txid, n) -> value in sats, filling itself as transactions are seen.
+    Output values never change once a TX exists, so entries never go stale; the least recently used TXs are dropped
+    beyond <max_txs>.
+    :param max_txs: int - number of transactions kept in the index (default is 500_000)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+    _UNKNOWN: int = -1  # placeholder of not yet seen outputs of a partially known TX
+
+    def __init__(self, max_txs: int = 500_000):
+        self.max_txs: int                   = max_txs
+        self._values: OrderedDict           = OrderedDict()  # key: txid as 32 bytes, value: array('q') of sats
+        self._lock: threading.Lock          = threading.Lock()
+        self.hits: int                      = 0
+        self.misses: int                    = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, txid: str, n: int) -> Optional[int]:
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID in hex
+        :param n: int - index of the output
+        :return: int or None - value of the outpoint in sats, None if not known
+        ========================================================================================== by Sziller ==="""
+        key = bytes.fromhex(txid)
+        with self._lock:
+            values = self._values.get(key)
+            if values is not None and n < len(values) and values[n] != self._UNKNOWN:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return values[n]
+            self.misses += 1
+            return None
+
+    def add_tx(self, txid: str, values_sat: list):
+        """=== Instance method =========================================================================================
+        Records the values of ALL outputs of a TX.
+        :param txid: str - transaction ID in hex
+        :param values_sat: list - of output values in sats, in output order
+        ========================================================================================== by Sziller ==="""
+        key = bytes.fromhex(txid)
+        with self._lock:
+            self._values[key] = array('q', values_sat)
+            self._values.move_to_end(key)
+            self._evict()
+
+    def add_outpoint(self, txid: str, n: int, value_sat: int):
+        """=== Instance method =========================================================================================
+        Records the value of ONE output (e.g. learnt from a prevout, or from gettxout).
+        :param txid: str - transaction ID in hex
+        :param n: int - index of the output
+        :param value_sat: int - value of the output in sats
+        ========================================================================================== by Sziller ==="""
+        key = bytes.fromhex(txid)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = array('q')
+            if len(values) <= n:
+                values.extend([self._UNKNOWN] * (n + 1 - len(values)))
+            values[n] = value_sat
+            self._values.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        """=== Internal utility method =================================================================================
+        Drops the least recently used TXs beyond <max_txs>. Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        while len(self._values) > self.max_txs:
+            self._values.popitem(last=False)
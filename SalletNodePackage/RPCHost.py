@@ -3,9 +3,13 @@
 import time
 import inspect
 import logging
+import threading
 import requests
 import json
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
 from requests.exceptions import Timeout, HTTPError, RequestException
+from requests.exceptions import ConnectionError as ReqConnectionError
 
 # Set up a logger
 lg = logging.getLogger(__name__)
@@ -15,23 +19,96 @@ lg.info("START: {:>83} <<<".format("RPCHost.py"))
 class RPCHost(object):
     """=== Class name: RPCHost =========================================================================================
     Object translates calls into RPC commands to an address.
-    Initializes the RPCHost object, setting up the session, URL, and configurable retry parameters.
+    Initializes the RPCHost object, setting up the URL, and configurable retry and pooling parameters.
+    The underlying keep-alive session is created lazily, shared by all threads using the instance, and dropped
+    once it has been idle for longer than <idle_timeout> (so the node never sees us reuse a socket it closed).
     :param url: str - The URL of the node to which RPC calls will be sent.
     :param retries: int - Number of retry attempts in case of connection failure (default is 10).
     :param sleep_time: float - Sleep time (in seconds) between retry attempts (default is 0.5).
     :param timeout: int - The timeout duration (in seconds) for each RPC call (default is 10).
+    :param pool_size: int - Max. number of keep-alive connections kept open towards the node (default is 10).
+    :param idle_timeout: float - Seconds of inactivity after which the pool is evicted (default is 15.0),
+                                 None: never evict. Keep it below bitcoind's <rpcservertimeout> (30 sec by default).
     ========================================================================= by Sziller & internet & ChatGPT ==="""
     ccn = inspect.currentframe().f_code.co_name  # current class name
     
-    def __init__(self, url: str, retries: int = 10, sleep_time: float = 0.5, timeout: int = 10):
+    def __init__(self,
+                 url: str,
+                 retries: int = 10,
+                 sleep_time: float = 0.5,
+                 timeout: int = 10,
+                 pool_size: int = 10,
+                 idle_timeout: (float, None) = 15.0):
         lg.debug("START: {:>85} <<<".format(self.ccn))
-        self._session = requests.Session()
         self._url = url
         self._headers = {'content-type': 'application/json'}
+        # --- connection pool ---
+        self._session: (requests.Session, None) = None
+        self._lock: threading.Lock          = threading.Lock()
+        self._in_flight: int                = 0
+        self._last_used: float              = 0.0
         # --- custom made parameters ---
         self.retries: int                   = retries
         self.sleep_time: float              = sleep_time
         self.timeout: (int, None)           = timeout
+        self.pool_size: int                 = pool_size
+        self.idle_timeout: (float, None)    = idle_timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """=== Instance method =========================================================================================
+        Closes the connection pool. The instance stays usable: the next call opens a new pool.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+                lg.debug("closed    : RPC connection pool - says {}".format(self.ccn))
+
+    def _new_session(self) -> requests.Session:
+        """=== Internal utility method =================================================================================
+        Creates a keep-alive session, its adapter sized to <pool_size>.
+        :return: requests.Session
+        ========================================================================================== by Sziller ==="""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _acquire_session(self) -> requests.Session:
+        """=== Internal utility method =================================================================================
+        Returns the shared session - opening a new one if there is none, or if the old one idled for too long.
+        Every call must be paired with a call of <_release_session()>.
+        :return: requests.Session
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            now = time.monotonic()
+            if (self._session is not None
+                    and self._in_flight == 0
+                    and self.idle_timeout is not None
+                    and now - self._last_used > self.idle_timeout):
+                lg.debug("evicting  : RPC connection pool idle for {:.1f} sec".format(now - self._last_used))
+                self._session.close()
+                self._session = None
+            if self._session is None:
+                self._session = self._new_session()
+            self._in_flight += 1
+            self._last_used = now
+            return self._session
+
+    def _release_session(self):
+        """=== Internal utility method =================================================================================
+        Marks the end of a request started after <_acquire_session()>.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._in_flight -= 1
+            self._last_used = time.monotonic()
 
     def call(self, rpc_method, *params, timeout: (int, None) = None):
         """=== Instance method =========================================================================================
@@ -42,15 +119,43 @@ class RPCHost(object):
         :return: dict - The result of the RPC call as a JSON object.
         :raises: Exception - If the RPC connection fails or returns an error response.
         ========================================================================================== by Sziller ==="""
-        payload = json.dumps({"method": rpc_method, "params": list(params), "jsonrpc": "2.0"})
+        payload = json.dumps(self.build_payload(rpc_method, params))
+        response_json = self._post(payload=payload, timeout=timeout)
+        return self.unwrap(response_json)
+
+    def call_batch(self, calls: list, timeout: (int, None) = None, raise_on_error: bool = True) -> list:
+        """=== Instance method =========================================================================================
+        Sends several RPC calls in ONE http request, as a JSON-RPC 2.0 batch (natively handled by Bitcoin Core).
+        Answers are mapped back to the calls by their <id>, so the order of the returned list matches <calls>.
+        :param calls: list - of (rpc_method, params) tuples, params being a list or tuple.
+        :param timeout: Optional[int] - The timeout for the call (uses the default timeout if not provided).
+        :param raise_on_error: bool -   True:   the first failed call raises an Exception
+                                        False:  failed calls are returned as Exception instances in the result list
+        :return: list - results of the calls in the order of <calls>
+        :raises: Exception - If the RPC connection fails, or (with <raise_on_error>) if any call returned an error.
+        ========================================================================================== by Sziller ==="""
+        if not calls:
+            return []
+        payload = json.dumps([self.build_payload(method, params, idx) for idx, (method, params) in enumerate(calls)])
+        response_json = self._post(payload=payload, timeout=timeout)
+        return self.map_batch_results(calls=calls, response_json=response_json, raise_on_error=raise_on_error)
+
+    def _post(self, payload: str, timeout: (int, None) = None):
+        """=== Internal utility method =================================================================================
+        Posts a serialized payload to the node - retrying on connection failures - and returns the decoded answer.
+        :param payload: str - JSON serialized single or batch request
+        :param timeout: Optional[int] - The timeout for the call (uses the default timeout if not provided).
+        :return: dict or list - decoded JSON answer of the node
+        ========================================================================================== by Sziller ==="""
         hadconnectionfailures = False
         timeout = timeout or self.timeout
         nr_retry = self.retries
         slp = self.sleep_time
         while True:
+            session = self._acquire_session()
             try:
-                response = self._session.post(self._url, headers=self._headers, data=payload, timeout=timeout)
-            except (ConnectionError, Timeout) as e:
+                response = session.post(self._url, headers=self._headers, data=payload, timeout=timeout)
+            except (ReqConnectionError, Timeout) as e:
                 nr_retry -= 1
                 hadconnectionfailures = True
                 if nr_retry == 0:
@@ -70,18 +175,174 @@ class RPCHost(object):
                     lg.warning(msg_tmp)
                     hadconnectionfailures = False
                 break
-        if response.status_code not in (200, 500):
-            msg_tmp = 'RPC connection failure: ' + str(response.status_code) + ' ' + response.reason
-            lg.critical(msg_tmp)
-            raise Exception(msg_tmp)
+            finally:
+                self._release_session()
+        self.check_status(status_code=response.status_code, reason=response.reason)
         try:
-            response_json = response.json()
+            return response.json()
         except json.JSONDecodeError as e:
             msg_final = 'Failed to decode JSON response: ' + str(e)
             lg.critical(msg_final, exc_info=True)
             raise Exception(msg_final)
+
+    @staticmethod
+    def build_payload(rpc_method: str, params, idx: (int, None) = None) -> dict:
+        """=== Static method ===========================================================================================
+        Returns the JSON-RPC 2.0 request object of one call. Shared with the asyncio client.
+        :param rpc_method: str - The name of the RPC method to be invoked.
+        :param params: list or tuple - parameters of the call
+        :param idx: int or None - id of the call inside a batch
+        :return: dict - request object, ready to be serialized
+        ========================================================================================== by Sziller ==="""
+        payload = {"method": rpc_method, "params": list(params), "jsonrpc": "2.0"}
+        if idx is not None:
+            payload["id"] = idx
+        return payload
+
+    @staticmethod
+    def check_status(status_code: int, reason: str):
+        """=== Static method ===========================================================================================
+        Raises if the http status of the answer means the RPC call never reached bitcoind's dispatcher.
+        (500 is let through: Bitcoin Core reports RPC errors with it, the error itself being in the JSON body.)
+        :param status_code: int - http status code
+        :param reason: str - http reason phrase
+        ========================================================================================== by Sziller ==="""
+        if status_code not in (200, 500):
+            msg_tmp = 'RPC connection failure: ' + str(status_code) + ' ' + str(reason)
+            lg.critical(msg_tmp)
+            raise Exception(msg_tmp)
+
+    @staticmethod
+    def map_batch_results(calls: list, response_json, raise_on_error: bool = True) -> list:
+        """=== Static method ===========================================================================================
+        Maps the decoded answer of a batch back onto the calls by their <id>. Shared with the asyncio client.
+        :param calls: list - of (rpc_method, params) tuples, as sent
+        :param response_json: list - decoded answer of the node
+        :param raise_on_error: bool - False: failed calls are returned as Exception instances instead of raising
+        :return: list - results in the order of <calls>
+        ========================================================================================== by Sziller ==="""
+        if not isinstance(response_json, list):  # the node refused the batch as a whole
+            RPCHost.unwrap(response_json)
+            msg_final = 'Unexpected answer to RPC batch call: {}'.format(response_json)
+            lg.critical(msg_final)
+            raise Exception(msg_final)
+        results: list = [None] * len(calls)
+        answered = set()
+        for item in response_json:
+            idx = item.get('id')
+            if not isinstance(idx, int) or not 0 <= idx < len(calls):
+                lg.warning("skipping  : RPC batch answer with unknown id: {}".format(idx))
+                continue
+            answered.add(idx)
+            try:
+                results[idx] = RPCHost.unwrap(item)
+            except Exception as e:
+                if raise_on_error:
+                    raise
+                results[idx] = e
+        for idx in set(range(len(calls))) - answered:
+            msg_tmp = 'No answer in RPC batch for call: {}'.format(calls[idx][0])
+            lg.error(msg_tmp)
+            if raise_on_error:
+                raise Exception(msg_tmp)
+            results[idx] = Exception(msg_tmp)
+        return results
+
+    @staticmethod
+    def unwrap(response_json: dict):
+        """=== Static method ===========================================================================================
+        Returns the <result> of a single JSON-RPC answer, raising if the node reported an error.
+        :param response_json: dict - one decoded JSON-RPC answer
+        :return: the result of the call
+        ========================================================================================== by Sziller ==="""
         if 'error' in response_json and response_json['error'] is not None:
             msg_tmp = 'Error in RPC call:\n' + str(response_json['error'])
             lg.critical(msg_tmp)
             raise Exception(msg_tmp)
         return response_json['result']
+
+
+class RPCCoalescer(object):
+    """=== Class name: RPCCoalescer ====================================================================================
+    Opt-in wrapper around an RPCHost: single calls issued concurrently (from different threads) within <window>
+    seconds are collected and sent to the node as one JSON-RPC batch. Every caller still blocks until - and only
+    until - its own answer arrives.
+    :param host: RPCHost - transport the batches are sent over
+    :param window: float - seconds the first call of a batch waits for company (default is 0.005)
+    :param max_batch: int - a batch is sent immediately once it holds this many calls (default is 100)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, host: RPCHost, window: float = 0.005, max_batch: int = 100):
+        self.host: RPCHost                  = host
+        self.window: float                  = window
+        self.max_batch: int                 = max_batch
+        self._pending: list                 = []
+        self._timer: (threading.Timer, None) = None
+        self._lock: threading.Lock          = threading.Lock()
+
+    def call(self, rpc_method, *params):
+        """=== Instance method =========================================================================================
+        Queues the call for the next batch and waits for its result.
+        :param rpc_method: str - The name of the RPC method to be invoked.
+        :param params: tuple - Additional parameters to be passed to the RPC method.
+        :return: the result of the RPC call
+        :raises: Exception - If the RPC connection fails or the node returns an error for this call.
+        ========================================================================================== by Sziller ==="""
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((rpc_method, params, future))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._send(batch)
+        return future.result()
+
+    def close(self):
+        """=== Instance method =========================================================================================
+        Sends whatever is still queued and stops the pending timer.
+        ========================================================================================== by Sziller ==="""
+        self._flush()
+
+    def _take_pending(self) -> list:
+        """=== Internal utility method =================================================================================
+        Empties the queue. Caller must hold the lock.
+        :return: list - of (rpc_method, params, future) tuples
+        ========================================================================================== by Sziller ==="""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _flush(self):
+        """=== Internal utility method =================================================================================
+        Timer callback: sends the calls collected so far.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: list):
+        """=== Internal utility method =================================================================================
+        Sends one batch and hands every result (or error) over to the future of its caller.
+        :param batch: list - of (rpc_method, params, future) tuples
+        ========================================================================================== by Sziller ==="""
+        lg.debug("coalesced : {:>4} RPC calls into one batch - says {}".format(len(batch), self.ccn))
+        try:
+            results = self.host.call_batch([(method, params) for method, params, _ in batch], raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
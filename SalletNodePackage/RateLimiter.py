@@ -0,0 +1,210 @@
+"""
+Rate limiting of requests sent to external API nodes.
+Public services (e.g. blockchain.info) throttle - or ban - clients exceeding their rate limit. Every host gets one
+token bucket, shared by all Nodes (and threads) talking to it; answers of 429 / 503 pause the whole bucket, for as long
+as the server asks (Retry-After), or for a jittered, exponentially growing time.
+Calls in flight towards one node are capped by the <CallSlots> of the Node instance.
+by Sziller
+"""
+
+import time
+import random
+import inspect
+import logging
+import threading
+from typing import Optional
+from email.utils import parsedate_to_datetime
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('RateLimiter.py'))
+
+
+class TokenBucket(object):
+    """=== Class name: TokenBucket =====================================================================================
+    Thread safe token bucket: on average <rate> requests per second, at most <burst> at once.
+    Callers block in <acquire()> until a token is available; <queue_depth> tells how many of them are waiting.
+    :param rate: float - tokens added per second
+    :param burst: int - capacity of the bucket
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, rate: float = 2.0, burst: int = 5):
+        self.rate: float                    = rate
+        self.burst: int                     = burst
+        self.queue_depth: int               = 0     # callers waiting for a token
+        self.paused_until: float            = 0.0   # no tokens handed out before this time (Retry-After)
+        self._tokens: float                 = float(burst)
+        self._stamp: float                  = time.monotonic()
+        self._cond: threading.Condition     = threading.Condition()
+
+    def __repr__(self):
+        return "{}({}/sec - burst: {} - waiting: {})".format(self.ccn, self.rate, self.burst, self.queue_depth)
+
+    def configure(self, rate: float, burst: int):
+        """=== Instance method =========================================================================================
+        Changes the limits - without losing track of tokens already used.
+        ========================================================================================== by Sziller ==="""
+        with self._cond:
+            self._refill()
+            self.rate, self.burst = rate, burst
+            self._tokens = min(self._tokens, float(burst))
+            self._cond.notify_all()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """=== Instance method =========================================================================================
+        Takes one token, waiting for it if necessary.
+        :param timeout: float or None - seconds to wait at most, None: as long as it takes
+        :return: bool - True if a token was taken, False on timeout
+        ========================================================================================== by Sziller ==="""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self.queue_depth += 1
+            try:
+                while True:
+                    self._refill()
+                    now = time.monotonic()
+                    if now >= self.paused_until and self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return True
+                    wait = max(self.paused_until - now, (1.0 - self._tokens) / self.rate, 0.001)
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self.queue_depth -= 1
+
+    def pause(self, seconds: float):
+        """=== Instance method =========================================================================================
+        Stops handing out tokens for <seconds> - the server asked us to slow down. The bucket is emptied, so
+        requests resume at <rate>, not in a burst.
+        ========================================================================================== by Sziller ==="""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def _refill(self):
+        """=== Internal utility method =================================================================================
+        Caller must hold the lock. No tokens accumulate while paused.
+        ========================================================================================== by Sziller ==="""
+        now = time.monotonic()
+        elapsed = max(0.0, now - max(self._stamp, self.paused_until))
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._stamp = now
+
+
+class CallSlots(object):
+    """=== Class name: CallSlots =======================================================================================
+    Thread safe, resizable ceiling of calls in flight at once - a semaphore whose limit can be changed while in use.
+    Use it as a context manager: with slots: ... - one slot is held for the duration of the block.
+    :param limit: int - calls allowed in flight at once
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, limit: int = 8):
+        self.limit: int                     = max(1, int(limit))
+        self.in_flight: int                 = 0     # slots held
+        self.queue_depth: int               = 0     # callers waiting for a slot
+        self._cond: threading.Condition     = threading.Condition()
+
+    def __repr__(self):
+        return "{}({}/{} in flight - waiting: {})".format(self.ccn, self.in_flight, self.limit, self.queue_depth)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def resize(self, limit: int):
+        """=== Instance method =========================================================================================
+        Changes the ceiling. Calls in flight beyond a lowered one are not interrupted: no new one starts till they
+        are below it.
+        :param limit: int - calls allowed in flight at once
+        ========================================================================================== by Sziller ==="""
+        with self._cond:
+            self.limit = max(1, int(limit))
+            self._cond.notify_all()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """=== Instance method =========================================================================================
+        Takes a slot, waiting for one if necessary.
+        :param timeout: float or None - seconds to wait at most, None: as long as it takes
+        :return: bool - True if a slot was taken, False on timeout
+        ========================================================================================== by Sziller ==="""
+        with self._cond:
+            self.queue_depth += 1
+            try:
+                if not self._cond.wait_for(lambda: self.in_flight < self.limit, timeout=timeout):
+                    return False
+                self.in_flight += 1
+                return True
+            finally:
+                self.queue_depth -= 1
+
+    def release(self):
+        """=== Instance method =========================================================================================
+        Gives back a slot taken by <acquire()>.
+        ========================================================================================== by Sziller ==="""
+        with self._cond:
+            if self.in_flight <= 0:
+                msg = "{}: released more slots than taken".format(self.ccn)
+                lg.critical(msg)
+                raise Exception(msg)
+            self.in_flight -= 1
+            self._cond.notify()
+
+
+_buckets: dict = {}  # key: host, value: TokenBucket
+_buckets_lock: threading.Lock = threading.Lock()
+
+
+def bucket_for_host(host: str, rate: float, burst: int) -> TokenBucket:
+    """=== Function name: bucket_for_host ==============================================================================
+    Returns the token bucket of <host>, shared process wide - (re)configured to <rate> and <burst>.
+    :param host: str - network location, e.g. 'blockchain.info'
+    :param rate: float - requests per second allowed
+    :param burst: int - requests allowed at once
+    :return: TokenBucket
+    ============================================================================================== by Sziller ==="""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate=rate, burst=burst)
+            lg.debug("instant.ed: {} for host: {}".format(bucket, host))
+    if (bucket.rate, bucket.burst) != (rate, burst):
+        bucket.configure(rate=rate, burst=burst)
+    return bucket
+
+
+def retry_after_seconds(header_value: Optional[str]) -> Optional[float]:
+    """=== Function name: retry_after_seconds ==========================================================================
+    Reads the <Retry-After> http header: either seconds, or an http date.
+    :param header_value: str or None - value of the header
+    :return: float or None - seconds to wait, None if the header is missing or unreadable
+    ============================================================================================== by Sziller ==="""
+    if not header_value:
+        return None
+    try:
+        return max(0.0, float(header_value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(header_value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, base: float = 0.5, cap: float = 60.0) -> float:
+    """=== Function name: backoff_seconds ==============================================================================
+    Exponential backoff with full jitter: a random time below base * 2**attempt (capped) - so clients throttled at
+    the same moment do not all come back at the same moment.
+    :param attempt: int - number of the retry, starting at 0
+    :return: float - seconds to wait
+    ============================================================================================== by Sziller ==="""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
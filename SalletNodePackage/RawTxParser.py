@@ -0,0 +1,199 @@
+"""
+Streaming parser of raw (serialized) transactions and blocks.
+Reading an input's prevout or an output's value needs no full-blown transaction object: the raw bytes are walked
+once over a memoryview, and only txid, prevouts, output values and scriptPubKeys are picked out. Scripts are returned
+as memoryview slices of the raw data - no copies are made.
+Segwit (BIP 144) serialization is understood: witnesses are skipped, the txid is hashed over the legacy fields only.
+by Sziller
+"""
+
+import hashlib
+import inspect
+import logging
+import struct
+from typing import Iterator, Union
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('RawTxParser.py'))
+
+_NULL_TXID: bytes = bytes(32)
+_COINBASE_N: int = 0xffffffff
+_unpack_u32 = struct.Struct("<I").unpack_from
+_unpack_u64 = struct.Struct("<Q").unpack_from
+
+
+class ParsedTx(object):
+    """=== Class name: ParsedTx ========================================================================================
+    The parts of a transaction needed to follow sats through the chain.
+    :param txid_bytes: bytes - 32 bytes transaction ID, in the (reversed) order it is displayed in
+    :param prevouts: list - of (txid_bytes, n) tuples, one per input, prev. txid in displayed order
+    :param values: list - of output values in sats (int), in output order
+    :param scripts: list - of scriptPubKeys as memoryview slices of the raw data, in output order
+    :param size: int - serialized size of the transaction in bytes
+    Slices in <scripts> keep the whole raw buffer alive: copy them (bytes(...)) if only a few are kept for long.
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+    __slots__ = ("txid_bytes", "prevouts", "values", "scripts", "size")
+
+    def __init__(self, txid_bytes: bytes, prevouts: list, values: list, scripts: list, size: int):
+        self.txid_bytes: bytes              = txid_bytes
+        self.prevouts: list                 = prevouts
+        self.values: list                   = values
+        self.scripts: list                  = scripts
+        self.size: int                      = size
+
+    def __repr__(self):
+        return "{}({} - in: {} - out: {})".format(self.ccn, self.txid, len(self.prevouts), len(self.values))
+
+    @property
+    def txid(self) -> str:
+        """Transaction ID in hex - as displayed."""
+        return self.txid_bytes.hex()
+
+    @property
+    def is_coinbase(self) -> bool:
+        """True if the only input spends the null outpoint."""
+        return len(self.prevouts) == 1 and self.prevouts[0] == (_NULL_TXID, _COINBASE_N)
+
+    def prevout(self, i: int) -> tuple:
+        """=== Instance method =========================================================================================
+        :param i: int - index of the input
+        :return: tuple - (txid in hex, n) of the output spent by input <i>
+        ========================================================================================== by Sziller ==="""
+        txid_bytes, n = self.prevouts[i]
+        return txid_bytes.hex(), n
+
+    def total_out(self) -> int:
+        """=== Instance method =========================================================================================
+        :return: int - sum of the output values in sats
+        ========================================================================================== by Sziller ==="""
+        return sum(self.values)
+
+
+def _read_varint(mv: memoryview, pos: int) -> tuple:
+    """=== Function name: _read_varint =================================================================================
+    Reads a Bitcoin CompactSize integer.
+    :return: tuple - (value, position after it)
+    ============================================================================================== by Sziller ==="""
+    first = mv[pos]
+    if first < 0xfd:
+        return first, pos + 1
+    if first == 0xfd:
+        return mv[pos + 1] | mv[pos + 2] << 8, pos + 3
+    if first == 0xfe:
+        return _unpack_u32(mv, pos + 1)[0], pos + 5
+    return _unpack_u64(mv, pos + 1)[0], pos + 9
+
+
+def _as_memoryview(raw: Union[bytes, bytearray, memoryview, str]) -> memoryview:
+    """=== Function name: _as_memoryview ===============================================================================
+    :param raw: bytes-like, or hex str - as answered by the node
+    :return: memoryview - over the raw bytes
+    ============================================================================================== by Sziller ==="""
+    if isinstance(raw, str):
+        raw = bytes.fromhex(raw)
+    return raw if isinstance(raw, memoryview) else memoryview(raw)
+
+
+def parse_tx_at(mv: memoryview, pos: int = 0) -> tuple:
+    """=== Function name: parse_tx_at ==================================================================================
+    Parses the transaction starting at <pos> of <mv>.
+    :param mv: memoryview - raw data, e.g. an entire block
+    :param pos: int - offset of the transaction in <mv>
+    :return: tuple - (ParsedTx, offset of the byte following the transaction)
+    ============================================================================================== by Sziller ==="""
+    start = pos
+    pos += 4                                        # version
+    segwit = mv[pos] == 0 and mv[pos + 1] != 0      # marker 0x00, flag 0x01
+    legacy_from = pos + 2 if segwit else pos        # legacy serialization resumes after marker and flag
+    if segwit:
+        pos += 2
+    n_in, pos = _read_varint(mv, pos)
+    prevouts = []
+    for _ in range(n_in):
+        prevouts.append((mv[pos:pos + 32].tobytes()[::-1], _unpack_u32(mv, pos + 32)[0]))
+        script_len, pos = _read_varint(mv, pos + 36)
+        pos += script_len + 4                       # scriptSig, sequence
+    n_out, pos = _read_varint(mv, pos)
+    values, scripts = [], []
+    for _ in range(n_out):
+        values.append(_unpack_u64(mv, pos)[0])
+        script_len, pos = _read_varint(mv, pos + 8)
+        scripts.append(mv[pos:pos + script_len])
+        pos += script_len
+    legacy_to = pos
+    if segwit:
+        for _ in range(n_in):
+            n_items, pos = _read_varint(mv, pos)
+            for __ in range(n_items):
+                item_len, pos = _read_varint(mv, pos)
+                pos += item_len
+    pos += 4                                        # locktime
+
+    h = hashlib.sha256()
+    if segwit:
+        h.update(mv[start:start + 4])
+        h.update(mv[legacy_from:legacy_to])
+        h.update(mv[pos - 4:pos])
+    else:
+        h.update(mv[start:pos])
+    txid_bytes = hashlib.sha256(h.digest()).digest()[::-1]
+    return ParsedTx(txid_bytes=txid_bytes, prevouts=prevouts, values=values, scripts=scripts, size=pos - start), pos
+
+
+def parse_tx(raw: Union[bytes, bytearray, memoryview, str]) -> ParsedTx:
+    """=== Function name: parse_tx =====================================================================================
+    :param raw: bytes-like, or hex str - ONE serialized transaction (e.g. getrawtransaction <txid> false)
+    :return: ParsedTx
+    ============================================================================================== by Sziller ==="""
+    mv = _as_memoryview(raw)
+    parsed, end = parse_tx_at(mv, 0)
+    if end != len(mv):
+        raise ValueError("{} trailing bytes after transaction {}".format(len(mv) - end, parsed.txid))
+    return parsed
+
+
+def parse_block_header(raw: Union[bytes, bytearray, memoryview, str]) -> dict:
+    """=== Function name: parse_block_header ===========================================================================
+    :param raw: bytes-like, or hex str - a serialized block (or at least its first 80 bytes)
+    :return: dict - header fields, keys named as by BitcoinCore's <getblockheader> (no height: not serialized)
+    ============================================================================================== by Sziller ==="""
+    mv = _as_memoryview(raw)
+    header = mv[:80]
+    version, = struct.unpack_from("<i", header, 0)
+    timestamp, bits, nonce = struct.unpack_from("<III", header, 68)
+    return {"hash":                 hashlib.sha256(hashlib.sha256(header).digest()).digest()[::-1].hex(),
+            "version":              version,
+            "previousblockhash":    header[4:36].tobytes()[::-1].hex(),
+            "merkleroot":           header[36:68].tobytes()[::-1].hex(),
+            "time":                 timestamp,
+            "bits":                 "{:08x}".format(bits),
+            "nonce":                nonce,
+            "nTx":                  _read_varint(mv, 80)[0] if len(mv) > 80 else None}
+
+
+def iter_block_txs(raw: Union[bytes, bytearray, memoryview, str]) -> Iterator[ParsedTx]:
+    """=== Function name: iter_block_txs ===============================================================================
+    Streams the transactions of a serialized block (e.g. getblock <hash> 0), one at a time - coinbase first.
+    :param raw: bytes-like, or hex str - a serialized block
+    :return: iterator - of ParsedTx
+    ============================================================================================== by Sziller ==="""
+    mv = _as_memoryview(raw)
+    n_tx, pos = _read_varint(mv, 80)
+    for _ in range(n_tx):
+        parsed, pos = parse_tx_at(mv, pos)
+        yield parsed
+    if pos != len(mv):
+        raise ValueError("{} trailing bytes after {} transactions of block".format(len(mv) - pos, n_tx))
+
+
+def parse_block(raw: Union[bytes, bytearray, memoryview, str]) -> tuple:
+    """=== Function name: parse_block ==================================================================================
+    :param raw: bytes-like, or hex str - a serialized block
+    :return: tuple - (header dict, list of ParsedTx)
+    ============================================================================================== by Sziller ==="""
+    mv = _as_memoryview(raw)
+    return parse_block_header(mv), list(iter_block_txs(mv))
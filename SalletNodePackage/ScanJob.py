@@ -0,0 +1,236 @@
+"""
+Non-blocking UTXO set scans.
+BitcoinCore's <scantxoutset start> blocks for many minutes. A ScanJob runs it on a worker thread, while the caller -
+a script, or the GUI's event loop - reads progress and ETA (from <scantxoutset status>), may cancel it, or collects
+the result once it is done.
+Large scans are split into chunks by the ScanPlanner, run one after the other; their answers are merged.
+Results are cached against (tip hash, descriptor set): a repeated scan at the same tip costs nothing.
+by Sziller
+"""
+
+import time
+import inspect
+import logging
+import threading
+from typing import Optional
+from SalletNodePackage.ScanPlanner import ScanPlanner
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('ScanJob.py'))
+
+
+class ScanJob(object):
+    """=== Class name: ScanJob =========================================================================================
+    One planned UTXO set scan - one <scantxoutset start> per chunk -, executed on a worker thread.
+    Instances are created by ScanJobManager, not directly.
+    States: 'pending' -> 'running' -> 'done' | 'cancelled' | 'failed'
+    :param manager: ScanJobManager - the manager the job reports to
+    :param chunks: list - of lists of scan objects understood by <scantxoutset>
+    :param key: tuple - (tip hash, frozenset of scan objects) the job was started at
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, manager, chunks: list, key: tuple):
+        self.manager                        = manager
+        self.chunks: list                   = chunks
+        self.key: tuple                     = key
+        self.state: str                     = "pending"
+        self.progress: float                = 0.0  # in percent, of all chunks
+        self.chunks_done: int               = 0
+        self.started_at: Optional[float]    = None
+        self.finished_at: Optional[float]   = None
+        self.error: Optional[Exception]     = None
+        self._result: Optional[dict]        = None
+        self._done: threading.Event         = threading.Event()
+        self._cancel: threading.Event       = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def __repr__(self):
+        return "{}({} scan objects in {} chunks - {} - {:.1f}%)".format(
+            self.ccn, len(self.key[1]), len(self.chunks), self.state, self.progress)
+
+    @classmethod
+    def finished(cls, manager, chunks: list, key: tuple, result: dict):
+        """=== Classmethod: finished ===================================================================================
+        Creates a job already done - used when the result is served from the cache.
+        ========================================================================================== by Sziller ==="""
+        job = cls(manager=manager, chunks=chunks, key=key)
+        job.state, job.progress, job._result = "done", 100.0, result
+        job.started_at = job.finished_at = time.time()
+        job._done.set()
+        return job
+
+    # --- state queries ----------------------------------------------------------------------------------------------
+
+    def is_finished(self) -> bool:
+        return self._done.is_set()
+
+    def elapsed(self) -> float:
+        """=== Instance method =========================================================================================
+        :return: float - seconds the scan has been running for (or ran for, if finished)
+        ========================================================================================== by Sziller ==="""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def eta(self) -> Optional[float]:
+        """=== Instance method =========================================================================================
+        Estimates the remaining time of the scan, extrapolating the speed measured so far.
+        :return: float or None - seconds left, None if there is no progress to extrapolate from yet
+        ========================================================================================== by Sziller ==="""
+        if self.is_finished():
+            return 0.0
+        if self.progress <= 0.0:
+            return None
+        return self.elapsed() * (100.0 - self.progress) / self.progress
+
+    def poll(self) -> float:
+        """=== Instance method =========================================================================================
+        Asks the node for the progress of the running scan. Cheap: meant to be called from a timer.
+        :return: float - progress in percent, of all chunks
+        ========================================================================================== by Sziller ==="""
+        if self.state == "running":
+            try:
+                status = self.manager.node._make_rpc_call("scantxoutset", "status")
+                if status:
+                    chunk_progress = float(status.get("progress", 0.0))
+                    self.progress = (self.chunks_done * 100.0 + chunk_progress) / len(self.chunks)
+            except Exception as e:
+                lg.warning("poll      : scan status unavailable - {}".format(e))
+        return self.progress
+
+    # --- control ----------------------------------------------------------------------------------------------------
+
+    def start(self):
+        """=== Instance method =========================================================================================
+        Starts the scan on a daemon worker thread and returns at once.
+        ========================================================================================== by Sziller ==="""
+        self._worker = threading.Thread(target=self._run, name="scantxoutset", daemon=True)
+        self._worker.start()
+        return self
+
+    def cancel(self):
+        """=== Instance method =========================================================================================
+        Aborts the scan. The worker thread finishes with state 'cancelled'.
+        ========================================================================================== by Sziller ==="""
+        if self.is_finished():
+            return
+        self._cancel.set()
+        if self.state == "running":
+            try:
+                self.manager.node._make_rpc_call("scantxoutset", "abort")
+            except Exception as e:
+                lg.warning("cancel    : scan abort failed - {}".format(e))
+        lg.info("cancelled : {}".format(self))
+
+    def result(self, timeout: Optional[float] = None) -> dict:
+        """=== Instance method =========================================================================================
+        Waits for the scan to finish.
+        :param timeout: float or None - seconds to wait, None: wait as long as it takes
+        :return: dict - the answer of <scantxoutset start>
+        ========================================================================================== by Sziller ==="""
+        if not self._done.wait(timeout):
+            raise TimeoutError("UTXO set scan still running after {} seconds: {}".format(timeout, self))
+        if self.state == "cancelled":
+            raise RuntimeError("UTXO set scan was cancelled: {}".format(self))
+        if self.state == "failed":
+            raise Exception("Failed to complete UTXO scan: {}".format(self.error))
+        return self._result
+
+    # --- worker -----------------------------------------------------------------------------------------------------
+
+    def _run(self):
+        """=== Internal utility method =================================================================================
+        Body of the worker thread.
+        ========================================================================================== by Sziller ==="""
+        node = self.manager.node
+        self.started_at = time.time()
+        try:
+            node._retry_abort_scan("scantxoutset")  # the node runs one scan at a time
+            if self._cancel.is_set():
+                self.state = "cancelled"
+                return
+            self.state = "running"
+            lg.warning("Running: UTXO set scan might take several minutes... - {}".format(self))
+            results = []
+            for chunk in self.chunks:
+                resp = node._make_rpc_call("scantxoutset", "start", chunk, timeout=self.manager.scan_timeout)
+                if self._cancel.is_set() or (isinstance(resp, dict) and resp.get("success") is False):
+                    self.state = "cancelled"
+                    return
+                results.append(resp)
+                self.chunks_done += 1
+                self.progress = self.chunks_done * 100.0 / len(self.chunks)
+                lg.info("scanned   : chunk {}/{} - {}".format(self.chunks_done, len(self.chunks), self))
+            self._result = results[0] if len(results) == 1 else ScanPlanner.merge(results)
+            self.progress = 100.0
+            self.state = "done"
+            self.manager._store(job=self)
+            lg.info("returned  : UtxoSet scan result - {} in {:.1f} sec".format(self, self.elapsed()))
+        except Exception as e:
+            self.error = e
+            self.state = "cancelled" if self._cancel.is_set() else "failed"
+            if self.state == "failed":
+                lg.error("Failed to scan UTXO set: {}".format(e))
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+
+class ScanJobManager(object):
+    """=== Class name: ScanJobManager ==================================================================================
+    Plans and starts ScanJobs of a Node and keeps their results.
+    The node runs one scan at a time: starting a job for a different descriptor set cancels the running one.
+    :param node: Node - an RPC Node
+    :param planner: ScanPlanner or None - splits scans into chunks, None: one with default limits
+    :param scan_timeout: int - seconds a single <scantxoutset start> call may take (default is 3600)
+    :param max_cached: int - number of results kept (default is 16)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, node, planner: Optional[ScanPlanner] = None, scan_timeout: int = 3600, max_cached: int = 16):
+        self.node                           = node
+        self.planner: ScanPlanner           = planner if planner is not None else ScanPlanner()
+        self.scan_timeout: int              = scan_timeout
+        self.max_cached: int                = max_cached
+        self.active_job: Optional[ScanJob]  = None
+        self._results: dict                 = {}  # key: (tip hash, frozenset of scan objects), value: dict
+        self._lock: threading.Lock          = threading.Lock()
+
+    def start(self, items) -> ScanJob:
+        """=== Instance method =========================================================================================
+        Returns a ScanJob for <items>:
+        - already done, if the result at the current tip is cached,
+        - the running one, if it scans the very same scan objects,
+        - a freshly started one otherwise.
+        :param items: iterable - of addresses, descriptors and ranged descriptors (see ScanPlanner)
+        :return: ScanJob
+        ========================================================================================== by Sziller ==="""
+        chunks = self.planner.plan(items)
+        tip = self.node._make_rpc_call("getbestblockhash")
+        key = (tip, frozenset().union(*(ScanPlanner.chunk_key(_) for _ in chunks)))
+        with self._lock:
+            if key in self._results:
+                lg.info("cached    : UtxoSet scan result at tip {}".format(tip))
+                return ScanJob.finished(manager=self, chunks=chunks, key=key, result=self._results[key])
+            active = self.active_job
+            if active is not None and not active.is_finished():
+                if active.key[1] == key[1]:
+                    return active
+                active.cancel()
+            self.active_job = ScanJob(manager=self, chunks=chunks, key=key)
+            return self.active_job.start()
+
+    def _store(self, job: ScanJob):
+        """=== Internal utility method =================================================================================
+        Caches the result of a finished job - under the tip the node reported to have scanned at.
+        ========================================================================================== by Sziller ==="""
+        result = job._result
+        tip = result.get("bestblock", job.key[0]) if isinstance(result, dict) else job.key[0]
+        with self._lock:
+            self._results[(tip, job.key[1])] = result
+            while len(self._results) > self.max_cached:
+                self._results.pop(next(iter(self._results)))
@@ -0,0 +1,132 @@
+"""
+Planning of UTXO set scans.
+A wallet may hand in thousands of addresses - or a single ranged xpub descriptor replacing them. The planner turns any
+mix of addresses, descriptors and ranged descriptors into deduplicated chunks of scan objects, each within the limits
+of one <scantxoutset start> call, and merges the partial answers of the chunks into one.
+by Sziller
+"""
+
+import json
+import inspect
+import logging
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('ScanPlanner.py'))
+
+
+class ScanPlanner(object):
+    """=== Class name: ScanPlanner =====================================================================================
+    Accepted scan items:
+    - address:              'bc1q...'                                   -> 'addr(bc1q...)'
+    - descriptor:           'wpkh(02...)', 'addr(...)', 'raw(...)' (checksum optional)
+    - ranged descriptor:    'wpkh(xpub.../0/*)' - scanned over <default_range>, or
+                            {"desc": 'wpkh(xpub.../0/*)', "range": 5000 | [start, end]}
+    The weight of a chunk is the number of scripts the node derives for it: 1 per plain descriptor, the size of the
+    range per ranged one. Ranges larger than a chunk are split.
+    Every chunk is a full pass over the UTXO set, so chunks are made as big as the limits allow.
+    :param max_scripts: int - max. number of scripts derived per chunk (default is 100_000)
+    :param max_objects: int - max. number of scan objects sent per chunk - bounds request size (default is 5_000)
+    :param default_range: int - range of ranged descriptors given without one, as BitcoinCore does (default is 1000)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, max_scripts: int = 100_000, max_objects: int = 5_000, default_range: int = 1000):
+        self.max_scripts: int               = max_scripts
+        self.max_objects: int               = max_objects
+        self.default_range: int             = default_range
+
+    def plan(self, items) -> list:
+        """=== Instance method =========================================================================================
+        :param items: iterable - of addresses, descriptors and ranged descriptors (see class docstring)
+        :return: list - of chunks, each a list of scan objects understood by <scantxoutset start>
+        ========================================================================================== by Sziller ==="""
+        plain, ranged = self._normalize(items)
+        chunks, chunk, weight = [], [], 0
+        scan_objects = [(_, 1) for _ in plain]
+        for desc, ranges in ranged.items():
+            for start, end in ranges:
+                for sub_start in range(start, end + 1, self.max_scripts):
+                    sub_end = min(end, sub_start + self.max_scripts - 1)
+                    scan_objects.append(({"desc": desc, "range": [sub_start, sub_end]}, sub_end - sub_start + 1))
+        for scan_object, size in scan_objects:
+            if chunk and (weight + size > self.max_scripts or len(chunk) >= self.max_objects):
+                chunks.append(chunk)
+                chunk, weight = [], 0
+            chunk.append(scan_object)
+            weight += size
+        if chunk:
+            chunks.append(chunk)
+        lg.info("planned   : {} scan objects in {} chunks - says {}".format(len(scan_objects), len(chunks), self.ccn))
+        return chunks
+
+    @staticmethod
+    def merge(results: list) -> dict:
+        """=== Static method ===========================================================================================
+        Merges the answers of the chunks of a plan into the form of a single <scantxoutset start> answer.
+        Unspents found by more than one chunk are listed once. Height and best block are those of the last chunk.
+        :param results: list - of <scantxoutset start> answers
+        :return: dict - merged answer
+        ========================================================================================== by Sziller ==="""
+        merged = {"success": True, "txouts": 0, "height": None, "bestblock": None, "unspents": [], "total_amount": 0.0}
+        seen, total_sat = set(), 0
+        for result in results:
+            merged["success"] = merged["success"] and result.get("success", True)
+            merged["txouts"] = max(merged["txouts"], result.get("txouts", 0))
+            merged["height"] = result.get("height", merged["height"])
+            merged["bestblock"] = result.get("bestblock", merged["bestblock"])
+            for unspent in result.get("unspents", []):
+                outpoint = (unspent["txid"], unspent["vout"])
+                if outpoint in seen:
+                    continue
+                seen.add(outpoint)
+                merged["unspents"].append(unspent)
+                total_sat += int(round(unspent.get("amount", 0) * 10 ** 8))
+        merged["total_amount"] = total_sat / 10 ** 8
+        return merged
+
+    @staticmethod
+    def chunk_key(chunk: list) -> frozenset:
+        """=== Static method ===========================================================================================
+        :param chunk: list - of scan objects
+        :return: frozenset - hashable, order independent identity of the scan objects
+        ========================================================================================== by Sziller ==="""
+        return frozenset(json.dumps(_, sort_keys=True) if isinstance(_, dict) else _ for _ in chunk)
+
+    def _normalize(self, items) -> tuple:
+        """=== Internal utility method =================================================================================
+        Turns addresses into descriptors, drops duplicates, merges overlapping ranges of the same descriptor.
+        :return: tuple - (list of plain descriptors, dict of ranged descriptor: list of [start, end] ranges)
+        ========================================================================================== by Sziller ==="""
+        plain, ranged = {}, {}
+        for item in items:
+            if isinstance(item, dict):
+                desc, rng = item["desc"], item.get("range", self.default_range)
+            else:
+                item = item.strip()
+                desc = item if self._is_descriptor(item) else "addr({})".format(item)
+                rng = self.default_range
+            desc_id = desc.split("#")[0]  # same descriptor with or without checksum
+            if "*" not in desc_id:
+                plain.setdefault(desc_id, desc)
+                continue
+            start, end = (0, rng - 1) if isinstance(rng, int) else (int(rng[0]), int(rng[1]))
+            ranged.setdefault(desc_id, []).append((start, end))
+        for desc, ranges in ranged.items():
+            ranges.sort()
+            fused = [ranges[0]]
+            for start, end in ranges[1:]:
+                if start <= fused[-1][1] + 1:
+                    fused[-1] = (fused[-1][0], max(fused[-1][1], end))
+                else:
+                    fused.append((start, end))
+            ranged[desc] = fused
+        return list(plain.values()), ranged
+
+    @staticmethod
+    def _is_descriptor(item: str) -> bool:
+        """=== Internal utility method =================================================================================
+        ========================================================================================== by Sziller ==="""
+        return "(" in item and item.split("#")[0].endswith(")")
@@ -0,0 +1,202 @@
+"""
+Cache of confirmed Bitcoin transactions.
+A confirmed transaction never changes, so once a Node has fetched it, it never has to be fetched again:
+- 1st tier: in-memory LRU, bounded by a byte budget
+- 2nd tier: (optional) persistent SQLite store keyed by txid
+Raw hex and decoded (verbose) forms are stored separately. Decoded forms are also keyed by the <flavor> of the node
+that answered them, as a BitcoinCore RPC and an external API describe the same transaction differently.
+by Sziller
+"""
+
+import json
+import sqlite3
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('TxCache.py'))
+
+
+class TxCache(object):
+    """=== Class name: TxCache =========================================================================================
+    Two-tier cache of confirmed transactions. Thread safe.
+    What is confirmed "enough" is up to the user of the cache: it should only <put_*> transactions having at least
+    <min_confirmations> confirmations (Node does so).
+    Entries are stored serialized (hex string / JSON text), so callers can never alter cached data through the
+    objects they received.
+    :param db_path: str or None - path of the SQLite file of the persistent tier, None: memory tier only
+    :param max_bytes: int - byte budget of the in-memory tier (default is 64 MiB)
+    :param min_confirmations: int - transactions with fewer confirmations are not to be cached (default is 6)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024, min_confirmations: int = 6):
+        self.db_path: Optional[str]         = db_path
+        self.max_bytes: int                 = max_bytes
+        self.min_confirmations: int         = min_confirmations
+        # --- in-memory tier ---
+        self._lru: OrderedDict              = OrderedDict()  # key: tuple, value: str (hex or JSON text)
+        self._bytes: int                    = 0
+        self._txids: dict                   = {}  # key: txid, value: number of its forms in memory - evicted with them
+        self._lock: threading.RLock         = threading.RLock()
+        # --- counters ---
+        self.hits_memory: int               = 0
+        self.hits_disk: int                 = 0
+        self.misses: int                    = 0
+        # --- persistent tier ---
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS tx_hex (txid TEXT PRIMARY KEY, hex TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS tx_decoded (txid TEXT NOT NULL, flavor TEXT NOT NULL, "
+                             "data TEXT NOT NULL, PRIMARY KEY (txid, flavor))")
+            self._db.commit()
+        lg.debug("instant.ed: {} - db: {} - budget: {} bytes".format(self.ccn, db_path, max_bytes))
+
+    def __len__(self):
+        return len(self._lru)
+
+    def close(self):
+        """=== Instance method =========================================================================================
+        Closes the persistent tier. The in-memory tier stays usable.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        """=== Instance method =========================================================================================
+        Returns the counters of the cache.
+        :return: dict - hits per tier, misses, hit ratio, and usage of the in-memory tier
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            hits = self.hits_memory + self.hits_disk
+            lookups = hits + self.misses
+            return {"hits_memory": self.hits_memory,
+                    "hits_disk": self.hits_disk,
+                    "misses": self.misses,
+                    "hit_ratio": hits / lookups if lookups else 0.0,
+                    "entries": len(self._lru),
+                    "bytes": self._bytes}
+
+    # --- public access ----------------------------------------------------------------------------------------------
+
+    def get_hex(self, txid: str) -> Optional[str]:
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID
+        :return: str or None - raw hex of the transaction, None if not cached
+        ========================================================================================== by Sziller ==="""
+        return self._get(key=("hex", txid),
+                         query="SELECT hex FROM tx_hex WHERE txid = ?",
+                         params=(txid,))
+
+    def get_decoded(self, txid: str, flavor: str) -> Optional[dict]:
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID
+        :param flavor: str - kind of node the decoded form came from (e.g. 'rpc' or 'api')
+        :return: dict or None - a fresh copy of the decoded transaction, None if not cached
+        ========================================================================================== by Sziller ==="""
+        text = self._get(key=("decoded", flavor, txid),
+                         query="SELECT data FROM tx_decoded WHERE txid = ? AND flavor = ?",
+                         params=(txid, flavor))
+        return None if text is None else json.loads(text)
+
+    def put_hex(self, txid: str, hex_str: str):
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID
+        :param hex_str: str - raw hex of a confirmed transaction
+        ========================================================================================== by Sziller ==="""
+        self._put(key=("hex", txid),
+                  text=hex_str,
+                  query="INSERT OR REPLACE INTO tx_hex (txid, hex) VALUES (?, ?)",
+                  params=(txid, hex_str))
+
+    def put_decoded(self, txid: str, flavor: str, data: dict):
+        """=== Instance method =========================================================================================
+        :param txid: str - transaction ID
+        :param flavor: str - kind of node the decoded form came from (e.g. 'rpc' or 'api')
+        :param data: dict - decoded form of a confirmed transaction
+        ========================================================================================== by Sziller ==="""
+        text = json.dumps(data, separators=(",", ":"))
+        self._put(key=("decoded", flavor, txid),
+                  text=text,
+                  query="INSERT OR REPLACE INTO tx_decoded (txid, flavor, data) VALUES (?, ?, ?)",
+                  params=(txid, flavor, text))
+
+    def is_known_confirmed(self, txid: str) -> bool:
+        """=== Instance method =========================================================================================
+        As only confirmed transactions are stored, any cached form proves the transaction is confirmed.
+        Does not count as a lookup.
+        :param txid: str - transaction ID
+        :return: bool - True if any form of the transaction is cached
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            if txid in self._txids:
+                return True
+            if self._db is not None:
+                for query in ("SELECT 1 FROM tx_hex WHERE txid = ?", "SELECT 1 FROM tx_decoded WHERE txid = ?"):
+                    if self._db.execute(query, (txid,)).fetchone():
+                        return True
+        return False
+
+    # --- internals --------------------------------------------------------------------------------------------------
+
+    def _get(self, key: tuple, query: str, params: tuple) -> Optional[str]:
+        """=== Internal utility method =================================================================================
+        Looks up <key> in memory, then on disk - promoting disk hits into memory.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            text = self._lru.get(key)
+            if text is not None:
+                self._lru.move_to_end(key)
+                self.hits_memory += 1
+                return text
+            if self._db is not None:
+                row = self._db.execute(query, params).fetchone()
+                if row:
+                    self.hits_disk += 1
+                    self._remember(key, row[0])
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def _put(self, key: tuple, text: str, query: str, params: tuple):
+        """=== Internal utility method =================================================================================
+        Stores <text> in memory and - if configured - on disk.
+        ========================================================================================== by Sziller ==="""
+        with self._lock:
+            self._remember(key, text)
+            if self._db is not None:
+                self._db.execute(query, params)
+                self._db.commit()
+
+    def _remember(self, key: tuple, text: str):
+        """=== Internal utility method =================================================================================
+        Adds an entry to the in-memory tier, evicting the least recently used ones beyond the byte budget.
+        Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        old = self._lru.pop(key, None)
+        if old is None:
+            self._txids[key[-1]] = self._txids.get(key[-1], 0) + 1
+        else:
+            self._bytes -= len(old)
+        self._lru[key] = text
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            evicted_key, evicted = self._lru.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._txids[evicted_key[-1]] -= 1
+            if not self._txids[evicted_key[-1]]:
+                del self._txids[evicted_key[-1]]
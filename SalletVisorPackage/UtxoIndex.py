@@ -0,0 +1,150 @@
+"""
+Address-indexed container of the UTXO-s managed by UTXOManager.
+Behaves as the plain dict it replaces - utxo ID string -> models.Utxo - while keeping, on every insert and remove:
+- a secondary index: address -> utxo ID-s paying to it
+- running balances per address, in integer sats
+- the grand total, in integer sats
+so balance queries need no loop over the UTXO-s.
+by Sziller
+"""
+
+import inspect
+import logging
+from collections.abc import MutableMapping
+from typing import Iterator
+from SalletBasePackage import models
+from SalletBasePackage import units
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('UtxoIndex.py'))
+
+
+class UtxoIndex(MutableMapping):
+    """=== Class name: UtxoIndex =======================================================================================
+    Dict of utxo ID string -> models.Utxo, with an address index and running balances.
+    Balances are kept in integer sats, whatever unit the stored <Utxo.value>-s are in: no float rounding accumulates.
+    A UTXO paying to several addresses (bare multisig) is counted in the balance of each of them, but only once in the
+    grand total.
+    :param unit: str - unit of the stored <Utxo.value>-s (e.g. UTXOManager.unit_used)
+    :param utxos: dict - of utxo ID string -> models.Utxo to start with
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, unit: str = "sat", utxos: dict or None = None):
+        self.unit: str                      = unit
+        # -------------------------------------------------------------------
+        self._utxos: dict                   = {}    # utxo ID string -> models.Utxo
+        self._sats: dict                    = {}    # utxo ID string -> value in sats, as counted in the balances
+        self._by_address: dict              = {}    # address -> set of utxo ID strings
+        self._address_sat: dict             = {}    # address -> balance in sats
+        self._total_sat: int                = 0
+        if utxos:
+            self.update(utxos)
+
+    def __repr__(self):
+        return "{}({} UTXO-s - {} addresses - {} sats)".format(self.ccn, len(self), len(self._by_address),
+                                                               self._total_sat)
+
+    def __len__(self):
+        return len(self._utxos)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._utxos)
+
+    def __contains__(self, key):
+        return key in self._utxos
+
+    def __getitem__(self, key: str) -> models.Utxo:
+        return self._utxos[key]
+
+    def __setitem__(self, key: str, utxo: models.Utxo):
+        if key in self._utxos:
+            self._remove(key)
+        sats = units.bitcoin_unit_converter(value=utxo.value, unit_in=self.unit, unit_out="sat")
+        self._utxos[key] = utxo
+        self._sats[key] = sats
+        self._total_sat += sats
+        for address in self._addresses_of(utxo):
+            self._by_address.setdefault(address, set()).add(key)
+            self._address_sat[address] = self._address_sat.get(address, 0) + sats
+
+    def __delitem__(self, key: str):
+        if key not in self._utxos:
+            raise KeyError(key)
+        self._remove(key)
+
+    def clear(self):
+        """=== Instance method =========================================================================================
+        Empties the container - and its indexes - at once.
+        ========================================================================================== by Sziller ==="""
+        self._utxos.clear()
+        self._sats.clear()
+        self._by_address.clear()
+        self._address_sat.clear()
+        self._total_sat = 0
+
+    # --- queries ----------------------------------------------------------------------------------------------------
+
+    @property
+    def total_sat(self) -> int:
+        """Sum of all UTXO values in sats - cached."""
+        return self._total_sat
+
+    def addresses(self) -> set:
+        """=== Instance method =========================================================================================
+        :return: set - of addresses holding at least one UTXO
+        ========================================================================================== by Sziller ==="""
+        return set(self._by_address)
+
+    def outpoints_of(self, address: str) -> set:
+        """=== Instance method =========================================================================================
+        :param address: str - address in question
+        :return: set - of utxo ID strings paying to <address> (empty if none)
+        ========================================================================================== by Sziller ==="""
+        return set(self._by_address.get(address, ()))
+
+    def balance_sat(self, address: str) -> int:
+        """=== Instance method =========================================================================================
+        :param address: str - address in question
+        :return: int - balance of <address> in sats, O(1)
+        ========================================================================================== by Sziller ==="""
+        return self._address_sat.get(address, 0)
+
+    def balances_sat(self, addresses=None) -> dict:
+        """=== Instance method =========================================================================================
+        :param addresses: iterable - of addresses in question. If None, every address holding a UTXO
+        :return: dict - address -> balance in sats, O(number of addresses)
+        ========================================================================================== by Sziller ==="""
+        if addresses is None:
+            return dict(self._address_sat)
+        return {_: self._address_sat.get(_, 0) for _ in addresses}
+
+    # --- internals --------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _addresses_of(utxo: models.Utxo) -> set:
+        """=== Internal utility method =================================================================================
+        :return: set - of the addresses in the scriptPubKey of <utxo>, each once
+        ========================================================================================== by Sziller ==="""
+        if utxo.scriptPubKey is None or not utxo.scriptPubKey.addresses:
+            return set()
+        return set(utxo.scriptPubKey.addresses)
+
+    def _remove(self, key: str):
+        """=== Internal utility method =================================================================================
+        Takes the UTXO of <key> out of the container and the indexes. <key> must be present.
+        ========================================================================================== by Sziller ==="""
+        utxo = self._utxos.pop(key)
+        sats = self._sats.pop(key)
+        self._total_sat -= sats
+        for address in self._addresses_of(utxo):
+            keys = self._by_address[address]
+            keys.discard(key)
+            if keys:
+                self._address_sat[address] -= sats
+            else:
+                del self._by_address[address]
+                del self._address_sat[address]
@@ -16,6 +16,9 @@ from sql_access import sql_interface as sqla
 from sql_bases.sqlbase_utxo.sqlbase_utxo import Utxo as sqlUtxo
 from SalletBasePackage import units
 from SalletNodePackage import BitcoinNodeObject as BtcNode
+from SalletVisorPackage.UtxoIndex import UtxoIndex
+from SalletVisorPackage.UtxoSync import UtxoSync
+from SalletVisorPackage.UtxoSet import UtxoSet
 
 
 # Setting up logger                                         logger                      -   START   -
@@ -30,6 +33,8 @@ class UTXOManager:
     Object manages custom made wallet's utxo related tasks, processes.
     Possible usecases and data sources:
     - utxo_set.yaml - a human readable, manually filled in list of UTXO data
+    Every export stores - next to the data, in '<file>.tip.yaml' - the block the set is up to date with, every
+    import reads it back: an incremental sync (task_sync_int_utxo_set) resumes from there.
     ============================================================================================== by Sziller ==="""
     # Current Class Name
     ccn = inspect.currentframe().f_code.co_name  # current class name
@@ -54,7 +59,9 @@ class UTXOManager:
                                                                  tables=[self.utxo_Base_obj])
         else:
             self.session                    = session_in
-        self.utxo_obj_dict: dict            = {}  # dict of all utxo objects
+        self.utxo_obj_dict: UtxoIndex       = UtxoIndex(unit=self.unit_used)  # all utxo objects, by address too
+        self.utxo_sync: UtxoSync or None    = None  # incremental sync of utxo_obj_dict - see task_sync_int_utxo_set
+        self.synced_tip: dict or None       = None  # {"block_hash": str, "height": int} utxo_obj_dict is up to date with
         self.path_map: dict     = {"utxo_set": "UTXO_SET_YAML_PATH",
                                    "utxo_set_flat": "UTXO_SET_FLAT_YAML_PATH",
                                    "utxo_id_set": "UTXO_ID_SET_YAML_PATH"}
@@ -76,19 +83,44 @@ class UTXOManager:
     # - yaml file containing utxo ID's
     # - sqlite db containing fill UTXO data
     
+    def task_start_utxo_scan_by_addresslist(self, address_list: list, descriptors: list or None = None):
+        """=== Method name: task_start_utxo_scan_by_addresslist ========================================================
+        Starts the QUITE TIME consuming UTXO set scan of <address_list> on the Node - without waiting for it.
+        Poll the returned job (job.poll(), job.progress, job.eta()) from a timer, collect the UtxoId set by
+        utxo_id_set_from_scan(job.result()) once job.is_finished().
+        :param address_list: list - of addresses in string format, in Base58 representation
+        :param descriptors: list - of (ranged) descriptors - e.g. one xpub descriptor instead of thousands of addresses
+        :return: ScanJob - the running (or - if cached - already finished) scan
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        if not self.node:
+            msg = "not found : Node not defined! - says {}.{}".format(self.ccn, cmn)
+            lg.critical(msg)
+            raise Exception(msg)
+        return self.node.nodeop_start_utxo_scan(address_list=address_list, descriptors=descriptors)
+
     def task_return_utxo_set_by_addresslist(self, address_list: list, testdict: dict or None = None) -> set:
         """=== Method name: task_return_utxo_set_by_addresslist ========================================================
-        A ONE TIME and QUITE TIME consuming script:
+        A ONE TIME and QUITE TIME consuming script - blocks till the scan is done:
+        (use task_start_utxo_scan_by_addresslist() not to block)
         :param address_list: list - of addresses in string format, in Base58 representation
         :param testdict: dict
         ========================================================================================== by Sziller ==="""
         cmn = inspect.currentframe().f_code.co_name  # current method name
         if not testdict:
-            filtered_utxo_set_data: dict = self.node.nodeop_get_utxo_set_by_addresslist(address_list=address_list)
+            filtered_utxo_set_data: dict = self.task_start_utxo_scan_by_addresslist(address_list=address_list).result()
         else:
             filtered_utxo_set_data: dict = testdict
+        return self.utxo_id_set_from_scan(scan_result=filtered_utxo_set_data)
+
+    @staticmethod
+    def utxo_id_set_from_scan(scan_result: dict) -> set:
+        """=== Static method ===========================================================================================
+        :param scan_result: dict - answer of a UTXO set scan
+        :return: set - of UtxoId-s in string format
+        ========================================================================================== by Sziller ==="""
         utxo_id_list = ["{}{}{}".format(_['txid'], models.UtxoId.divider, _['vout'])
-                        for _ in filtered_utxo_set_data['unspents']]
+                        for _ in scan_result['unspents']]
         return set(utxo_id_list)
     
     def task_update_int_utxo_set_by_utxo_id_set_yaml(self, unit_src: str = "btc") -> dict:
@@ -97,11 +129,11 @@ class UTXOManager:
         Utxo-s by reading the NODE defined:
         Step 1. importing list of stings
         Step reseting self.utxo_obj_dict
-        Step 3. loop:
-                1. turning strings into UtxoId instances
-                2. searching Node for matching Utxo-s
-                3. isntantiating Utxo (using looked-up data)
-                4. adding to self.utxo_obj_dict
+        Step 3. turning strings into UtxoId instances
+        Step 4. searching Node for all parent TXs at once (batched / parallel - see Node.nodeop_getrawtransactions)
+        Step 5. loop:
+                1. isntantiating Utxo (using looked-up data)
+                2. adding to self.utxo_obj_dict
         (divider has to match with what is defined in the UtxoId class.)
         :param unit_src: str - name ot the unit used in the soure data
         ========================================================================================== by Sziller ==="""
@@ -111,12 +143,19 @@ class UTXOManager:
             lg.info("node      : {}".format(self.node))
             yaml_read_in_utxo_id_set = self.read_yaml(mode="utxo_id_set")
             lg.debug("read yaml : collected utxo ID set")
-            self.utxo_obj_dict: dict = {}
+            self.utxo_obj_dict = UtxoIndex(unit=self.unit_used)
+            self.synced_tip = self.read_tip(data_fullfilename=os.getenv(self.path_map["utxo_id_set"]))
             lg.debug("reset     : self.utxo_obj_dict")
-            for _ in yaml_read_in_utxo_id_set:
-                utxo_id_obj = models.UtxoId.construct_from_string(_)
-                tx = self.node.nodeop_getrawtransaction(tx_hash=utxo_id_obj.txid, verbose=True)
+            utxo_id_obj_list = [models.UtxoId.construct_from_string(_) for _ in yaml_read_in_utxo_id_set]
+            tx_stream = self.node.nodeop_getrawtransactions(tx_hashes=[_.txid for _ in utxo_id_obj_list],
+                                                            verbose=True,
+                                                            ordered=True)
+            for utxo_id_obj, (_, tx) in zip(utxo_id_obj_list, tx_stream):
                 lg.debug("read tx   : from node - {}".format(self.node))
+                if tx is None:
+                    msg = "not found : TX of {} on node {} - says {}.{}".format(utxo_id_obj, self.node, self.ccn, cmn)
+                    lg.critical(msg)
+                    raise Exception(msg)
                 # Mind if Node under your control answers different syntax dictionary
                 utxo_data = tx['vout'][utxo_id_obj.n]
                 utxo_data["value"] = int(units.bitcoin_unit_converter(
@@ -148,7 +187,8 @@ class UTXOManager:
         cmn = inspect.currentframe().f_code.co_name  # current method name
         lg.info("update    : self.utxo_obj_dict() from yaml by Utxo data: {}".format(cmn))
         yaml_read_in_utxo_set = self.read_yaml(mode="utxo_set")
-        self.utxo_obj_dict: dict = {}
+        self.utxo_obj_dict = UtxoIndex(unit=self.unit_used)
+        self.synced_tip = self.read_tip(data_fullfilename=os.getenv(self.path_map["utxo_set"]))
         lg.debug("reset     : self.utxo_obj_dict")
         for _ in yaml_read_in_utxo_set:
             _["value"] = units.bitcoin_unit_converter(value=_["value"], unit_in=unit_src, unit_out=self.unit_used)
@@ -173,7 +213,8 @@ class UTXOManager:
         cmn = inspect.currentframe().f_code.co_name  # current method name
         lg.info("update    : self.utxo_obj_dict() from yaml by Utxo data: {}".format(cmn))
         yaml_read_in_utxo_set = self.read_yaml(mode="utxo_set_flat")
-        self.utxo_obj_dict: dict = {}
+        self.utxo_obj_dict = UtxoIndex(unit=self.unit_used)
+        self.synced_tip = self.read_tip(data_fullfilename=os.getenv(self.path_map["utxo_set_flat"]))
         lg.debug("reset     : self.utxo_obj_dict")
         for _ in yaml_read_in_utxo_set:
             _["value"] = units.bitcoin_unit_converter(value=_["value"], unit_in=unit_src, unit_out=self.unit_used)
@@ -200,7 +241,8 @@ class UTXOManager:
         cmn = inspect.currentframe().f_code.co_name  # current method name
         lg.info("update    : self.utxo_obj_dict() from DB by Utxo data: {}".format(cmn))
         utxo_set_data = self.read_db()
-        self.utxo_obj_dict: dict = {}
+        self.utxo_obj_dict = UtxoIndex(unit=self.unit_used)
+        self.synced_tip = self.read_tip(data_fullfilename=os.getenv("DB_PATH_UTXO"))
         lg.debug("reset     : self.utxo_obj_dict")
         for _ in utxo_set_data:
             utxo_id_obj = models.UtxoId.construct_from_string(_['utxo_id'])
@@ -212,6 +254,42 @@ class UTXOManager:
         lg.debug("returning : self.utxo_obj_dict - {}".format(cmn))
         return self.utxo_obj_dict
 
+    def task_sync_int_utxo_set(self, since_block_hash: str or None = None) -> dict:
+        """=== Method name: task_sync_int_utxo_set =====================================================================
+        Method updates the set of Utxo-s incrementally - instead of rebuilding it - by the blocks mined since the last
+        sync (see UtxoSync): spent Utxo-s are removed, new outputs to the scripts already held are added, reorgs are
+        rolled back. A refresh after one new block reads only that block.
+        Step 1. on the first call - or after a rebuild / reload by a task_update_int_utxo_set_by_* method - the sync
+                is started at the block the set is up to date with: <since_block_hash> if given, the tip stored with
+                the set read in otherwise. If neither is known, it refuses to start: assuming the actual tip would
+                silently skip the blocks mined since the set was stored.
+        Step 2. blocks since the last one processed are applied, the new tip is kept in <synced_tip> - and stored by
+                the next export
+        :param since_block_hash: str - block the freshly built set is up to date with. If None, the stored tip
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        lg.info("update    : self.utxo_obj_dict() incrementally by blocks: {}".format(cmn))
+        if not self.node:
+            msg = "not found : Node not defined! - says {}.{}".format(self.ccn, cmn)
+            lg.critical(msg)
+            raise Exception(msg)
+        if self.utxo_sync is None or self.utxo_sync.utxos is not self.utxo_obj_dict:
+            if since_block_hash is not None:
+                start_hash, start_height = since_block_hash, None
+            elif self.synced_tip:
+                start_hash, start_height = self.synced_tip["block_hash"], self.synced_tip.get("height")
+            else:
+                msg = "not found : no block known the utxo set is up to date with - rebuild it and pass " \
+                      "<since_block_hash>! - says {}.{}".format(self.ccn, cmn)
+                lg.critical(msg)
+                raise Exception(msg)
+            self.utxo_sync = UtxoSync(node=self.node, utxos=self.utxo_obj_dict)
+            self.utxo_sync.start(block_hash=start_hash, height=start_height)
+        self.utxo_sync.sync()
+        self.synced_tip = {"block_hash": self.utxo_sync.tip_hash, "height": self.utxo_sync.tip_height}
+        lg.debug("returning : self.utxo_obj_dict - {}".format(cmn))
+        return self.utxo_obj_dict
+
     # UTXO reading methods                                                                          -   ENDED   -
 
     # UTXO writing methods                                                                          -   START   -
@@ -231,6 +309,8 @@ class UTXOManager:
                                data_list=dict_for_export,
                                db_table="utxoset",
                                session_in=export_session)
+        if export_session is None or export_session is self.session:  # the DB task_update_int_utxo_set_by_db reads
+            self.write_tip(data_fullfilename=os.getenv("DB_PATH_UTXO"))
     
     def task_export_int_utxo_to_yaml(self, fullfilename: str, unit_trg: str, mode: str = "utxo_set"):
         """=== Method name: write_yaml =================================================================================
@@ -263,6 +343,7 @@ class UTXOManager:
                                                               unit_out=unit_trg)
             lg.info("export to : {}".format(yaml_path))
             self.write_yaml(fullfilename=yaml_path, data=data_to_dump)
+            self.write_tip(data_fullfilename=yaml_path)
         else:
             msg = "<mode> = '{}' unrecognized! - says {}.{}".format(mode, self.ccn, cmn)
             lg.critical(msg)
@@ -325,6 +406,45 @@ class UTXOManager:
         return sqla.QUERY_entire_table(ordered_by="addresses",
                                        row_obj=self.utxo_Base_obj,
                                        session=self.session)
+
+    @staticmethod
+    def tip_fullfilename(data_fullfilename: str) -> str:
+        """=== Method name: tip_fullfilename ===========================================================================
+        :param data_fullfilename: str - fullpath + filename of an exported utxo set (yaml file or DB)
+        :return: str - fullpath + filename of the yaml file storing the block the exported set is up to date with
+        ========================================================================================== by Sziller ==="""
+        return "{}.tip.yaml".format(data_fullfilename)
+
+    def write_tip(self, data_fullfilename: str):
+        """=== Method name: write_tip ==================================================================================
+        Stores the block the stored utxo set is up to date with - next to the set exported to <data_fullfilename>.
+        If it is not known, a tip stored earlier is removed: resuming from it would apply blocks to the wrong set.
+        :param data_fullfilename: str - fullpath + filename of the exported utxo set (yaml file or DB)
+        ========================================================================================== by Sziller ==="""
+        tip_path = self.tip_fullfilename(data_fullfilename=data_fullfilename)
+        if self.utxo_sync is not None and self.utxo_sync.utxos is self.utxo_obj_dict \
+                and self.utxo_sync.tip_hash is not None:
+            self.synced_tip = {"block_hash": self.utxo_sync.tip_hash, "height": self.utxo_sync.tip_height}
+        if self.synced_tip:
+            lg.info("export to : {} - tip {}".format(tip_path, self.synced_tip))
+            self.write_yaml(fullfilename=tip_path, data=dict(self.synced_tip))
+        elif os.path.exists(tip_path):
+            lg.warning("removed   : {} - the exported set is up to date with an unknown block".format(tip_path))
+            os.remove(tip_path)
+
+    def read_tip(self, data_fullfilename: str) -> dict or None:
+        """=== Method name: read_tip ===================================================================================
+        :param data_fullfilename: str - fullpath + filename of an exported utxo set (yaml file or DB)
+        :return: dict or None - {"block_hash": str, "height": int} the set is up to date with, None if not stored
+        ========================================================================================== by Sziller ==="""
+        tip_path = self.tip_fullfilename(data_fullfilename=data_fullfilename)
+        if not os.path.exists(tip_path):
+            lg.warning("not found : {} - the set read in is up to date with an unknown block".format(tip_path))
+            return None
+        with open(tip_path, 'r') as stream:
+            tip = yaml.safe_load(stream)
+        lg.info("read in   : tip {} from {}".format(tip, tip_path))
+        return tip if isinstance(tip, dict) and tip.get("block_hash") else None
     
     # ---------------------------------------------------------------------------------------------------
     # - Collection of DATA handling scripts - simple methods                            -   ENDED       -
@@ -344,36 +464,37 @@ class UTXOManager:
         ========================================================================================== by Sziller ==="""
         return [k.utxo_id for k in self.utxo_obj_dict.values()]
         
+    def return_utxo_set(self, heights: dict or None = None) -> UtxoSet:
+        """=== Method name: return_utxo_set ============================================================================
+        Columnar copy of the stored utxo set - for bulk analytics and coin selection on large wallets (see UtxoSet)
+        :param heights: dict - outpoint key (txid_bytes, n) -> block height, for the UTXO-s whose height is known
+        :return: UtxoSet - of all UTXO-s in self.utxo_obj_dict
+        ========================================================================================== by Sziller ==="""
+        return UtxoSet.from_utxos(self.utxo_obj_dict.values(), unit=self.unit_used, heights=heights)
+
     def return_total_balance(self):
         """=== Method name: return_total_balance =======================================================================
-        Method calculates the balance of all UTXO-s in the stored utxo set
+        Method returns the balance of all UTXO-s in the stored utxo set - the total is kept up to date by UtxoIndex
         ========================================================================================== by Sziller ==="""
-        value_in_btc = sum([_.value for _ in self.utxo_obj_dict.values()])
-        return units.bitcoin_unit_converter(value=value_in_btc, unit_in="btc", unit_out=os.getenv("UNIT_BASE"))
+        return units.bitcoin_unit_converter(value=self.utxo_obj_dict.total_sat,
+                                            unit_in="sat",
+                                            unit_out=os.getenv("UNIT_BASE"))
  
     def return_address_set(self) -> set:
         """=== Method name: return_address_set =========================================================================
-        Method calculates the balance of all UTXO-s in the stored utxo set
+        Method returns the set of addresses holding at least one UTXO of the stored utxo set
         ========================================================================================== by Sziller ==="""
-        address_list = []
-        for obj in self.utxo_obj_dict.values():
-            address_list += obj.scriptPubKey.addresses
-        return set(address_list)
+        return self.utxo_obj_dict.addresses()
     
     def return_balance_by_addresslist(self, addresses: set or None = None) -> dict:
         """=== Method name: return_balance_by_address ==================================================================
-        ATTENTION, only working with single address UTXO's properly.
+        Balances are read from the running per-address totals of UtxoIndex: O(number of addresses).
+        A multi address UTXO is counted in the balance of each of its addresses.
         When used with addresses = None, the entire utxo set is considered
         ========================================================================================== by Sziller ==="""
-        if addresses is None:
-            addresses = self.return_address_set()
-        detailed_balance = {_: 0 for _ in addresses}
-        for address in addresses:
-            for utxo_obj in self.utxo_obj_dict.values():
-                if address in utxo_obj.scriptPubKey.addresses:
-                    detailed_balance[address] += utxo_obj.value
-        return {k: round(v, 8) for k, v in detailed_balance.items()}
-
+        detailed_balance = self.utxo_obj_dict.balances_sat(addresses=addresses)
+        return {k: round(units.bitcoin_unit_converter(value=v, unit_in="sat", unit_out=self.unit_used), 8)
+                for k, v in detailed_balance.items()}
 
 if __name__ == "__main__":
     # instead of locally testing behaviour manually, we use the mngr_* files for manual testing in order to keep
@@ -0,0 +1,354 @@
+"""
+Columnar UTXO set - for bulk analytics and coin selection on large wallets.
+Next to UTXOManager.utxo_obj_dict (one models.Utxo object per UTXO), the same UTXO-s are stored here as parallel NumPy
+arrays: one row per UTXO, one column per field. Addresses, scripts and script types are interned into string tables,
+rows only hold their ids. Totals, balances per address, filters by type or age, and orderings for coin selection run
+as vectorized operations over whole columns - no python loop over the UTXO-s.
+by Sziller
+"""
+
+import inspect
+import logging
+from typing import Iterable, Optional
+from SalletBasePackage import models
+from SalletBasePackage import units
+
+try:
+    import numpy as np  # optional: only needed by the columnar UTXO set
+except ImportError:
+    np = None
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('UtxoSet.py'))
+
+UNCONFIRMED: int = -1  # height of UTXO-s not mined yet - or of unknown height
+
+
+def _require_numpy():
+    """=== Function name: _require_numpy ===============================================================================
+    ============================================================================================== by Sziller ==="""
+    if np is None:
+        raise ImportError("numpy is needed for the columnar UtxoSet: pip install numpy")
+
+
+class StringTable(object):
+    """=== Class name: StringTable =====================================================================================
+    Interned strings: each distinct string is stored once, and referred to by its int id (order of first appearance).
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+    __slots__ = ("_ids", "_strings")
+
+    def __init__(self):
+        self._ids: dict                     = {}    # string -> id
+        self._strings: list                 = []    # id -> string
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+    def intern(self, string: str) -> int:
+        """=== Instance method =========================================================================================
+        :return: int - id of <string> - added to the table if new
+        ========================================================================================== by Sziller ==="""
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = self._ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+    def id_of(self, string: str) -> int:
+        """=== Instance method =========================================================================================
+        :return: int - id of <string>, -1 if not in the table
+        ========================================================================================== by Sziller ==="""
+        return self._ids.get(string, -1)
+
+
+class UtxoSet(object):
+    """=== Class name: UtxoSet =========================================================================================
+    UTXO-s as parallel NumPy arrays - one row per UTXO:
+    - txids:        (rows, 32) uint8 - transaction ID bytes, as displayed
+    - ns:           uint32 - output index
+    - values:       int64 - value in sats
+    - heights:      int32 - height of the block mining it, UNCONFIRMED (-1) if not mined / unknown
+    - script_ids:   int32 - scriptPubKey, id in <scripts> (hex)
+    - type_ids:     int32 - script type, id in <script_types>
+    - address_ids:  int32 - (first) address, id in <addresses> - -1 if the script has none
+    Rows are kept packed: a removed row is replaced by the last one. Row numbers are NOT stable over removals - use
+    outpoint keys: (txid_bytes, n), as models.UtxoId.key.
+    Converts both ways with models.Utxo: see <from_utxos()>, <add()>, <utxo()>, <to_utxo_dict()>.
+    :param capacity: int - rows allocated to start with (grows as needed)
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, capacity: int = 1024):
+        _require_numpy()
+        self.addresses: StringTable         = StringTable()
+        self.scripts: StringTable           = StringTable()
+        self.script_types: StringTable      = StringTable()
+        # -------------------------------------------------------------------
+        self._size: int                     = 0
+        self._rows: dict                    = {}    # outpoint key (txid_bytes, n) -> row
+        self._spks: list                    = []    # script id -> models.ScriptPubKey - rebuilding Utxo objects
+        self._txids: np.ndarray             = np.zeros((capacity, 32), dtype=np.uint8)
+        self._ns: np.ndarray                = np.zeros(capacity, dtype=np.uint32)
+        self._values: np.ndarray            = np.zeros(capacity, dtype=np.int64)
+        self._heights: np.ndarray           = np.zeros(capacity, dtype=np.int32)
+        self._script_ids: np.ndarray        = np.zeros(capacity, dtype=np.int32)
+        self._type_ids: np.ndarray          = np.zeros(capacity, dtype=np.int32)
+        self._address_ids: np.ndarray       = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key: tuple):
+        return key in self._rows
+
+    def __repr__(self):
+        return "{}({} UTXO-s - {} addresses - {} sats)".format(self.ccn, len(self), len(self.addresses),
+                                                               self.total_sat())
+
+    # --- columns: views of the live rows ----------------------------------------------------------------------------
+
+    @property
+    def txids(self) -> "np.ndarray":
+        return self._txids[:self._size]
+
+    @property
+    def ns(self) -> "np.ndarray":
+        return self._ns[:self._size]
+
+    @property
+    def values(self) -> "np.ndarray":
+        return self._values[:self._size]
+
+    @property
+    def heights(self) -> "np.ndarray":
+        return self._heights[:self._size]
+
+    @property
+    def script_ids(self) -> "np.ndarray":
+        return self._script_ids[:self._size]
+
+    @property
+    def type_ids(self) -> "np.ndarray":
+        return self._type_ids[:self._size]
+
+    @property
+    def address_ids(self) -> "np.ndarray":
+        return self._address_ids[:self._size]
+
+    # --- conversion with models.Utxo --------------------------------------------------------------------------------
+
+    @classmethod
+    def from_utxos(cls, utxos: Iterable[models.Utxo], unit: str = "sat", heights: Optional[dict] = None) -> "UtxoSet":
+        """=== Classmethod =============================================================================================
+        :param utxos: iterable - of models.Utxo, e.g. UTXOManager.utxo_obj_dict.values()
+        :param unit: str - unit of their <value>-s (e.g. UTXOManager.unit_used)
+        :param heights: dict - outpoint key (txid_bytes, n) -> block height, for the UTXO-s whose height is known
+        :return: UtxoSet - of the UTXO-s
+        ========================================================================================== by Sziller ==="""
+        utxos = list(utxos)
+        ans = cls(capacity=max(len(utxos), 1))
+        heights = heights or {}
+        for utxo in utxos:
+            ans.add(utxo=utxo, unit=unit, height=heights.get(utxo.key, UNCONFIRMED))
+        return ans
+
+    def add(self, utxo: models.Utxo, unit: str = "sat", height: int = UNCONFIRMED):
+        """=== Instance method =========================================================================================
+        Adds a UTXO - or overwrites the row of the same outpoint.
+        :param utxo: models.Utxo - the UTXO
+        :param unit: str - unit of its <value>
+        :param height: int - height of the block mining it, UNCONFIRMED if not mined / unknown
+        ========================================================================================== by Sziller ==="""
+        key = utxo.key
+        row = self._rows.get(key)
+        if row is None:
+            if self._size == len(self._values):
+                self._grow()
+            row = self._rows[key] = self._size
+            self._size += 1
+        spk = utxo.scriptPubKey
+        if spk is not None:
+            script_id = self.scripts.intern(spk.hex)
+            if script_id == len(self._spks):
+                self._spks.append(spk)
+            type_id = self.script_types.intern(spk.type)
+            address_id = self.addresses.intern(spk.addresses[0]) if spk.addresses else -1
+        else:
+            script_id, type_id, address_id = -1, -1, -1
+        self._txids[row] = np.frombuffer(utxo.utxo_id.txid_bytes, dtype=np.uint8)
+        self._ns[row] = utxo.n
+        self._values[row] = units.bitcoin_unit_converter(value=utxo.value, unit_in=unit, unit_out="sat")
+        self._heights[row] = height
+        self._script_ids[row] = script_id
+        self._type_ids[row] = type_id
+        self._address_ids[row] = address_id
+
+    def remove(self, key: tuple):
+        """=== Instance method =========================================================================================
+        Removes the row of an outpoint: the last row is moved into its place.
+        :param key: tuple - outpoint key (txid_bytes, n)
+        ========================================================================================== by Sziller ==="""
+        row = self._rows.pop(key)
+        last = self._size - 1
+        if row != last:
+            for column in (self._txids, self._ns, self._values, self._heights,
+                           self._script_ids, self._type_ids, self._address_ids):
+                column[row] = column[last]
+            self._rows[self.key_at(last)] = row
+        self._size = last
+
+    def key_at(self, row: int) -> tuple:
+        """=== Instance method =========================================================================================
+        :return: tuple - outpoint key (txid_bytes, n) of <row>
+        ========================================================================================== by Sziller ==="""
+        return self._txids[row].tobytes(), int(self._ns[row])
+
+    def utxo_at(self, row: int, unit: str = "sat") -> models.Utxo:
+        """=== Instance method =========================================================================================
+        :param row: int - row number
+        :param unit: str - unit of the <value> of the Utxo returned
+        :return: models.Utxo - of <row>
+        ========================================================================================== by Sziller ==="""
+        script_id = int(self._script_ids[row])
+        return models.Utxo(utxo_id=models.UtxoId.construct_from_key(self.key_at(row)),
+                           value=units.bitcoin_unit_converter(value=int(self._values[row]), unit_in="sat",
+                                                              unit_out=unit),
+                           scriptPubKey=self._spks[script_id] if script_id >= 0 else None)
+
+    def utxo(self, key: tuple, unit: str = "sat") -> models.Utxo:
+        """=== Instance method =========================================================================================
+        :param key: tuple - outpoint key (txid_bytes, n)
+        :param unit: str - unit of the <value> of the Utxo returned
+        :return: models.Utxo - of the outpoint
+        ========================================================================================== by Sziller ==="""
+        return self.utxo_at(row=self._rows[key], unit=unit)
+
+    def to_utxo_dict(self, unit: str = "sat", rows=None) -> dict:
+        """=== Instance method =========================================================================================
+        :param unit: str - unit of the <value>-s of the Utxo-s returned
+        :param rows: array-like - of row numbers (e.g. from <rows_where()>). If None, all rows
+        :return: dict - of utxo ID string -> models.Utxo: the format of UTXOManager.utxo_obj_dict
+        ========================================================================================== by Sziller ==="""
+        rows = range(self._size) if rows is None else rows
+        ans = {}
+        for row in rows:
+            utxo = self.utxo_at(row=int(row), unit=unit)
+            ans[utxo.utxo_id.__repr__()] = utxo
+        return ans
+
+    # --- vectorized queries -----------------------------------------------------------------------------------------
+
+    def total_sat(self, rows=None) -> int:
+        """=== Instance method =========================================================================================
+        :param rows: array-like - of row numbers, or boolean mask. If None, all rows
+        :return: int - sum of the values in sats
+        ========================================================================================== by Sziller ==="""
+        values = self.values if rows is None else self.values[rows]
+        return int(values.sum())
+
+    def balances_sat(self, rows=None) -> dict:
+        """=== Instance method =========================================================================================
+        Balance of every address: one pass over the columns. A UTXO counts for the first address of its script.
+        :param rows: array-like - of row numbers, or boolean mask. If None, all rows
+        :return: dict - address -> balance in sats, addresses of positive balance only
+        ========================================================================================== by Sziller ==="""
+        address_ids, values = self.address_ids, self.values
+        if rows is not None:
+            address_ids, values = address_ids[rows], values[rows]
+        with_address = address_ids >= 0
+        sums = np.zeros(len(self.addresses), dtype=np.int64)
+        np.add.at(sums, address_ids[with_address], values[with_address])  # integer - no float rounding
+        return {self.addresses[_]: int(sums[_]) for _ in np.flatnonzero(sums)}
+
+    def balance_sat(self, address: str) -> int:
+        """=== Instance method =========================================================================================
+        :return: int - balance of <address> in sats
+        ========================================================================================== by Sziller ==="""
+        address_id = self.addresses.id_of(address)
+        if address_id < 0:
+            return 0
+        return int(self.values[self.address_ids == address_id].sum())
+
+    def mask(self, script_types: Optional[Iterable[str]] = None, addresses: Optional[Iterable[str]] = None,
+             tip_height: Optional[int] = None, min_conf: Optional[int] = None, max_conf: Optional[int] = None,
+             min_value_sat: Optional[int] = None) -> "np.ndarray":
+        """=== Instance method =========================================================================================
+        Rows matching ALL the given conditions - conditions left None are not checked.
+        :param script_types: iterable - of script types accepted (e.g. 'witness_v0_keyhash')
+        :param addresses: iterable - of addresses accepted
+        :param tip_height: int - height of the actual tip - needed by <min_conf> / <max_conf>
+        :param min_conf: int - at least this many confirmations (unconfirmed UTXO-s have 0)
+        :param max_conf: int - at most this many confirmations
+        :param min_value_sat: int - value at least this many sats (e.g. to skip dust)
+        :return: np.ndarray of bool - one per row
+        ========================================================================================== by Sziller ==="""
+        ans = np.ones(self._size, dtype=bool)
+        if script_types is not None:
+            ans &= np.isin(self.type_ids, [self.script_types.id_of(_) for _ in script_types])
+        if addresses is not None:
+            ans &= np.isin(self.address_ids, [self.addresses.id_of(_) for _ in addresses])
+        if min_conf is not None or max_conf is not None:
+            if tip_height is None:
+                raise ValueError("tip_height is needed to filter by confirmations")
+            confirmations = np.where(self.heights == UNCONFIRMED, 0, tip_height - self.heights.astype(np.int64) + 1)
+            if min_conf is not None:
+                ans &= confirmations >= min_conf
+            if max_conf is not None:
+                ans &= confirmations <= max_conf
+        if min_value_sat is not None:
+            ans &= self.values >= min_value_sat
+        return ans
+
+    def rows_where(self, **conditions) -> "np.ndarray":
+        """=== Instance method =========================================================================================
+        :param conditions: see <mask()>
+        :return: np.ndarray of int64 - row numbers matching
+        ========================================================================================== by Sziller ==="""
+        return np.flatnonzero(self.mask(**conditions))
+
+    def select_coins(self, target_sat: int, strategy: str = "largest_first", rows=None) -> tuple:
+        """=== Instance method =========================================================================================
+        Picks UTXO-s to spend, in the order of <strategy>, until <target_sat> is covered.
+        Ordering is a vectorized sort, the cut a binary search on the running sum.
+        :param target_sat: int - sats to cover (fee included)
+        :param strategy: str - 'largest_first', 'smallest_first' or 'oldest_first' (unconfirmed ones last)
+        :param rows: array-like - of row numbers, or boolean mask, to choose from (e.g. <mask(min_conf=1, ...)>).
+                     If None, all rows
+        :return: tuple - (np.ndarray of row numbers chosen, int: their total in sats)
+        ========================================================================================== by Sziller ==="""
+        candidates = np.arange(self._size) if rows is None else np.arange(self._size)[rows]
+        values = self._values[candidates]
+        if strategy == "largest_first":
+            order = np.argsort(-values, kind="stable")
+        elif strategy == "smallest_first":
+            order = np.argsort(values, kind="stable")
+        elif strategy == "oldest_first":
+            heights = self._heights[candidates].astype(np.int64)
+            order = np.lexsort((-values, np.where(heights == UNCONFIRMED, np.iinfo(np.int64).max, heights)))
+        else:
+            raise ValueError("unknown coin selection strategy: {}".format(strategy))
+        running = np.cumsum(values[order])
+        cut = int(np.searchsorted(running, target_sat, side="left"))
+        if cut >= len(running):
+            raise ValueError("insufficient funds: {} sats available, {} needed".format(
+                int(running[-1]) if len(running) else 0, target_sat))
+        return candidates[order[:cut + 1]], int(running[cut])
+
+    # --- internals --------------------------------------------------------------------------------------------------
+
+    def _grow(self):
+        """=== Internal utility method =================================================================================
+        Doubles the capacity of every column.
+        ========================================================================================== by Sziller ==="""
+        for name in ("_txids", "_ns", "_values", "_heights", "_script_ids", "_type_ids", "_address_ids"):
+            column = getattr(self, name)
+            grown = np.zeros((max(len(column), 1) * 2,) + column.shape[1:], dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
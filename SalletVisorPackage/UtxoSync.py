@@ -0,0 +1,211 @@
+"""
+Incremental sync of the UTXO set managed by UTXOManager - block by block.
+A full rebuild re-reads every UTXO whatever changed. Here the set remembers the last block it was synced to: a refresh
+walks the blocks mined since - each one fetched serialized and parsed once - applying its spends of UTXO-s held and
+its new outputs to the scripts watched. Changes of each block are journaled: on a reorg the set is rolled back block by
+block to the last checkpoint still on the active chain, then walked forward on it.
+The block the set is up to date with must be known - and persisted with the set (see UTXOManager): a sync started at
+the current tip instead would silently skip the blocks mined while the set was stored.
+Needs an RPC node (block hashes by height).
+by Sziller
+"""
+
+import inspect
+import logging
+import threading
+from collections import deque
+from typing import Optional
+from SalletBasePackage import models
+from SalletBasePackage import units
+from SalletNodePackage import RawTxParser
+from SalletVisorPackage.UtxoIndex import UtxoIndex
+
+# Setting up logger                                         logger                      -   START   -
+lg = logging.getLogger()
+# Setting up logger                                         logger                      -   ENDED   -
+
+lg.info("START: {:>85} <<<".format('UtxoSync.py'))
+
+
+class BlockJournal(object):
+    """=== Class name: BlockJournal ====================================================================================
+    Checkpoint of ONE applied block: where the set stood before it, and what the block changed.
+    :param block_hash: str - hash of the block applied
+    :param height: int - its height
+    :param prev_hash: str - hash of the block the set was synced to before
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+    __slots__ = ("block_hash", "height", "prev_hash", "added", "removed")
+
+    def __init__(self, block_hash: str, height: int, prev_hash: str):
+        self.block_hash: str                = block_hash
+        self.height: int                    = height
+        self.prev_hash: str                 = prev_hash
+        self.added: list                    = []    # utxo ID strings created by the block
+        self.removed: list                  = []    # (utxo ID string, models.Utxo) tuples spent by the block
+
+    def __repr__(self):
+        return "{}({} at {} - +{} / -{})".format(self.ccn, self.block_hash, self.height,
+                                                 len(self.added), len(self.removed))
+
+
+class UtxoSync(object):
+    """=== Class name: UtxoSync ========================================================================================
+    Keeps a UtxoIndex in sync with the chain. Start it at the block the set is up to date with (<start()>), then call
+    <sync()> - or subscribe <on_chain_event> to a ChainNotifier - whenever new blocks may have arrived.
+    Watched scripts are the scriptPubKeys of the UTXO-s in the set when started, and those added by <watch()>: new
+    outputs to them enter the set, with the addresses etc. of the watched ScriptPubKey.
+    :param node: Node - an RPC node
+    :param utxos: UtxoIndex - the set synced
+    :param keep_blocks: int - number of block checkpoints kept: the deepest reorg that can be rolled back
+    ============================================================================================== by Sziller ==="""
+    ccn = inspect.currentframe().f_code.co_name  # current class name
+
+    def __init__(self, node, utxos: UtxoIndex, keep_blocks: int = 100):
+        self.node                           = node
+        self.utxos: UtxoIndex               = utxos
+        self.keep_blocks: int               = keep_blocks
+        # -------------------------------------------------------------------
+        self.tip_hash: Optional[str]        = None  # last block processed
+        self.tip_height: Optional[int]      = None
+        self.watched: dict                  = {}    # scriptPubKey hex -> models.ScriptPubKey
+        self.journal: deque                 = deque(maxlen=keep_blocks)  # of BlockJournal, oldest first
+        self.blocks_applied: int            = 0
+        self.blocks_rolled_back: int        = 0
+        self._lock: threading.RLock         = threading.RLock()
+        for utxo in utxos.values():
+            if utxo.scriptPubKey is not None:
+                self.watch(utxo.scriptPubKey)
+
+    def __repr__(self):
+        return "{}({} at {} - {} scripts watched)".format(self.ccn, self.tip_hash, self.tip_height, len(self.watched))
+
+    def watch(self, script_pub_key: models.ScriptPubKey):
+        """=== Instance method =========================================================================================
+        :param script_pub_key: ScriptPubKey - new outputs to its script are added to the set from now on
+        ========================================================================================== by Sziller ==="""
+        self.watched[script_pub_key.hex] = script_pub_key
+
+    def start(self, block_hash: str, height: Optional[int] = None):
+        """=== Instance method =========================================================================================
+        Marks the set as up to date with block <block_hash> - e.g. right after a full rebuild, or as stored with the
+        set. Checkpoints are dropped. There is no default: only the caller knows which block the set reflects.
+        :param block_hash: str - hash of the block
+        :param height: int or None - its height, if known (e.g. stored with the hash), None: looked up
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        if not block_hash:
+            msg = "no block given the set is up to date with - says {}.{}".format(self.ccn, cmn)
+            lg.critical(msg)
+            raise Exception(msg)
+        with self._lock:
+            if height is None:
+                height = self.node.nodeop_getblockheight(block_hash=block_hash)
+            self.tip_hash, self.tip_height = block_hash, height
+            self.journal.clear()
+            lg.info("sync start: block {} at {} - says {}".format(block_hash, height, self.ccn))
+
+    # --- sync -------------------------------------------------------------------------------------------------------
+
+    def sync(self) -> int:
+        """=== Instance method =========================================================================================
+        Rolls back blocks no longer on the active chain, then applies the blocks mined since the last one processed.
+        If nothing happened, it costs one block count and one block hash lookup.
+        :return: int - number of blocks applied
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        with self._lock:
+            if self.tip_hash is None:
+                msg = "not started: call start() first - says {}.{}".format(self.ccn, cmn)
+                lg.critical(msg)
+                raise Exception(msg)
+            applied = 0
+            node_height = self.node.nodeop_getblockcount(use_cache=False)
+            self._rollback_to_active_chain(node_height=node_height)
+            while self.tip_height < node_height:
+                block_hash = self.node.nodeop_getblockhash(self.tip_height + 1, use_cache=False)
+                header, txs = RawTxParser.parse_block(self.node.nodeop_getblock_raw(block_hash=block_hash))
+                if header["previousblockhash"] != self.tip_hash:  # reorg while walking: check again
+                    lg.warning("reorg     : block {} does not follow {} - says {}".format(block_hash, self.tip_hash,
+                                                                                          cmn))
+                    node_height = self.node.nodeop_getblockcount(use_cache=False)
+                    self._rollback_to_active_chain(node_height=node_height)
+                    continue
+                self._apply(block_hash=block_hash, txs=txs)
+                applied += 1
+            lg.info("synced    : {} blocks - tip {} at {} - says {}".format(applied, self.tip_hash, self.tip_height,
+                                                                            cmn))
+            return applied
+
+    def on_chain_event(self, event):
+        """=== Instance method =========================================================================================
+        Consumer of a ChainNotifier: syncs on every new block.
+        notifier.subscribe(utxo_sync.on_chain_event, topics=("block",))
+        :param event: ChainEvent - the event received
+        ========================================================================================== by Sziller ==="""
+        if event.topic == "block" and self.tip_hash is not None:
+            self.sync()
+
+    # --- internals --------------------------------------------------------------------------------------------------
+
+    def _apply(self, block_hash: str, txs: list):
+        """=== Internal utility method =================================================================================
+        Applies the transactions of a block in order - spends of UTXO-s held, new outputs to watched scripts - and
+        journals the changes. Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        entry = BlockJournal(block_hash=block_hash, height=self.tip_height + 1, prev_hash=self.tip_hash)
+        divider = models.UtxoId.divider
+        for parsed in txs:
+            if not parsed.is_coinbase:
+                for prev_txid, n in parsed.prevouts:
+                    key = "{}{}{}".format(prev_txid.hex(), divider, n)
+                    if key in self.utxos:
+                        entry.removed.append((key, self.utxos[key]))
+                        del self.utxos[key]
+            for n, script in enumerate(parsed.scripts):
+                script_pub_key = self.watched.get(script.hex())
+                if script_pub_key is None:
+                    continue
+                utxo_id_obj = models.UtxoId(txid=parsed.txid_bytes, n=n)
+                value = units.bitcoin_unit_converter(value=parsed.values[n], unit_in="sat", unit_out=self.utxos.unit)
+                self.utxos[utxo_id_obj.__repr__()] = models.Utxo(utxo_id=utxo_id_obj, value=value,
+                                                                 scriptPubKey=script_pub_key)
+                entry.added.append(utxo_id_obj.__repr__())
+        self.journal.append(entry)
+        self.tip_hash, self.tip_height = block_hash, entry.height
+        self.blocks_applied += 1
+        lg.debug("applied   : {}".format(entry))
+
+    def _rollback(self):
+        """=== Internal utility method =================================================================================
+        Undoes the last block applied: its outputs are dropped, the UTXO-s it spent restored - except outputs both
+        created and spent inside the block. Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        entry = self.journal.pop()
+        added = set(entry.added)
+        for key in added:
+            self.utxos.pop(key, None)
+        for key, utxo in entry.removed:
+            if key not in added:
+                self.utxos[key] = utxo
+        self.tip_hash, self.tip_height = entry.prev_hash, entry.height - 1
+        self.blocks_rolled_back += 1
+        lg.warning("rollback  : {}".format(entry))
+
+    def _rollback_to_active_chain(self, node_height: int):
+        """=== Internal utility method =================================================================================
+        Rolls back checkpoints until the last block processed is on the node's active chain.
+        Raises if the fork point is deeper than the checkpoints kept - a full rebuild is needed then.
+        Caller must hold the lock.
+        ========================================================================================== by Sziller ==="""
+        cmn = inspect.currentframe().f_code.co_name  # current method name
+        while True:
+            if self.tip_height <= node_height and \
+                    self.node.nodeop_getblockhash(self.tip_height, use_cache=False) == self.tip_hash:
+                return
+            if not self.journal:
+                msg = "reorg     : block {} left the active chain, below the {} checkpoints kept - " \
+                      "full rebuild needed - says {}.{}".format(self.tip_hash, self.keep_blocks, self.ccn, cmn)
+                lg.critical(msg)
+                raise Exception(msg)
+            self._rollback()
@@ -0,0 +1,24 @@
+"""Checks that AsyncNode still offers every operation of Node - as a coroutine of the same parameters."""
+
+import sys
+import logging
+from SalletNodePackage.BitcoinNodeObject import Node
+from SalletNodePackage.AsyncNodeObject import AsyncNode, check_parity
+
+
+lg = logging.getLogger(__name__)
+lg.info("START: {:>85} <<<".format('mngr_asyncnode.py'))
+
+
+if __name__ == "__main__":
+    # NOTSET=0, DEBUG=10, INFO=20, WARN=30, ERROR=40, CRITICAL=50
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)8s]: %(message)s",
+                        datefmt='%y%m%d %H:%M:%S')
+    lg.warning("START: {:>85} <<<".format('__name__ == "__main__" namespace: mngr_asyncnode.py'))
+
+    drifted = check_parity(blocking=Node, asynchronous=AsyncNode)
+    for line in drifted:
+        print(" - {}".format(line))
+    print("=== {} and {}: {} ===".format(Node.__name__, AsyncNode.__name__,
+                                         "{} differences".format(len(drifted)) if drifted else "in parity"))
+    sys.exit(1 if drifted else 0)
@@ -0,0 +1,91 @@
+import gc
+import sys
+import time
+import logging
+import tracemalloc
+from SalletBasePackage import models
+
+
+lg = logging.getLogger(__name__)
+lg.info("START: {:>85} <<<".format('mngr_models.py'))
+
+
+class LegacyUtxoId:
+    """UtxoId as it used to be: per-instance __dict__, txid as 64 char hex str."""
+    divider: str = "_"
+
+    def __init__(self, txid: str, n: int):
+        self.txid: str = txid
+        self.n: int = n
+
+    def __repr__(self):
+        return "{}{}{}".format(self.txid, self.divider, self.n)
+
+
+class LegacyUtxo:
+    """Utxo as it used to be: per-instance __dict__, txid and n stored twice, float value."""
+
+    def __init__(self, utxo_id: LegacyUtxoId, value: float = 0.0, scriptPubKey=None):
+        self.utxo_id = utxo_id
+        self.txid: str = self.utxo_id.txid
+        self.n: int = self.utxo_id.n
+        self.value: float = value
+        self.scriptPubKey = scriptPubKey
+
+
+def build_legacy(count: int, spks: list) -> dict:
+    """<count> UTXO-s the old way: keyed by the string repr, float btc values."""
+    ans = {}
+    for i in range(count):
+        utxo_id = LegacyUtxoId(txid=i.to_bytes(32, "big").hex(), n=i & 3)
+        ans[utxo_id.__repr__()] = LegacyUtxo(utxo_id=utxo_id, value=(i % 100_000) / 10 ** 8,
+                                             scriptPubKey=spks[i % len(spks)])
+    return ans
+
+
+def build_compact(count: int, spks: list) -> dict:
+    """<count> UTXO-s the compact way: keyed by (txid_bytes, n), integer sat values."""
+    ans = {}
+    for i in range(count):
+        utxo_id = models.UtxoId(txid=i.to_bytes(32, "big"), n=i & 3)
+        ans[utxo_id.key] = models.Utxo(utxo_id=utxo_id, value=i % 100_000, scriptPubKey=spks[i % len(spks)])
+    return ans
+
+
+def measure(label: str, builder, count: int, spks: list):
+    """Builds a set by <builder> twice - prints construction throughput, and memory per UTXO (container included)."""
+    gc.collect()
+    start = time.perf_counter()
+    utxo_set = builder(count, spks)
+    elapsed = time.perf_counter() - start
+    del utxo_set
+    gc.collect()
+    tracemalloc.start()  # traced separately: tracing slows allocation down
+    utxo_set = builder(count, spks)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{:<30}: {:>10,.0f} UTXO / s - {:>6.1f} bytes / UTXO".format(label, count / elapsed, allocated / count))
+    return utxo_set
+
+
+if __name__ == "__main__":
+    # NOTSET=0, DEBUG=10, INFO=20, WARN=30, ERROR=40, CRITICAL=50
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)8s]: %(message)s",
+                        datefmt='%y%m%d %H:%M:%S')
+    lg.warning("START: {:>85} <<<".format('__name__ == "__main__" namespace: mngr_models.py'))
+
+    # python3 mngr_models.py [number of UTXO-s]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    spks = [models.ScriptPubKey(spk_asm="0 {:040x}".format(_), spk_hex="0014{:040x}".format(_), spk_reqSigs=1,
+                                spk_type="witness_v0_keyhash", spk_addresses=["address_{}".format(_)])
+            for _ in range(1000)]  # shared by the UTXO-s: a wallet has far fewer scripts than UTXO-s
+    print("=== {:,} UTXO-s ===".format(count))
+    legacy = measure("legacy - str keys, __dict__", build_legacy, count, spks)
+    del legacy
+    compact = measure("compact - tuple keys, slots", build_compact, count, spks)
+    utxo_list = list(compact.values())[:100_000]
+    start = time.perf_counter()
+    for utxo in utxo_list:
+        utxo.txid
+    per_utxo = (time.perf_counter() - start) / len(utxo_list)
+    print("{:<30}: {:>10.3f} us / UTXO".format("lazy hex txid", per_utxo * 10 ** 6))
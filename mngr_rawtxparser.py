@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import logging
+from bitcoinlib.keys import Key
+from bitcoinlib.transactions import Transaction
+from SalletNodePackage import RawTxParser
+from SalletNodePackage.BitcoinNodeObject import Node
+from dotenv import load_dotenv
+
+
+lg = logging.getLogger(__name__)
+lg.info("START: {:>85} <<<".format('mngr_rawtxparser.py'))
+
+load_dotenv()
+
+
+def build_sample_tx(n_in: int, n_out: int, witness_type: str = "segwit") -> str:
+    """Signed sample TX of <n_in> inputs and <n_out> outputs - raw hex."""
+    key = Key(network="bitcoin")
+    tx = Transaction(network="bitcoin", witness_type=witness_type)
+    for _ in range(n_in):
+        tx.add_input(prev_txid=(_ + 1).to_bytes(32, "big"), output_n=_, keys=key, value=100_000, witness_type=witness_type)
+    for _ in range(n_out):
+        tx.add_output(90_000 * n_in // n_out, address=key.address())
+    tx.sign(key)
+    return tx.raw_hex()
+
+
+def bench(label: str, func, rounds: int) -> float:
+    """Runs <func> <rounds> times - returns seconds per round."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    per_round = (time.perf_counter() - start) / rounds
+    print("{:<40}: {:>10.1f} us / TX".format(label, per_round * 10 ** 6))
+    return per_round
+
+
+def parse_bitcoinlib(raw_hex: str):
+    """The path OrdinalTracker used to take: full TX object, then its dict."""
+    tx_data = Transaction.parse(raw_hex).as_dict()
+    return [(_['prev_txid'], _['output_n']) for _ in tx_data['inputs']], [_['value'] for _ in tx_data['outputs']]
+
+
+def parse_streaming(raw_hex: str):
+    """The streaming parser."""
+    parsed = RawTxParser.parse_tx(raw_hex)
+    return parsed.prevouts, parsed.values
+
+
+if __name__ == "__main__":
+    # NOTSET=0, DEBUG=10, INFO=20, WARN=30, ERROR=40, CRITICAL=50
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)8s]: %(message)s",
+                        datefmt='%y%m%d %H:%M:%S')
+    lg.warning("START: {:>85} <<<".format('__name__ == "__main__" namespace: mngr_rawtxparser.py'))
+
+    for n_in, n_out in ((1, 2), (5, 5), (50, 20)):
+        for witness_type in ("legacy", "segwit"):
+            raw = build_sample_tx(n_in=n_in, n_out=n_out, witness_type=witness_type)
+            assert RawTxParser.parse_tx(raw).txid == Transaction.parse(raw).txid
+            rounds = max(20, 2000 // n_in)
+            print("=== {} - {:>2} in / {:>2} out - {} bytes ===".format(witness_type, n_in, n_out, len(raw) // 2))
+            slow = bench("bitcoinlib Transaction.parse().as_dict()", lambda: parse_bitcoinlib(raw), rounds)
+            fast = bench("RawTxParser.parse_tx()", lambda: parse_streaming(raw), rounds)
+            print("{:<40}: {:>10.1f} x".format("speedup", slow / fast))
+
+    # block ingestion: python3 mngr_rawtxparser.py <node alias> <block hash>
+    if len(sys.argv) == 3:
+        node = Node(alias=sys.argv[1], is_rpc=True)
+        node.update_sensitive_data(rpc_ip=os.getenv("RPC_BC_MAIN_IP"),
+                                   rpc_port=os.getenv("RPC_BC_MAIN_PORT"),
+                                   rpc_user=os.getenv("RPC_BC_MAIN_USER"),
+                                   rpc_password=os.getenv("RPC_BC_MAIN_PSSW"))
+        raw_block = memoryview(node.nodeop_getblock_raw(block_hash=sys.argv[2]))
+        tx_slices, pos = [], RawTxParser._read_varint(raw_block, 80)[1]  # first TX follows header and TX count
+        while pos < len(raw_block):
+            end = RawTxParser.parse_tx_at(raw_block, pos)[1]
+            tx_slices.append(raw_block[pos:end].hex())
+            pos = end
+        print("=== block {} - {} bytes - {} TXs ===".format(sys.argv[2], len(raw_block), len(tx_slices)))
+        start = time.perf_counter()
+        for _ in tx_slices:
+            parse_bitcoinlib(_)
+        print("{:<40}: {:>10.1f} ms".format("bitcoinlib, TX by TX", (time.perf_counter() - start) * 1000))
+        start = time.perf_counter()
+        header, txs = RawTxParser.parse_block(raw_block)
+        print("{:<40}: {:>10.1f} ms".format("RawTxParser.parse_block()", (time.perf_counter() - start) * 1000))
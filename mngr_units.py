@@ -0,0 +1,106 @@
+import sys
+import time
+import random
+import logging
+from decimal import Decimal
+from SalletBasePackage import units
+
+
+lg = logging.getLogger(__name__)
+lg.info("START: {:>85} <<<".format('mngr_units.py'))
+
+
+def legacy_bitcoin_unit_converter(value: float, unit_in: str, unit_out: str) -> float:
+    """units.bitcoin_unit_converter() as it used to be: table built on every call, float division."""
+    convert_table = {'btc': 0, 'bitcoin': 0, 'bitcoins': 0, 'Bitcoin': 0, 'Bitcoins': 0,
+                     'BTC': 0, 'BITCOIN': 0, 'BITCOINS': 0,
+                     'coin': 0, 'coins': 0, 'COIN': 0, 'COINS': 0,
+                     'mbtc': 3, 'mili': 3, 'millibitcoin': 3, 'millibitcoins': 3, 'milli-bitcoin': 3,
+                     'milli-bitcoins': 3, 'millibit': 3, 'millibits': 3, 'millie': 3, 'millies': 3, 'm': 3, 'milli': 3,
+                     'mBTC': 3, 'MILI': 3, 'MILLIBITCOIN': 3, 'MILLIBITCOINS': 3, 'MILLI-BITCOIN': 3,
+                     'MILLI-BITCOINS': 3, 'MILLIBIT': 3, 'MILLIBITS': 3, 'MILLIE': 3, 'MILLIES': 3,
+                     'µbtc': 6, 'bit': 6, 'bits': 6, 'microbitcoin': 6, 'microbitcoins': 6,
+                     'micro-bitcoin': 6, 'micro-bitcoins': 6, 'micro': 6, 'micros': 6, 'µ': 6,
+                     'µBTC': 6, 'BIT': 6, 'BITS': 6, 'MICROBITCOIN': 6, 'MICROBITCOINS': 6,
+                     'MICRO-BITCOIN': 6, 'MICRO-BITCOINS': 6, 'MICRO': 6, 'MICROS': 6,
+                     'satoshi': 8, 'satoshis': 8, 'sat': 8, 'sats': 8, 's': 8,
+                     'SATOSHI': 8, 'SATOSHIS': 8, 'SAT': 8, 'SATS': 8,
+                     'msatoshi': 11, 'msatoshis': 11, 'msat': 11, 'msats': 11, 'ms': 11,
+                     'MSATOSHI': 11, 'MSATOSHIS': 11, 'MSAT': 11, 'MSATS': 11,
+                     'millisatoshi': 11, 'millisatoshis': 11, 'millisat': 11, 'millisats': 11,
+                     'MILLISATOSHI': 11, 'MILLISATOSHIS': 11, 'MILLISAT': 11, 'MILLISATS': 11}
+    if unit_in in convert_table.keys() and unit_out in convert_table.keys():
+        unit_in, unit_out = convert_table[unit_in], convert_table[unit_out]
+        calculated = float(value / (10 ** (unit_in - unit_out)))
+        returned = round(calculated, 8 - unit_out)
+        if 8 - unit_out <= 0:
+            returned = int(returned)
+        return returned
+    raise Exception("Entered unit name not recognised!")
+
+
+def bench(label: str, func, values: list, unit_in: str, unit_out: str) -> float:
+    """Converts every value of <values> by <func> - returns microseconds per conversion."""
+    start = time.perf_counter()
+    for _ in values:
+        func(_, unit_in, unit_out)
+    per_value = (time.perf_counter() - start) / len(values) * 10 ** 6
+    print("{:<44}: {:>8.3f} us / value".format(label, per_value))
+    return per_value
+
+
+def compare(label: str, values: list, unit_in: str, unit_out: str):
+    """Legacy vs. table-driven converter on the same values."""
+    print("=== {} ===".format(label))
+    slow = bench("legacy", legacy_bitcoin_unit_converter, values, unit_in, unit_out)
+    fast = bench("units.bitcoin_unit_converter()", units.bitcoin_unit_converter, values, unit_in, unit_out)
+    print("{:<44}: {:>8.1f} x".format("speedup", slow / fast))
+
+
+if __name__ == "__main__":
+    # NOTSET=0, DEBUG=10, INFO=20, WARN=30, ERROR=40, CRITICAL=50
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)8s]: %(message)s",
+                        datefmt='%y%m%d %H:%M:%S')
+    lg.warning("START: {:>85} <<<".format('__name__ == "__main__" namespace: mngr_units.py'))
+
+    # python3 mngr_units.py [number of values]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    random.seed(21)
+    sats = [random.randrange(0, 21 * 10 ** 14) for _ in range(count)]
+    btcs = [_ / 10 ** 8 for _ in sats]
+
+    # alias table: resolved once at import, case-insensitive
+    start = time.perf_counter()
+    for _ in range(count):
+        units.unit_power("mBTC")
+    per_lookup = (time.perf_counter() - start) / count * 10 ** 6
+    print("{:<44}: {:>8.3f} us / lookup".format("unit_power() - alias table", per_lookup))
+
+    compare("fast path: int sat -> btc", sats, "sat", "btc")
+    compare("fast path: float btc -> sat", btcs, "btc", "sat")
+    compare("exact path: float bit -> mbtc", [_ * 10 ** 6 for _ in btcs[:count // 10]], "bit", "mbtc")
+    print("=== Decimal btc -> sat ===")
+    bench("units.bitcoin_unit_converter()", units.bitcoin_unit_converter,
+          [Decimal(_) / 10 ** 8 for _ in sats[:count // 10]], "btc", "sat")
+
+    # exactness: float btc amounts of at most 8 decimals - as read from the node, a yaml file or the DB
+    for unit_out, factor in (("sat", 1), ("msat", 1000)):
+        drift_legacy = sum(legacy_bitcoin_unit_converter(b, "btc", unit_out) != s * factor for s, b in zip(sats, btcs))
+        drift_new = sum(units.bitcoin_unit_converter(b, "btc", unit_out) != s * factor for s, b in zip(sats, btcs))
+        print("=== btc -> {}, values off: legacy {:,} / new {:,} of {:,} ===".format(unit_out, drift_legacy,
+                                                                                    drift_new, count))
+
+    # vectorized: the whole column at once
+    if units.np is not None:
+        sat_array = units.np.asarray(sats, dtype=units.np.int64)
+        print("=== vectorized: int sat -> btc, {:,} values ===".format(count))
+        start = time.perf_counter()
+        loop = [units.bitcoin_unit_converter(_, "sat", "btc") for _ in sats]
+        slow = time.perf_counter() - start
+        start = time.perf_counter()
+        vectorized = units.convert_array(sat_array, "sat", "btc")
+        fast = time.perf_counter() - start
+        assert vectorized.tolist() == loop
+        print("{:<44}: {:>8.1f} ms".format("bitcoin_unit_converter() in a loop", slow * 1000))
+        print("{:<44}: {:>8.1f} ms".format("convert_array()", fast * 1000))
+        print("{:<44}: {:>8.1f} x".format("speedup", slow / fast))
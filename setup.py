@@ -15,7 +15,8 @@ setup(
     install_requires=[
         'requests>=2.32.0',  # Use the latest version of requests to fix the vulnerabilities
         'python-dotenv',
-        'bitcoinlib'
+        'bitcoinlib',
+        'aiohttp'
     ],
     classifiers=[                          # Metadata for the package
         'Development Status :: 3 - Alpha',